@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Batch autotuner for the XML to TXT Converter
+Times short trial conversions on the head of the real input and picks the fastest settings
+"""
+
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Process, Pipe, cpu_count
+from pathlib import Path
+from typing import Dict
+
+from record_scan import open_mmap, find_record_start, find_record_end, root_tags, detect_record_tag
+
+# Candidate values per tuned setting, searched one setting at a time (coordinate descent)
+SEARCH_SPACE = {
+    'batch_size': [50, 200, 800, 2000],
+    'gc_interval': [100, 1000, 0],
+    'flush_interval': [1000, 5000, 20000],
+}
+
+DEFAULTS = {'batch_size': 200, 'gc_interval': 100, 'flush_interval': 1000}
+
+# Record worker backends tried when the conversion would use record workers
+BACKENDS = ['processes', 'threads']
+
+
+def _worker_candidates(default: int) -> list:
+    """Worker counts tried on the record worker path (1 = sequential path)."""
+    cores = cpu_count()
+    return sorted({1, 2, max(2, cores // 2), max(2, cores - 1), default})
+
+
+def profile_path() -> Path:
+    """Where tuned settings are persisted (one entry per input type)."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(Path.home(), '.cache')
+    return Path(cache_home) / 'xml_to_txt' / 'autotune.json'
+
+
+def _load_profiles() -> Dict[str, dict]:
+    path = profile_path()
+    if not path.exists():
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_profile(key: str, profile: dict):
+    profiles = _load_profiles()
+    profiles[key] = profile
+    path = profile_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(profiles, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def write_trial_input(input_path: str, trial_path: str, record_tag: str, max_bytes: int) -> dict:
+    """Copy whole records from the head of input_path into a small standalone XML file.
+
+    Returns shape info used to key the persisted profile.
+    """
+    tag = record_tag.encode('utf-8')
+    f, mm = open_mmap(input_path)
+    try:
+        root_open, root_close, pos = root_tags(mm)
+        records = 0
+        record_bytes = 0
+        with open(trial_path, 'wb') as out:
+            out.write(b'<?xml version="1.0" encoding="UTF-8"?>\n' + root_open + b'\n')
+            while record_bytes < max_bytes:
+                start = find_record_start(mm, tag, pos)
+                if start < 0:
+                    break
+                end = find_record_end(mm, tag, start)
+                if end < 0:
+                    break
+                out.write(mm[start:end])
+                out.write(b'\n')
+                records += 1
+                record_bytes += end - start
+                pos = end
+            out.write(root_close + b'\n')
+    finally:
+        mm.close()
+        f.close()
+
+    if records == 0:
+        raise ValueError(f"No <{record_tag}> records found in the head of {input_path}")
+    return {
+        'root_tag': root_close[2:-1].decode('utf-8'),
+        'record_tag': record_tag,
+        'records': records,
+        'mean_record_bytes': record_bytes / records,
+    }
+
+
+def input_type_key(shape: dict, converter_kwargs: dict, parallel: bool = False) -> str:
+    """Profile key: document type, record size class (power of 2), output format and path."""
+    size_class = int(math.log2(max(shape['mean_record_bytes'], 1)))
+    return (f"{shape['root_tag']}/{shape['record_tag']}/2^{size_class}B/"
+            f"{converter_kwargs.get('output_format', 'llm_optimized')}"
+            + ("/workers" if parallel else ""))
+
+
+def _peak_rss_mb(children: int = 1) -> float:
+    """Peak RSS of this process plus `children` times its largest finished child process
+    (the kernel only reports the largest one)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            + children * resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _trial_worker(conn, converter_cls, converter_kwargs, trial_input, output_base):
+    """Run one timed conversion in a fresh process so peak RSS is per trial."""
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        converter = converter_cls(**converter_kwargs)
+        start = time.perf_counter()
+        converter.convert(trial_input, output_base)
+        elapsed = time.perf_counter() - start
+        conn.send({'seconds': elapsed, 'peak_rss_mb': _peak_rss_mb(converter.num_processes)})
+    except Exception as e:
+        conn.send({'error': str(e)})
+    finally:
+        conn.close()
+
+
+def _run_trial(converter_cls, converter_kwargs, trial_input, output_base, repeats: int) -> dict:
+    best = None
+    for _ in range(repeats):
+        recv, send = Pipe(duplex=False)
+        proc = Process(target=_trial_worker,
+                       args=(send, converter_cls, converter_kwargs, trial_input, output_base))
+        proc.start()
+        send.close()
+        result = recv.recv() if recv.poll(600) else {'error': 'trial timed out'}
+        proc.join()
+        if 'error' in result:
+            return result
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+def autotune(converter_cls, converter_kwargs: dict, input_path: str,
+             trial_mb: float = 8.0, memory_limit_mb: float = 4096.0,
+             repeats: int = 2, refresh: bool = False) -> dict:
+    """Find the fastest batch/GC/flush settings for this input within a memory limit.
+
+    Trials take the path the conversion will take: when it would hand records to
+    record workers, the worker count and backend are tuned first (workers=1 is the
+    sequential path), and gc_interval only where the sequential path runs.
+    Results are persisted per input type (see input_type_key), so later runs on
+    similar files reuse them without trials unless refresh is set. Returns the
+    tuned settings, to be merged into converter_kwargs.
+    """
+    record_tag = converter_kwargs.get('record_tag') or detect_record_tag(input_path)
+    if not record_tag:
+        raise ValueError("Could not detect a record tag, please pass --record-tag")
+
+    with tempfile.TemporaryDirectory(prefix='xml_autotune_') as tmp_dir:
+        trial_input = os.path.join(tmp_dir, 'trial.xml')
+        shape = write_trial_input(input_path, trial_input, record_tag, int(trial_mb * 1024 * 1024))
+        # Same decision as convert() makes for the real input
+        probe = converter_cls(**converter_kwargs)
+        parallel = probe.num_processes > 1 and probe._parallel_records(trial_input) is not None
+        key = input_type_key(shape, converter_kwargs, parallel)
+
+        profiles = _load_profiles()
+        if not refresh and key in profiles:
+            profile = profiles[key]
+            print(f"🎛️  Autotune: reusing stored profile for {key}")
+            return dict(profile['settings'])
+
+        print(f"🎛️  Autotune: {shape['records']:,} records "
+              f"(~{shape['mean_record_bytes'] / 1024:.1f} KB each) from the first {trial_mb:g} MB"
+              + (", record workers" if parallel else ", sequential"))
+
+        base_kwargs = dict(converter_kwargs)
+        base_kwargs.update(add_metadata=False)
+        # Delta mode would rewrite the revision map next to the trial output; tune without it
+        # (but keep its record-level formatting)
+        if base_kwargs.get('delta_since') or base_kwargs.get('delta_map'):
+            base_kwargs['record_tag'] = record_tag
+        base_kwargs.update(delta_since=None, delta_map=None)
+        output_base = os.path.join(tmp_dir, 'out')
+
+        search_space = dict(SEARCH_SPACE)
+        best = dict(DEFAULTS)
+        if parallel:
+            search_space = {'workers': _worker_candidates(probe.num_processes), 'backend': BACKENDS,
+                            **SEARCH_SPACE}
+            best.update(workers=probe.num_processes, backend=probe._record_backend())
+        best_result = _run_trial(converter_cls, {**base_kwargs, **best}, trial_input, output_base, repeats)
+        if 'error' in best_result:
+            raise RuntimeError(f"Autotune baseline trial failed: {best_result['error']}")
+        baseline_seconds = best_result['seconds']
+        print(f"   • baseline {best}: {best_result['seconds']:.2f}s, {best_result['peak_rss_mb']:.0f} MB")
+
+        for setting, candidates in search_space.items():
+            sequential = best.get('workers', 1) == 1
+            if setting == 'backend' and sequential or setting == 'gc_interval' and not sequential:
+                continue  # no record workers to choose a backend for / not used by record workers
+            for value in candidates:
+                if value == best[setting]:
+                    continue
+                trial = {**best, setting: value}
+                result = _run_trial(converter_cls, {**base_kwargs, **trial}, trial_input, output_base, repeats)
+                if 'error' in result:
+                    print(f"   • {setting}={value}: failed ({result['error']})")
+                    continue
+                within_limit = result['peak_rss_mb'] <= memory_limit_mb
+                print(f"   • {setting}={value}: {result['seconds']:.2f}s, {result['peak_rss_mb']:.0f} MB"
+                      + ("" if within_limit else " (over memory limit)"))
+                if within_limit and result['seconds'] < best_result['seconds']:
+                    best, best_result = trial, result
+
+    speedup = baseline_seconds / best_result['seconds'] if best_result['seconds'] > 0 else 1.0
+    print(f"🎛️  Autotune: selected {best} ({speedup:.2f}x vs defaults)")
+    _save_profile(key, {
+        'settings': best,
+        'seconds': best_result['seconds'],
+        'peak_rss_mb': best_result['peak_rss_mb'],
+        'speedup': speedup,
+        'tuned_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'source': Path(input_path).name,
+    })
+    print(f"🎛️  Profile saved to {profile_path()} ({key})")
+    return best
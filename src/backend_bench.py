@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Record worker benchmark for the XML to TXT Converter
+Times record mode with worker processes (shared-memory rings) against worker
+threads for a few worker counts, next to a single-process baseline. Threads
+only scale on a free-threaded build (python3.13t+) with the GIL disabled; run
+the script on both build types to compare.
+
+Usage:
+  python3 src/backend_bench.py                      # 256 MB synthetic wiki, 2..CPUs workers
+  python3 src/backend_bench.py --mb 1024 --workers 2,4,8 --format jsonl
+  python3 src/backend_bench.py --input dump.xml --record-tag page
+  PYTHON_GIL=0 python3.13t src/backend_bench.py     # free-threaded build
+"""
+
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import sysconfig
+import tempfile
+import time
+
+from soak_test import SyntheticWiki
+from xml_converter import XMLToTXTConverter, gil_disabled
+
+
+def build_description() -> str:
+    free_threaded = bool(sysconfig.get_config_var('Py_GIL_DISABLED'))
+    gil = "GIL disabled" if gil_disabled() else "GIL enabled"
+    return f"Python {sys.version.split()[0]} ({'free-threaded' if free_threaded else 'default'} build, {gil})"
+
+
+def write_synthetic_input(path: str, mb: float):
+    source = SyntheticWiki(int(mb * 1024 * 1024))
+    with open(path, 'wb') as f:
+        shutil.copyfileobj(source, f, 4 * 1024 * 1024)
+
+
+def run_once(input_path: str, work_dir: str, record_tag: str, output_format: str,
+             backend: str, workers: int) -> float:
+    """Seconds for one conversion, output thrown away; backend None = single process."""
+    output_base = os.path.join(work_dir, 'bench')
+    converter = XMLToTXTConverter(output_format=output_format, record_tag=record_tag,
+                                  use_parallel=backend is not None, workers=workers,
+                                  backend=backend or 'auto')
+    start = time.time()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        converter.convert(input_path, output_base)
+    elapsed = time.time() - start
+    for name in os.listdir(work_dir):
+        os.unlink(os.path.join(work_dir, name))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark record workers: processes vs threads')
+    parser.add_argument('--input', default=None, help='XML input (default: synthetic MediaWiki-like file)')
+    parser.add_argument('--mb', type=float, default=256, help='Synthetic input size (default: 256 MB)')
+    parser.add_argument('--record-tag', default='page', help='Record tag (default: page)')
+    parser.add_argument('--format', default='llm_optimized', help='Output format (default: llm_optimized)')
+    parser.add_argument('--workers', default=None,
+                        help='Comma-separated worker counts (default: 2 and the CPU count)')
+    parser.add_argument('--repeats', type=int, default=1, help='Runs per setting, best is reported (default: 1)')
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    worker_counts = ([int(n) for n in args.workers.split(',')] if args.workers
+                     else sorted({2, max(2, cpus)}))
+    work_dir = tempfile.mkdtemp(prefix='xml_bench_')
+    input_path = args.input
+    try:
+        if input_path is None:
+            input_path = os.path.join(work_dir, 'input.xml')
+            write_synthetic_input(input_path, args.mb)
+        out_dir = os.path.join(work_dir, 'out')
+        os.mkdir(out_dir)
+        input_mb = os.path.getsize(input_path) / (1024 * 1024)
+
+        print("=" * 80)
+        print(f"⏱️  Record worker benchmark: {input_mb:,.0f} MB, {cpus} CPUs, {args.format}")
+        print(f"   {build_description()}")
+        print("=" * 80)
+        settings = [(None, 1)] + [(backend, n) for backend in ('processes', 'threads') for n in worker_counts]
+        baseline = None
+        for backend, workers in settings:
+            seconds = min(run_once(input_path, out_dir, args.record_tag, args.format, backend, workers)
+                          for _ in range(max(1, args.repeats)))
+            baseline = baseline or seconds
+            label = f"{backend} x{workers}" if backend else "single process"
+            print(f"   {label:<16} {seconds:7.2f}s  {input_mb / seconds:7.1f} MB/s  "
+                  f"{baseline / seconds:5.2f}x")
+        print("=" * 80)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
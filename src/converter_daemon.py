@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Long-lived daemon for the XML to TXT Converter
+Keeps warm converter instances and a warm worker pool behind a local Unix socket,
+so small conversions no longer pay interpreter start, imports and regex compilation
+"""
+
+import io
+import json
+import os
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from contextlib import redirect_stdout
+from multiprocessing import Manager, Pool
+
+from xml_converter import XMLToTXTConverter, build_arg_parser, converter_kwargs_from_args
+
+# Per worker process: the most recently used converter instances keyed by their settings
+# (each holds its own text caches, so only a few are kept warm)
+_CONVERTERS = OrderedDict()
+_MAX_CONVERTERS = 4
+
+# Settings whose files (--survey-report, --quality-filter boilerplate=, --scrub phrases=) the
+# converter reads when it is built, relative to the client's working directory
+_FILE_SETTINGS = ('survey_report', 'quality_filter', 'scrub')
+
+# Flags that select other modes than a plain conversion
+_UNSUPPORTED_MODES = ('sample', 'build_index', 'get_record', 'get_key', 'autotune',
+                      'queue_init', 'queue_work', 'queue_status', 'daemon_serve')
+
+
+class _ArgumentError(Exception):
+    pass
+
+
+class _QueueWriter(io.TextIOBase):
+    """stdout replacement that forwards converter output to the client."""
+
+    def __init__(self, messages):
+        self._messages = messages
+
+    def write(self, text: str) -> int:
+        if text:
+            self._messages.put({'type': 'log', 'text': text})
+        return len(text)
+
+
+def _parse_job(argv):
+    parser = build_arg_parser()
+
+    def fail(message):
+        raise _ArgumentError(message)
+
+    parser.error = fail
+    args = parser.parse_args(argv)
+    for mode in _UNSUPPORTED_MODES:
+        value = getattr(args, mode)
+        if value not in (None, False, 0):
+            raise _ArgumentError(f"--{mode.replace('_', '-')} is not supported by the daemon")
+    if not args.input or not args.output_base:
+        raise _ArgumentError("input and output_base are required")
+    return args
+
+
+def _job_kwargs(args) -> dict:
+    """Converter settings for a job. Pool workers are daemonic processes, which may not
+    start record worker processes of their own: jobs always format in their pool worker.
+    """
+    kwargs = converter_kwargs_from_args(args)
+    kwargs['use_parallel'] = False
+    return kwargs
+
+
+def _converter_key(kwargs: dict, cwd: str) -> str:
+    """Warm converter key: its settings, plus the directory its settings files were read from."""
+    reads_files = any(kwargs.get(name) for name in _FILE_SETTINGS)
+    return json.dumps([kwargs, cwd if reads_files else None], sort_keys=True)
+
+
+def _run_job(request: dict, messages):
+    """Worker side: run one conversion on a warm converter, streaming output back."""
+    try:
+        args = _parse_job(request['argv'])
+        kwargs = _job_kwargs(args)
+        # Relative paths (settings files, input, output) are the client's
+        os.chdir(request.get('cwd') or os.getcwd())
+        key = _converter_key(kwargs, os.getcwd())
+        converter = _CONVERTERS.get(key)
+        if converter is None:
+            converter = _CONVERTERS[key] = XMLToTXTConverter(**kwargs)
+            while len(_CONVERTERS) > _MAX_CONVERTERS:
+                _CONVERTERS.popitem(last=False)
+        _CONVERTERS.move_to_end(key)
+        converter.reset_statistics()
+        converter.progress_callback = lambda progress: messages.put({'type': 'progress', **progress})
+
+        start = time.time()
+        with redirect_stdout(_QueueWriter(messages)):
+            converter.convert(args.input, args.output_base, args.start_element, args.file_part)
+        messages.put({
+            'type': 'done',
+            'seconds': time.time() - start,
+            'characters': converter.char_count,
+            'tokens': converter.token_count,
+            'pid': os.getpid(),
+        })
+    except SystemExit:
+        # argparse --help / --version
+        messages.put({'type': 'error', 'message': 'help is only available from xml_converter.py --help'})
+    except Exception as e:
+        messages.put({'type': 'error', 'message': f"{type(e).__name__}: {e}"})
+    finally:
+        messages.put(None)
+
+
+def _warm_worker():
+    """Pool initializer: build a default converter so the first job starts warm."""
+    kwargs = _job_kwargs(build_arg_parser().parse_args(['_', '_']))
+    _CONVERTERS[_converter_key(kwargs, os.getcwd())] = XMLToTXTConverter(**kwargs)
+
+
+class _ConverterServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, pool, manager, workers):
+        super().__init__(socket_path, _JobHandler)
+        self.pool = pool
+        self.manager = manager
+        self.workers = workers
+        self.jobs_served = 0
+        self.lock = threading.Lock()
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+
+    def _send(self, message: dict):
+        self.wfile.write(json.dumps(message).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            self._send({'type': 'error', 'message': 'invalid request'})
+            return
+
+        server = self.server
+        cmd = request.get('cmd')
+        if cmd == 'ping':
+            self._send({'type': 'done', 'pid': os.getpid(), 'workers': server.workers,
+                        'jobs': server.jobs_served})
+            return
+        if cmd == 'stop':
+            self._send({'type': 'done'})
+            threading.Thread(target=server.shutdown, daemon=True).start()
+            return
+        if cmd != 'convert':
+            self._send({'type': 'error', 'message': f"unknown command {cmd!r}"})
+            return
+
+        messages = server.manager.Queue()
+        server.pool.apply_async(_run_job, (request, messages))
+        try:
+            while True:
+                message = messages.get()
+                if message is None:
+                    break
+                self._send(message)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away; the job still finishes in the pool
+            pass
+        with server.lock:
+            server.jobs_served += 1
+
+
+def serve(socket_path: str, workers: int = 2):
+    """Run the daemon until a client sends stop (or Ctrl+C)."""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    with Manager() as manager, Pool(workers, initializer=_warm_worker) as pool:
+        server = _ConverterServer(socket_path, pool, manager, workers)
+        print(f"🛰️  Converter daemon listening on {socket_path} (PID {os.getpid()}, {workers} workers)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+        print(f"🛰️  Converter daemon stopped ({server.jobs_served} jobs served)")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Batched quality filter for the XML to TXT Converter
+Judges records by character-class ratios, repeated lines, line lengths and
+boilerplate markers before they are formatted; rejected records are never written.
+Character classes are counted with bytes.translate and bytes.count (no temporary arrays).
+"""
+
+from collections import Counter
+from typing import List, Optional
+
+DEFAULT_THRESHOLDS = {
+    'min_alpha': 0.5,         # letters / non-space chars
+    'max_digits': 0.3,        # digits / non-space chars
+    'max_punct': 0.3,         # ASCII punctuation / non-space chars
+    'max_dup_lines': 0.3,     # repeated non-empty lines / non-empty lines
+    'min_line_chars': 0,      # mean chars per line (0 = off)
+    'max_line_chars': 0,      # mean chars per line (0 = off)
+    'max_boilerplate': 2,     # boilerplate marker hits per record
+    'min_chars': 0,           # non-space chars per record (0 = off)
+    'batch': 256,             # records judged together
+}
+
+# Children holding record metadata rather than content (MediaWiki revision fields);
+# their numbers would count as digits in short but real pages
+DEFAULT_METADATA_TAGS = ['id', 'ns', 'parentid', 'timestamp', 'sha1', 'model', 'format', 'origin']
+
+# Spilled text nodes (--stream-text-mb) are judged on their first million characters
+_SPILL_SAMPLE_CHARS = 1_000_000
+
+DEFAULT_BOILERPLATE = [
+    'lorem ipsum', 'all rights reserved', 'cookie policy', 'privacy policy', 'terms of use',
+    'javascript is disabled', 'enable javascript', 'click here', 'subscribe to our newsletter',
+    'sign up for our newsletter', 'this page intentionally left blank',
+]
+
+# Byte classes: letters, digits, punctuation, spaces, newlines, other.
+# Non-ASCII characters count once as letters (lead byte) and their continuation bytes are dropped.
+_ALPHA, _DIGIT, _PUNCT, _SPACE, _NEWLINE, _OTHER = b'adpsno'
+_CLASSES = bytearray([_OTHER]) * 256
+for _b in range(256):
+    _c = chr(_b)
+    if _b >= 0xC0 or _c.isascii() and _c.isalpha():
+        _CLASSES[_b] = _ALPHA
+    elif _c.isascii() and _c.isdigit():
+        _CLASSES[_b] = _DIGIT
+    elif _c in '!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~':
+        _CLASSES[_b] = _PUNCT
+    elif _c in ' \t\r\x0b\x0c':
+        _CLASSES[_b] = _SPACE
+    elif _c == '\n':
+        _CLASSES[_b] = _NEWLINE
+_CLASS_TABLE = bytes(_CLASSES)
+_CONTINUATION = bytes(range(0x80, 0xC0))
+
+
+def parse_thresholds(spec: Optional[str]) -> dict:
+    """Parse 'default' or 'min_alpha=0.6,max_dup_lines=0.2,boilerplate=markers.txt,metadata=id|date'."""
+    thresholds = dict(DEFAULT_THRESHOLDS, boilerplate=None, metadata='|'.join(DEFAULT_METADATA_TAGS))
+    if not spec or spec == 'default':
+        return thresholds
+    for item in spec.split(','):
+        name, sep, value = item.partition('=')
+        name = name.strip()
+        if not sep or name not in thresholds:
+            raise ValueError(f"Invalid quality setting {item!r} "
+                             f"(known: {', '.join(sorted(thresholds))})")
+        thresholds[name] = value.strip() if name in ('boilerplate', 'metadata') else float(value)
+    return thresholds
+
+
+class QualityFilter:
+    """Computes per-record quality metrics on batches and returns reject reasons."""
+
+    def __init__(self, spec: Optional[str] = None):
+        self.thresholds = parse_thresholds(spec)
+        self.batch_size = max(1, int(self.thresholds['batch']))
+        markers = DEFAULT_BOILERPLATE
+        if self.thresholds['boilerplate']:
+            with open(self.thresholds['boilerplate'], 'r', encoding='utf-8') as f:
+                markers = [line.strip() for line in f if line.strip()]
+        # Lowercase substring counts (str.count) are far cheaper than an IGNORECASE alternation
+        self._boilerplate = [marker.lower() for marker in markers]
+        self._metadata = frozenset(tag.strip() for tag in self.thresholds['metadata'].split('|') if tag.strip())
+        self.checked = 0
+        self.rejected = Counter()
+
+    def record_text(self, element) -> str:
+        """Raw text of a record without its metadata children (spilled text nodes: their head)."""
+        texts = []
+        for node in element.iter():
+            tag = node.tag
+            if isinstance(tag, str) and tag.rpartition('}')[2] not in self._metadata:
+                texts.append(node.text)
+            if node is not element:
+                texts.append(node.tail)
+        return '\n'.join(text if isinstance(text, str) else text.head(_SPILL_SAMPLE_CHARS)
+                         for text in texts if text and text.strip())
+
+    def _class_counts(self, encoded: List[bytes]) -> List[tuple]:
+        """(alpha, digit, punct, space, newline) byte-class counts per record."""
+        result = []
+        for data in encoded:
+            classes = data.translate(_CLASS_TABLE, _CONTINUATION)
+            result.append((classes.count(_ALPHA), classes.count(_DIGIT), classes.count(_PUNCT),
+                           classes.count(_SPACE), classes.count(_NEWLINE)))
+        return result
+
+    def _boilerplate_hits(self, lowered: str) -> int:
+        return sum(lowered.count(marker) for marker in self._boilerplate)
+
+    def evaluate(self, texts: List[str]) -> List[Optional[str]]:
+        """Reject reason per text (None = keep)."""
+        t = self.thresholds
+        encoded = [text.encode('utf-8') for text in texts]
+        verdicts = []
+        for text, (alpha, digit, punct, space, newline) in zip(texts, self._class_counts(encoded)):
+            self.checked += 1
+            visible = max(1, len(text) - space - newline)
+            lines = [line.strip() for line in text.split('\n')]
+            lines = [line for line in lines if line]
+            mean_line = sum(map(len, lines)) / len(lines) if lines else 0
+
+            reason = None
+            if t['min_chars'] and visible < t['min_chars']:
+                reason = 'too_short'
+            elif alpha / visible < t['min_alpha']:
+                reason = 'low_alpha'
+            elif digit / visible > t['max_digits']:
+                reason = 'digits'
+            elif punct / visible > t['max_punct']:
+                reason = 'punctuation'
+            elif len(lines) > 1 and 1 - len(set(lines)) / len(lines) > t['max_dup_lines']:
+                reason = 'dup_lines'
+            elif t['min_line_chars'] and mean_line < t['min_line_chars']:
+                reason = 'short_lines'
+            elif t['max_line_chars'] and mean_line > t['max_line_chars']:
+                reason = 'long_lines'
+            elif self._boilerplate and self._boilerplate_hits(text[:100_000].lower()) > t['max_boilerplate']:
+                reason = 'boilerplate'
+            if reason:
+                self.rejected[reason] += 1
+            verdicts.append(reason)
+        return verdicts
+
+    def summary(self) -> str:
+        total = sum(self.rejected.values())
+        reasons = ', '.join(f"{reason} {n:,}" for reason, n in self.rejected.most_common())
+        return (f"{total:,} of {self.checked:,} records rejected"
+                + (f" ({reasons})" if reasons else ""))
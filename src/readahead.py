@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Read-ahead input stage for the XML to TXT Converter
+A background thread reads large blocks with readinto() into a small pool of
+reusable buffers while the main thread parses and formats the previous ones,
+so disk latency overlaps with CPU work instead of adding to it
+"""
+
+import os
+import queue
+import threading
+import xml.etree.ElementTree as ET
+from typing import Optional
+
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+DEFAULT_DEPTH = 4
+# The parser is fed slices of a block: each feed builds all elements of the slice at once,
+# and a small slice keeps that backlog (and the GC work over it) as small as iterparse's
+FEED_SIZE = 64 * 1024
+
+
+class ReadAheadReader:
+    """Iterate over the blocks of a file (path or binary file object) read by a background thread.
+
+    At most `depth` buffers of `block_size` bytes exist; a buffer is handed back
+    to the reader thread once the consumer asks for the next block, so each
+    yielded memoryview is only valid until then.
+    """
+
+    def __init__(self, source, block_size: int = DEFAULT_BLOCK_SIZE, depth: int = DEFAULT_DEPTH):
+        self.block_size = block_size
+        self.depth = max(1, depth)
+        self._close_source = isinstance(source, (str, os.PathLike))
+        self._file = open(source, 'rb', buffering=0) if self._close_source else source
+        self.total_bytes = self._size(self._file)
+        self.bytes_read = 0  # bytes read from disk (reader thread)
+        self.bytes_consumed = 0  # bytes handed to the parser (for progress/ETA)
+        self.stalls = 0  # times the parser had to wait for the disk
+        self._advise_sequential()
+
+        self._free = queue.Queue()
+        for _ in range(self.depth):
+            self._free.put(bytearray(block_size))
+        self._filled = queue.Queue()
+        self._error = None
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='xml-readahead', daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _size(f) -> Optional[int]:
+        size = getattr(f, 'size', None)
+        if size is not None:
+            return size
+        try:
+            return os.fstat(f.fileno()).st_size - f.tell()
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    def _advise_sequential(self):
+        # Doubles the kernel's read-ahead window on Linux; a no-op where unsupported
+        if not hasattr(os, 'posix_fadvise'):
+            return
+        try:
+            os.posix_fadvise(self._file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except (AttributeError, OSError, ValueError):
+            pass
+
+    def _run(self):
+        try:
+            while not self._stopped:
+                buffer = self._free.get()
+                if buffer is None:
+                    break
+                n = self._file.readinto(buffer)
+                if not n:
+                    break
+                self.bytes_read += n
+                self._filled.put((buffer, n))
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._filled.put(None)
+
+    def __iter__(self):
+        try:
+            while True:
+                if self._filled.empty():
+                    self.stalls += 1
+                item = self._filled.get()
+                if item is None:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                buffer, n = item
+                self.bytes_consumed += n
+                yield memoryview(buffer)[:n]
+                self._free.put(buffer)
+        finally:
+            self.close()
+
+    def close(self):
+        if not self._stopped:
+            self._stopped = True
+            self._free.put(None)  # wake the thread if it waits for a buffer
+            self._thread.join()
+            if self._close_source:
+                self._file.close()
+
+
+def iter_events(reader: ReadAheadReader, parser=None):
+    """Like ET.iterparse(source, events=('start', 'end')), fed from a ReadAheadReader.
+
+    parser may be any object with feed/read_events/close (default: ET.XMLPullParser).
+    """
+    if parser is None:
+        parser = ET.XMLPullParser(events=('start', 'end'))
+    for block in reader:
+        for start in range(0, len(block), FEED_SIZE):
+            parser.feed(block[start:start + FEED_SIZE])
+            yield from parser.read_events()
+    parser.close()
+    yield from parser.read_events()
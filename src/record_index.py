@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Persistent record offset index for the XML to TXT Converter
+Maps record ordinal -> (byte offset, length, key) for random access to single records
+"""
+
+import html
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Optional, List, Tuple
+
+from record_scan import open_mmap, find_record_start, find_record_end, root_tags
+
+# File layout (little endian):
+#   header   magic, version, record count, input size, input mtime (ns),
+#            tag length, offsets of the key blob and the sorted key table
+#   tag      record tag (utf-8)
+#   entries  one ENTRY per record, in input order (ordinal = position)
+#   keys     utf-8 keys, concatenated
+#   sorted   record ordinals sorted by key (binary search by key)
+INDEX_MAGIC = b'XMLTXIDX'
+INDEX_VERSION = 2
+HEADER = struct.Struct('<8sIQQqIQQ')
+ENTRY = struct.Struct('<QQQI')   # input offset, length, key offset, key length
+ORDINAL = struct.Struct('<Q')
+
+# Keys tried in order when key='auto'
+AUTO_KEYS = ('title', 'id', '@id')
+
+
+def _extract_key(buf, start: int, end: int, key: str) -> bytes:
+    """Extract the key of one record from its raw bytes (no parsing)."""
+    if key.startswith('@'):
+        gt = buf.find(b'>', start, end)
+        needle = b' ' + key[1:].encode('utf-8') + b'='
+        idx = buf.find(needle, start, gt)
+        if idx < 0:
+            return b''
+        quote_pos = idx + len(needle)
+        quote = buf[quote_pos:quote_pos + 1]
+        close = buf.find(quote, quote_pos + 1, gt)
+        if close < 0:
+            return b''
+        return html.unescape(bytes(buf[quote_pos + 1:close]).decode('utf-8', 'replace')).encode('utf-8')
+
+    needle = b'<' + key.encode('utf-8')
+    pos = buf.find(b'>', start, end) + 1   # skip the record's own start tag
+    while True:
+        idx = buf.find(needle, pos, end)
+        if idx < 0:
+            return b''
+        after = idx + len(needle)
+        nxt = buf[after:after + 1]
+        if nxt == b'>':
+            text_start = after + 1
+            break
+        if nxt in (b' ', b'\t', b'\r', b'\n'):
+            gt = buf.find(b'>', after, end)
+            if buf[gt - 1:gt] == b'/':
+                return b''
+            text_start = gt + 1
+            break
+        pos = after
+    text_end = buf.find(b'<', text_start, end)
+    raw = bytes(buf[text_start:text_end]).strip()
+    # All entities and character references (MediaWiki writes quotes as &quot;)
+    return html.unescape(raw.decode('utf-8', 'replace')).encode('utf-8')
+
+
+def build_index(input_path: str, index_path: str, record_tag: str, key: str = 'auto') -> int:
+    """Scan input for <record_tag> records and write the index. Returns record count."""
+    tag = record_tag.encode('utf-8')
+    keys_to_try = AUTO_KEYS if key == 'auto' else (key,)
+    # Column arrays keep the in-memory cost at ~28 bytes per record
+    offsets, lengths = array('Q'), array('Q')
+    key_offsets, key_lengths = array('Q'), array('I')
+    key_blob = bytearray()
+
+    start_time = time.time()
+    input_stat = os.stat(input_path)
+    f, mm = open_mmap(input_path)
+    try:
+        _, _, pos = root_tags(mm)
+        chosen_key = None
+        while True:
+            start = find_record_start(mm, tag, pos)
+            if start < 0:
+                break
+            end = find_record_end(mm, tag, start)
+            if end < 0:
+                break
+
+            if chosen_key is None:
+                # Lock in the first key that the first record actually has
+                chosen_key = next((k for k in keys_to_try if _extract_key(mm, start, end, k)),
+                                  keys_to_try[-1])
+            record_key = _extract_key(mm, start, end, chosen_key)
+
+            offsets.append(start)
+            lengths.append(end - start)
+            key_offsets.append(len(key_blob))
+            key_lengths.append(len(record_key))
+            key_blob += record_key
+            pos = end
+
+            if len(offsets) % 100000 == 0:
+                elapsed = time.time() - start_time
+                print(f"\r  ... indexed {len(offsets):,} records | {end / (1024**3):.2f} GB "
+                      f"| {end / (1024**2) / max(elapsed, 1e-9):.0f} MB/s", end='', flush=True)
+    finally:
+        mm.close()
+        f.close()
+
+    count = len(offsets)
+
+    def sort_key(ordinal):
+        key_off = key_offsets[ordinal]
+        return bytes(key_blob[key_off:key_off + key_lengths[ordinal]])
+
+    sorted_ordinals = array('Q', sorted(range(count), key=sort_key))
+
+    tag_bytes = record_tag.encode('utf-8')
+    entries_offset = HEADER.size + len(tag_bytes)
+    key_blob_offset = entries_offset + ENTRY.size * count
+    sorted_offset = key_blob_offset + len(key_blob)
+
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'wb', buffering=4*1024*1024) as out:
+        out.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, count,
+                              input_stat.st_size, input_stat.st_mtime_ns, len(tag_bytes),
+                              key_blob_offset, sorted_offset))
+        out.write(tag_bytes)
+        for i in range(count):
+            out.write(ENTRY.pack(offsets[i], lengths[i], key_offsets[i], key_lengths[i]))
+        out.write(key_blob)
+        if sys.byteorder != 'little':
+            sorted_ordinals.byteswap()
+        out.write(sorted_ordinals.tobytes())
+    os.replace(tmp_path, index_path)
+
+    if count >= 100000:
+        print()
+    return count
+
+
+class RecordIndex:
+    """Read-only, mmap-backed view of an index written by build_index()."""
+
+    def __init__(self, index_path: str):
+        self.path = index_path
+        self._file = open(index_path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = struct.unpack_from('<8sI', self._mm, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(f"{index_path} is not a record index (or has an unsupported version; "
+                             f"rebuild it with --build-index)")
+        (_, _, self.count, self.input_size, self.input_mtime_ns, tag_len,
+         self._key_blob_offset, self._sorted_offset) = HEADER.unpack_from(self._mm, 0)
+        self.record_tag = self._mm[HEADER.size:HEADER.size + tag_len].decode('utf-8')
+        self._entries_offset = HEADER.size + tag_len
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def stale_reason(self, input_path: str) -> Optional[str]:
+        """Why the index no longer describes input_path (size or mtime changed), or None."""
+        st = os.stat(input_path)
+        if st.st_size != self.input_size:
+            return f"input is {st.st_size:,} bytes, index was built for {self.input_size:,}"
+        if st.st_mtime_ns != self.input_mtime_ns:
+            return "input was modified after the index was built"
+        return None
+
+    def entry(self, ordinal: int) -> Tuple[int, int, str]:
+        """(input offset, length, key) of record number ordinal (0-based)."""
+        if not 0 <= ordinal < self.count:
+            raise IndexError(f"Record {ordinal} out of range (index has {self.count:,} records)")
+        offset, length, key_off, key_len = ENTRY.unpack_from(
+            self._mm, self._entries_offset + ordinal * ENTRY.size)
+        start = self._key_blob_offset + key_off
+        return offset, length, self._mm[start:start + key_len].decode('utf-8')
+
+    def _key_at(self, sorted_pos: int) -> bytes:
+        ordinal = ORDINAL.unpack_from(self._mm, self._sorted_offset + sorted_pos * ORDINAL.size)[0]
+        _, _, key_off, key_len = ENTRY.unpack_from(
+            self._mm, self._entries_offset + ordinal * ENTRY.size)
+        start = self._key_blob_offset + key_off
+        return self._mm[start:start + key_len]
+
+    def find(self, key: str) -> Optional[int]:
+        """Ordinal of the (first) record with this key, or None (binary search)."""
+        target = key.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._key_at(lo) == target:
+            return ORDINAL.unpack_from(self._mm, self._sorted_offset + lo * ORDINAL.size)[0]
+        return None
+
+    def split(self, parts: int) -> List[Tuple[int, int, int, int]]:
+        """Split into parts with equal record counts.
+
+        Returns (first ordinal, end ordinal, byte start, byte end) per part,
+        for parallel workers that need balanced work units.
+        """
+        ranges = []
+        parts = max(1, min(parts, self.count))
+        for i in range(parts):
+            first = self.count * i // parts
+            last = self.count * (i + 1) // parts
+            if first >= last:
+                continue
+            byte_start = self.entry(first)[0]
+            end_offset, end_length, _ = self.entry(last - 1)
+            ranges.append((first, last, byte_start, end_offset + end_length))
+        return ranges
+
+
+def read_record(index: RecordIndex, input_path: str, ordinal: int) -> bytes:
+    """Raw bytes of one record (a single seek + read); refuses a stale index."""
+    reason = index.stale_reason(input_path)
+    if reason is not None:
+        raise ValueError(f"{index.path} is stale ({reason}); rebuild it with --build-index")
+    offset, length, _ = index.entry(ordinal)
+    with open(input_path, 'rb') as f:
+        f.seek(offset)
+        return f.read(length)
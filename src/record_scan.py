@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Byte-level record scanning for the XML to TXT Converter
+Finds record boundaries in raw (mmap'ed) XML without building a tree
+"""
+
+import mmap
+import re
+import xml.etree.ElementTree as ET
+from collections import Counter
+from typing import Optional, Set, Tuple
+
+# Characters that may follow a tag name inside a start tag
+_TAG_NAME_END = b' \t\r\n>/'
+
+
+def open_mmap(path: str):
+    """Open a file read-only as mmap (returns (file, mmap))."""
+    f = open(path, 'rb')
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Empty file cannot be mapped
+        f.close()
+        raise
+    return f, mm
+
+
+def find_record_start(buf, tag: bytes, pos: int, end: Optional[int] = None) -> int:
+    """Offset of the next ``<tag`` start tag at or after pos, or -1."""
+    needle = b'<' + tag
+    limit = len(buf) if end is None else end
+    while True:
+        idx = buf.find(needle, pos, limit)
+        if idx < 0:
+            return -1
+        after = idx + len(needle)
+        if after < len(buf) and buf[after:after + 1] in (b' ', b'\t', b'\r', b'\n', b'>', b'/'):
+            return idx
+        pos = after
+
+
+class NestedRecordError(ValueError):
+    """A record contains another record with the same tag (byte scanning cannot split those)."""
+
+
+def record_names(buf, tag: bytes, pos: int = 0, sniff_bytes: int = 4 * 1024 * 1024) -> Tuple[Set[bytes], bool]:
+    """(names the record tag is written with, True if records nest) in sniff_bytes from pos.
+
+    Record tags are local names, so ``<mw:item>`` is an ``item`` record; the
+    byte scanner has to look for the name as written.
+    """
+    pattern = re.compile(rb'<(/?)((?:[\w.-]+:)?' + re.escape(tag) + rb')(?=[\s>/])')
+    names = set()
+    nested = False
+    depth = 0
+    for match in pattern.finditer(buf, pos, min(len(buf), pos + sniff_bytes)):
+        closing, name = match.groups()
+        names.add(name)
+        if closing:
+            depth = max(0, depth - 1)
+            continue
+        gt = buf.find(b'>', match.end())
+        if gt > 0 and buf[gt - 1:gt] != b'/':
+            depth += 1
+            nested = nested or depth > 1
+    return names, nested
+
+
+def find_record_end(buf, tag: bytes, start: int, strict: bool = False) -> int:
+    """Offset just past the end of the record starting at start, or -1.
+
+    Records must not nest inside themselves (true for page/item/entry style
+    record tags); with strict, a nested record raises NestedRecordError instead
+    of giving a cut-off span. Self-closing records (``<tag .../>``) are supported.
+    """
+    gt = buf.find(b'>', start)
+    if gt < 0:
+        return -1
+    if buf[gt - 1:gt] == b'/':
+        return gt + 1
+    close = b'</' + tag
+    pos = gt + 1
+    while True:
+        idx = buf.find(close, pos)
+        if idx < 0:
+            return -1
+        after = idx + len(close)
+        gt = buf.find(b'>', after)
+        if gt < 0:
+            return -1
+        if not buf[after:gt].strip():
+            if strict and find_record_start(buf, tag, start + 1, idx) >= 0:
+                raise NestedRecordError(
+                    f"<{tag.decode('utf-8', 'replace')}> records nest inside each other (record at byte {start})")
+            return gt + 1
+        pos = after
+
+
+def iter_record_spans(buf, tag: bytes, pos: int = 0):
+    """Yield (start, end) offsets of consecutive records from pos on (NestedRecordError on nesting)."""
+    while True:
+        start = find_record_start(buf, tag, pos)
+        if start < 0:
+            return
+        end = find_record_end(buf, tag, start, strict=True)
+        if end < 0:
+            return
+        yield start, end
+        pos = end
+
+
+def root_tags(buf) -> Tuple[bytes, bytes, int]:
+    """Return (root start tag, root end tag, offset after the root start tag).
+
+    Fragments wrapped in the root start tag keep its namespace declarations,
+    so tags parse exactly as they do in a full iterparse run.
+    """
+    pos = 0
+    while True:
+        lt = buf.find(b'<', pos)
+        if lt < 0:
+            raise ValueError("No root element found")
+        nxt = buf[lt + 1:lt + 2]
+        if nxt == b'?':
+            pos = buf.find(b'?>', lt) + 2
+        elif nxt == b'!':
+            if buf[lt:lt + 4] == b'<!--':
+                pos = buf.find(b'-->', lt) + 3
+            else:
+                pos = buf.find(b'>', lt) + 1
+        else:
+            gt = buf.find(b'>', lt)
+            start_tag = bytes(buf[lt:gt + 1])
+            name_end = lt + 1
+            while buf[name_end:name_end + 1] not in _TAG_NAME_END:
+                name_end += 1
+            name = bytes(buf[lt + 1:name_end])
+            return start_tag, b'</' + name + b'>', gt + 1
+        if pos <= 1:
+            raise ValueError("Malformed XML prolog")
+
+
+def parse_record(raw, root_open: bytes, root_close: bytes):
+    """Parse one raw record slice into an Element (inside its original root)."""
+    parser = ET.XMLParser()
+    parser.feed(root_open)
+    parser.feed(raw)
+    parser.feed(root_close)
+    root = parser.close()
+    return root[0], root
+
+
+def detect_record_tag(path: str, sniff_bytes: int = 4 * 1024 * 1024,
+                      clean=lambda tag: tag.split('}', 1)[1] if '}' in tag else tag) -> Optional[str]:
+    """Guess the record tag: the most frequent child tag of the root in the file head."""
+    counts = Counter()
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    depth = 0
+    with open(path, 'rb') as f:
+        data = f.read(sniff_bytes)
+    try:
+        parser.feed(data)
+        for event, elem in parser.read_events():
+            if event == 'start':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 1:
+                    counts[clean(elem.tag)] += 1
+    except ET.ParseError:
+        pass
+    if not counts:
+        return None
+    tag, count = counts.most_common(1)[0]
+    return tag
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Random-sample preview mode for the XML to TXT Converter
+Converts a few records at random byte offsets and extrapolates a full run
+"""
+
+import os
+import random
+import time
+from pathlib import Path
+
+from record_scan import (open_mmap, find_record_start, find_record_end,
+                         root_tags, parse_record, detect_record_tag)
+
+
+def _format_size(bytes_size: float) -> str:
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if bytes_size < 1024.0:
+            return f"{bytes_size:.2f} {unit}"
+        bytes_size /= 1024.0
+    return f"{bytes_size:.2f} PB"
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rem = divmod(seconds, 3600)
+    minutes, secs = divmod(rem, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {secs:02d}s"
+    return f"{secs}s"
+
+
+def run_sample(converter, input_path: str, samples: int = 20, records_per_sample: int = 5,
+               seed: int = None, preview_lines: int = 40) -> dict:
+    """Seek to random offsets, convert a few records at each and estimate the full run.
+
+    Only the sampled records are read (via mmap), so the run takes seconds
+    regardless of input size. Returns the estimates as a dict.
+    """
+    record_tag = converter.record_tag or detect_record_tag(input_path, clean=converter._clean_tag_name)
+    if not record_tag:
+        raise ValueError("Could not detect a record tag, please pass --record-tag")
+    tag = record_tag.encode('utf-8')
+
+    file_size = os.path.getsize(input_path)
+    rng = random.Random(seed)
+    f, mm = open_mmap(input_path)
+
+    spans = []          # distance between consecutive record starts (input bytes per record)
+    out_bytes = []      # output bytes per record
+    elements = 0
+    tokens_before = converter.token_count
+    format_time = 0.0
+    preview = None
+
+    try:
+        root_open, root_close, data_start = root_tags(mm)
+        root_tag = converter._clean_tag_name(root_close[2:-1].decode('utf-8'))
+
+        offsets = sorted(rng.randrange(data_start, file_size) for _ in range(samples))
+        offsets[0] = data_start  # always include the head so the preview is deterministic
+
+        sampled = set()  # record starts already converted: offsets close together share records
+        for offset in offsets:
+            pos = find_record_start(mm, tag, offset)
+            taken = 0
+            while taken < records_per_sample and pos >= 0:
+                end = find_record_end(mm, tag, pos)
+                if end < 0:
+                    break
+                next_pos = find_record_start(mm, tag, end)
+                if pos in sampled:
+                    pos = next_pos
+                    continue
+                sampled.add(pos)
+                taken += 1
+                if next_pos >= 0:
+                    spans.append(next_pos - pos)
+
+                t0 = time.perf_counter()
+                elem, _ = parse_record(mm[pos:end], root_open, root_close)
+                text = '\n'.join(converter._format_record(elem, root_tag))
+                format_time += time.perf_counter() - t0
+
+                elements += sum(1 for _ in elem.iter())
+                out_bytes.append(len(text.encode('utf-8')))
+                if preview is None:
+                    preview = text
+                pos = next_pos
+    finally:
+        mm.close()
+        f.close()
+
+    if not out_bytes:
+        raise ValueError(f"No <{record_tag}> records found in {input_path}")
+
+    records = len(out_bytes)
+    mean_span = (sum(spans) / len(spans)) if spans else (file_size - data_start)
+    est_records = max(records, int((file_size - data_start) / mean_span))
+    mean_out = sum(out_bytes) / records
+    tokens_per_record = (converter.token_count - tokens_before) / records
+    sec_per_record = format_time / records if format_time > 0 else 0.0
+    elements_per_record = elements / records
+
+    estimate = {
+        'record_tag': record_tag,
+        'sampled_records': records,
+        'input_bytes': file_size,
+        'estimated_records': est_records,
+        'estimated_output_bytes': int(mean_out * est_records),
+        'estimated_tokens': int(tokens_per_record * est_records),
+        'elements_per_sec': (elements / format_time) if format_time > 0 else 0.0,
+        'estimated_seconds': sec_per_record * est_records,
+    }
+
+    if preview_lines and preview:
+        print("👀 Preview (first sampled record):")
+        print("-" * 70)
+        lines = preview.split('\n')
+        print('\n'.join(lines[:preview_lines]))
+        if len(lines) > preview_lines:
+            print(f"... ({len(lines) - preview_lines} more lines)")
+        print("-" * 70)
+        print()
+
+    print("📈 Full-run estimate (extrapolated from sample):")
+    print(f"   • Input: {Path(input_path).name} ({_format_size(file_size)})")
+    print(f"   • Record tag: <{record_tag}> | Sampled: {records} records at {samples} offsets")
+    print(f"   • Records: ~{est_records:,}")
+    print(f"   • Output size: ~{_format_size(estimate['estimated_output_bytes'])} "
+          f"({estimate['estimated_output_bytes'] / max(file_size, 1):.0%} of input)")
+    print(f"   • Tokens: ~{estimate['estimated_tokens']:,}")
+    print(f"   • Speed: ~{int(estimate['elements_per_sec']):,} elem/s "
+          f"({int(elements_per_record)} elements/record)")
+    print(f"   • Wall time: ~{format_duration(estimate['estimated_seconds'])} (formatting only, excludes disk I/O)")
+    return estimate
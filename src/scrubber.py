@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+PII and boilerplate scrubbing for the XML to TXT Converter
+Compiles every configured pattern and phrase list into one alternation regex
+(phrases as a word trie), so each text node is scanned once whatever the number
+of patterns; matches are masked or removed and counted per pattern
+"""
+
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from quality import DEFAULT_BOILERPLATE
+
+# Built-in patterns as (first character class, characters that may not precede it, rest of the match).
+# Written from the first character on, the combined regex starts with one character class, so
+# the regex engine skips straight to digits, '+', '(' and capitals instead of trying every position.
+LEADING_PATTERNS = {
+    'phone': [(r'+', r'[\w+]', r'\d{1,3}[ .-]?(?:\(\d{1,4}\)|\d{1,4})[ .-]?\d{3,4}[ .-]?\d{3,4}(?![\w-])'),
+              (r'(', r'[\w+]', r'\d{3}\)[ .-]?\d{3}[ .-]\d{4}(?![\w-])'),
+              (r'\d', r'[\w+]', r'\d{2}[.-]\d{3}[.-]\d{4}(?![\w-])')],
+    'ipv4': [(r'\d', r'[\w.]', r'\d?\d?(?<![03-9]\d\d)(?<!2[6-9]\d)(?<!25[6-9])'
+                               r'(?:\.(?:25[0-5]|2[0-4]\d|1?\d?\d)){3}(?!\w|\.\d)')],
+    'credit_card': [(r'\d', r'[\w-]', r'\d{3}(?:[ -]?\d{4}){2}[ -]?\d{1,7}(?![\w-])')],
+    'ssn': [(r'\d', r'[\w-]', r'\d{2}-\d{2}-\d{4}(?![\w-])')],
+    'iban': [(r'A-Z', r'\w', r'[A-Z]\d{2}(?: ?[A-Z0-9]{4}){2,7}(?: ?[A-Z0-9]{1,3})?(?!\w)')],
+}
+# Emails start with any word character; the email branch is only added for text containing '@'
+EMAIL_PATTERN = r"(?<![\w.%+-])[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}(?![\w-])"
+BUILTIN_PATTERNS = ['email', *LEADING_PATTERNS]
+DEFAULT_SPEC = 'email,phone,ipv4,credit_card,ssn,iban,boilerplate'
+
+
+def _luhn_valid(number: str) -> bool:
+    digits = [int(c) for c in number if c.isdigit()]
+    if not 13 <= len(digits) <= 19:
+        return False
+    total = 0
+    for i, digit in enumerate(reversed(digits)):
+        if i % 2:
+            digit = digit * 2 - 9 if digit > 4 else digit * 2
+        total += digit
+    return total % 10 == 0
+
+
+def _iban_valid(iban: str) -> bool:
+    iban = iban.replace(' ', '')
+    rearranged = iban[4:] + iban[:4]
+    return int(''.join(str(int(c, 36)) for c in rearranged)) % 97 == 1
+
+
+# Matches that fail their checksum are left alone and not counted
+_VALIDATORS = {'credit_card': _luhn_valid, 'iban': _iban_valid}
+
+
+def leading_pattern(names: List[str]) -> str:
+    """One regex for the given LEADING_PATTERNS, starting with the union of their first characters."""
+    first_chars = dict.fromkeys(first for name in names for first, _, _ in LEADING_PATTERNS[name])
+    groups = [f'(?P<{name}>' + '|'.join(f'(?<=[{first}])(?<!{before}.){rest}'
+                                         for first, before, rest in LEADING_PATTERNS[name]) + ')'
+              for name in names]
+    return '[' + ''.join(first_chars) + '](?:' + '|'.join(groups) + ')'
+
+
+def phrase_pattern(phrases: List[str]) -> str:
+    """Case-insensitive regex for a phrase list, as a word trie (shared prefixes are matched once).
+
+    Words may be separated by any whitespace, and phrases only match whole words.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for word in phrase.lower().split():
+            node = node.setdefault(word, {})
+        node[''] = {}  # end of a phrase
+
+    def render(node) -> str:
+        branches = []
+        for word, child in sorted(node.items(), key=lambda item: -len(item[0])):
+            if not word:
+                continue
+            branch = re.escape(word)
+            if any(child):  # longer phrases continue after this word
+                rest = r'\s+' + render(child)
+                branch += f'(?:{rest})?' if '' in child else rest
+            branches.append(branch)
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    return r'(?<!\w)(?i:' + render(trie) + r')(?!\w)' if trie else ''
+
+
+def parse_spec(spec: Optional[str]) -> dict:
+    """Parse 'default' or 'email,phone,boilerplate,phrases=FILE,patterns=FILE,mode=remove'."""
+    settings = {'patterns': [], 'phrases': None, 'pattern_file': None, 'mode': 'mask'}
+    if not spec or spec == 'default':
+        spec = DEFAULT_SPEC
+    for item in spec.split(','):
+        name, sep, value = (part.strip() for part in item.partition('='))
+        if not sep and name == 'default':
+            settings['patterns'].extend(DEFAULT_SPEC.split(','))
+        elif not sep and (name in BUILTIN_PATTERNS or name == 'boilerplate'):
+            settings['patterns'].append(name)
+        elif name == 'phrases' and value:
+            settings['phrases'] = value
+        elif name == 'patterns' and value:
+            settings['pattern_file'] = value
+        elif name == 'mode' and value in ('mask', 'remove'):
+            settings['mode'] = value
+        else:
+            raise ValueError(f"Invalid scrub setting {item!r} (known: {', '.join(BUILTIN_PATTERNS)}, "
+                             f"boilerplate, phrases=FILE, patterns=FILE, mode=mask|remove)")
+    settings['patterns'] = list(dict.fromkeys(settings['patterns']))
+    return settings
+
+
+def _read_lines(path: str) -> List[str]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+class Scrubber:
+    """Masks or removes PII and boilerplate phrases in one regex pass per text."""
+
+    def __init__(self, spec: Optional[str] = None):
+        settings = parse_spec(spec)
+        self.mode = settings['mode']
+        leading = [name for name in LEADING_PATTERNS if name in settings['patterns']]
+        patterns = {}
+        if settings['pattern_file']:
+            # 'name = regex' per line
+            for line in _read_lines(settings['pattern_file']):
+                name, sep, pattern = (part.strip() for part in line.partition('='))
+                if (not sep or not name.isidentifier() or name in patterns
+                        or name in BUILTIN_PATTERNS or name == 'boilerplate'):
+                    raise ValueError(f"Invalid or duplicate scrub pattern line: {line!r}")
+                re.compile(pattern)
+                patterns[name] = pattern
+        phrases = []
+        if 'boilerplate' in settings['patterns']:
+            phrases.extend(DEFAULT_BOILERPLATE)
+        if settings['phrases']:
+            phrases.extend(_read_lines(settings['phrases']))
+        email = 'email' in settings['patterns']
+        if not (leading or email or phrases or patterns):
+            raise ValueError("No scrub patterns configured")
+
+        # A phrase can only match text holding its longest word, and an email only text
+        # holding '@': two substring checks pick the smallest regex that can match a text
+        self._email = email
+        self._triggers = [max(phrase.lower().split(), key=len) for phrase in phrases]
+        self._regexes = {}
+        for with_email in (False, True):
+            for with_phrases in (False, True):
+                parts = [f'(?P<email>{EMAIL_PATTERN})'] if with_email and email else []
+                if leading:
+                    parts.append(leading_pattern(leading))
+                if with_phrases and phrases:
+                    parts.append(f'(?P<boilerplate>{phrase_pattern(phrases)})')
+                parts.extend(f'(?P<{name}>{pattern})' for name, pattern in patterns.items())
+                self._regexes[with_email, with_phrases] = re.compile('|'.join(parts)) if parts else None
+
+        names = [*leading, *(['email'] if email else []), *(['boilerplate'] if phrases else []), *patterns]
+        # PII is masked ([EMAIL]) unless mode=remove; boilerplate is always removed
+        self._replacements: Dict[str, str] = {
+            name: '' if self.mode == 'remove' or name == 'boilerplate' else f'[{name.upper()}]'
+            for name in names}
+        self.hits = Counter()
+        self._removed = False
+
+    def _replace(self, match) -> str:
+        name = match.lastgroup
+        validate = _VALIDATORS.get(name)
+        if validate is not None and not validate(match.group()):
+            return match.group()
+        self.hits[name] += 1
+        replacement = self._replacements[name]
+        if not replacement:
+            self._removed = True
+        return replacement
+
+    def scrub(self, text: str) -> Tuple[str, bool]:
+        """(scrubbed text, True if a match was removed outright and left a gap behind)."""
+        with_phrases = False
+        if self._triggers:
+            lowered = text.lower()
+            with_phrases = any(word in lowered for word in self._triggers)
+        regex = self._regexes[self._email and '@' in text, with_phrases]
+        if regex is None:
+            return text, False
+        self._removed = False
+        return regex.sub(self._replace, text), self._removed
+
+    def summary(self) -> str:
+        total = sum(self.hits.values())
+        patterns = ', '.join(f"{name} {n:,}" for name, n in self.hits.most_common())
+        return f"{total:,} matches" + (f" ({patterns})" if patterns else "")
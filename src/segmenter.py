@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Training-window segmentation for the XML to TXT Converter
+Splits long record content into windows of at most N characters or tokens,
+cutting at paragraph, line, sentence or word boundaries, with optional overlap
+"""
+
+import re
+from typing import Callable, List, Optional
+
+# Optional exact token counts
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Boundaries from coarse to fine; each split keeps the separator with the left piece
+_BOUNDARIES = [
+    re.compile(r'(?<=\n\n)'),         # paragraphs
+    re.compile(r'(?<=\n)'),           # lines
+    re.compile(r'(?<=[.!?])(?=\s)'),  # sentence ends (the space stays with the next piece)
+    re.compile(r'(?=\s)'),            # words
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Token estimate used throughout the converter (spaces + newlines)."""
+    return text.count(' ') + text.count('\n') + 1
+
+
+class Segmenter:
+    """Pack text into windows of at most `limit` units (chars or tokens)."""
+
+    def __init__(self, max_chars: int = 0, max_tokens: int = 0, overlap: int = 0,
+                 tokenizer: Optional[str] = None):
+        if bool(max_chars) == bool(max_tokens):
+            raise ValueError("Segmentation needs exactly one of max_chars / max_tokens")
+        self.limit = max_chars or max_tokens
+        self.unit = 'chars' if max_chars else 'tokens'
+        if not 0 <= overlap < self.limit:
+            raise ValueError(f"Segment overlap must be between 0 and {self.limit - 1} {self.unit}")
+        self.overlap = overlap
+        self.tokenizer = None
+        if max_chars:
+            self.measure: Callable[[str], int] = len
+        elif tokenizer and TIKTOKEN_AVAILABLE:
+            encoding = tiktoken.get_encoding(tokenizer)
+            self.tokenizer = tokenizer
+            self.measure = lambda text: len(encoding.encode(text, disallowed_special=()))
+        else:
+            self.measure = estimate_tokens
+
+    def _pieces(self, text: str, level: int = 0) -> List[tuple]:
+        """(piece, size) list; pieces above the limit are cut at the next finer boundary."""
+        size = self.measure(text)
+        if size <= self.limit:
+            return [(text, size)]
+        if level >= len(_BOUNDARIES):
+            # No boundary left: hard cut (chars, or proportionally for tokens)
+            step = max(1, len(text) * self.limit // size)
+            return [(text[i:i + step], self.measure(text[i:i + step])) for i in range(0, len(text), step)]
+        parts = [part for part in _BOUNDARIES[level].split(text) if part]
+        if len(parts) == 1:
+            return self._pieces(text, level + 1)
+        pieces = []
+        for part in parts:
+            pieces.extend(self._pieces(part, level + 1))
+        return pieces
+
+    def _tail(self, text: str, room: int, level: int = 1) -> List[tuple]:
+        """Trailing (piece, size) pairs of text within `room` units, cut at line, sentence, then word boundaries."""
+        tail = []
+        if level >= len(_BOUNDARIES):
+            return tail
+        for part in reversed([part for part in _BOUNDARIES[level].split(text) if part]):
+            size = self.measure(part)
+            if size > room:
+                return self._tail(part, room, level + 1) + tail
+            tail.insert(0, (part, size))
+            room -= size
+        return tail
+
+    def pack(self, pieces: List[tuple], cut_tail: bool = True) -> List[str]:
+        """Greedily pack (piece, size) pairs into windows, repeating up to `overlap` units.
+
+        A piece too large for the remaining overlap is cut finer (see _tail) unless cut_tail is False.
+        """
+        windows = []
+        current, current_size = [], 0
+        for piece, size in pieces:
+            if current and current_size + size > self.limit:
+                windows.append(''.join(p for p, _ in current))
+                # Overlap: trailing pieces of the finished window start the next one
+                tail, tail_size = [], 0
+                for p, s in reversed(current):
+                    room = min(self.overlap, self.limit - size) - tail_size
+                    if s > room:
+                        if cut_tail and room > 0:
+                            tail[:0] = self._tail(p, room)
+                            tail_size = sum(s for _, s in tail)
+                        break
+                    tail.insert(0, (p, s))
+                    tail_size += s
+                current, current_size = tail, tail_size
+            current.append((piece, size))
+            current_size += size
+        if current:
+            windows.append(''.join(p for p, _ in current))
+        return windows
+
+    def split(self, text: str) -> List[str]:
+        if self.measure(text) <= self.limit:
+            return [text]
+        return self.pack(self._pieces(text))
+
+    def split_blocks(self, blocks: List[str]) -> List[str]:
+        """Pack whole blocks (never cut inside one), e.g. pretty-printed JSON objects."""
+        return self.pack([(block, self.measure(block)) for block in blocks], cut_tail=False)
+
+    def describe(self) -> str:
+        unit = self.unit if not self.tokenizer else f"tokens ({self.tokenizer})"
+        if self.unit == 'tokens' and not self.tokenizer:
+            unit = "tokens (estimated)"
+        return f"{self.limit:,} {unit}" + (f", {self.overlap:,} overlap" if self.overlap else "")
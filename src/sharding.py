@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Deterministic hash sharding for the XML to TXT Converter
+Assigns each record to a split (train/val/...) and a shard by a hash of its key or content
+"""
+
+import hashlib
+from typing import List, Optional, Tuple
+
+
+def parse_split(spec: Optional[str]) -> List[Tuple[str, float]]:
+    """Parse 'train=0.99,val=0.01' into [(name, fraction)] (fractions normalized to 1)."""
+    if not spec:
+        return []
+    parts = []
+    for item in spec.split(','):
+        name, sep, weight = item.partition('=')
+        name = name.strip()
+        if not sep or not name:
+            raise ValueError(f"Invalid split {item!r}, expected name=fraction")
+        fraction = float(weight)
+        if fraction < 0:
+            raise ValueError(f"Split fraction must not be negative: {item!r}")
+        parts.append((name, fraction))
+    total = sum(fraction for _, fraction in parts)
+    if total <= 0:
+        raise ValueError(f"Split fractions must add up to more than 0: {spec!r}")
+    return [(name, fraction / total) for name, fraction in parts]
+
+
+class ShardRouter:
+    """Map a record key to (split name, shard number), stable across runs and machines.
+
+    The split uses the first 8 bytes of a BLAKE2b digest and the shard the next
+    8 bytes, so shard balance inside each split does not depend on the split.
+    """
+
+    def __init__(self, shards: int = 1, split: Optional[str] = None):
+        self.shards = max(1, shards)
+        self.splits = parse_split(split)
+        # Upper bounds of each split on the 64-bit hash range
+        self._bounds = []
+        cumulative = 0.0
+        for name, fraction in self.splits:
+            cumulative += fraction
+            self._bounds.append((min(int(cumulative * 2**64), 2**64), name))
+        if self._bounds:
+            self._bounds[-1] = (2**64, self._bounds[-1][1])
+
+    @property
+    def enabled(self) -> bool:
+        return self.shards > 1 or bool(self.splits)
+
+    def streams(self) -> List[Tuple[Optional[str], Optional[int]]]:
+        """All (split, shard) combinations, in output order."""
+        split_names = [name for name, _ in self.splits] or [None]
+        shard_numbers = list(range(self.shards)) if self.shards > 1 else [None]
+        return [(split, shard) for split in split_names for shard in shard_numbers]
+
+    def route(self, key: bytes) -> Tuple[Optional[str], Optional[int]]:
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        split = None
+        if self._bounds:
+            point = int.from_bytes(digest[:8], 'big')
+            split = next(name for bound, name in self._bounds if point < bound)
+        shard = int.from_bytes(digest[8:], 'big') % self.shards if self.shards > 1 else None
+        return split, shard
+
+    @staticmethod
+    def stream_suffix(split: Optional[str], shard: Optional[int], shards: int) -> str:
+        suffix = f"_{split}" if split else ""
+        if shard is not None:
+            suffix += f"_shard{shard:0{max(3, len(str(shards - 1)))}d}"
+        return suffix
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Shared-memory ring buffers for the XML to TXT Converter
+Carry raw record bytes to formatting worker processes and formatted bytes back
+without pickling them: only (offset, length) tuples travel through queues
+"""
+
+import os
+import time
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+# Header: [0] consumer position, [1] capacity (8-byte slots); data starts after it
+_HEADER = 64
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        # Python 3.13+: the creating process alone owns (and unlinks) the segment
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def shm_available(nbytes: int) -> bool:
+    """True if /dev/shm (Linux) can hold nbytes; writing past its size would crash with SIGBUS."""
+    try:
+        stats = os.statvfs('/dev/shm')
+    except (AttributeError, OSError):
+        return True  # macOS/Windows: no tmpfs limit to check
+    return stats.f_bavail * stats.f_frsize >= nbytes
+
+
+class ShmRing:
+    """Single-producer byte ring in shared memory whose blocks are freed in FIFO order.
+
+    Positions are running byte counts. A block never wraps around (the rest of
+    the ring is skipped instead), so every block is one contiguous memoryview.
+    The consumer publishes how far it has freed in the header, which lets a
+    producer in another process wait for space: that wait is the backpressure.
+    """
+
+    def __init__(self, size: int = 0, name: Optional[str] = None):
+        self.owner = name is None
+        if self.owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=_HEADER + size)
+        else:
+            self._shm = _attach(name)
+        self.name = self._shm.name
+        self._header = self._shm.buf[:16].cast('Q')
+        if self.owner:
+            self._header[0] = 0
+            self._header[1] = size
+        self.capacity = self._header[1]
+        self.buf = self._shm.buf[_HEADER:_HEADER + self.capacity]
+        self.head = 0  # producer position (local to the producing process)
+
+    @property
+    def tail(self) -> int:
+        return self._header[0]
+
+    def release(self, end: int):
+        """Consumer side: free everything up to position end (a value returned by write)."""
+        self._header[0] = end
+
+    def _start(self, n: int) -> int:
+        offset = self.head % self.capacity
+        return self.head + (self.capacity - offset if offset + n > self.capacity else 0)
+
+    def fits(self, n: int) -> bool:
+        """True if n bytes can be written now without waiting."""
+        if n > self.capacity:
+            return False
+        if self.tail == self.head:
+            return True  # empty: the skipped end of the ring holds nothing
+        return self._start(n) + n - self.tail <= self.capacity
+
+    def write(self, data, wait: bool = True) -> Optional[Tuple[int, int]]:
+        """Copy data into the ring; returns (offset, end position) or None if it cannot fit.
+
+        With wait, blocks until the consumer has freed enough space (None only if
+        data is larger than the whole ring).
+        """
+        n = len(data)
+        if n > self.capacity:
+            return None
+        delay = 0.0001
+        while not self.fits(n):
+            if not wait:
+                return None
+            time.sleep(delay)
+            delay = min(delay * 2, 0.01)
+        start = self._start(n)
+        offset = start % self.capacity
+        self.buf[offset:offset + n] = data
+        self.head = start + n
+        return offset, self.head
+
+    def view(self, offset: int, n: int) -> memoryview:
+        return self.buf[offset:offset + n]
+
+    def close(self):
+        self.buf.release()
+        self._header.release()
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Streaming sketches for the XML to TXT Converter
+Fixed-size summaries of value distributions (sizes in bytes/chars) that can be
+updated per element, merged across runs and stored in JSON reports
+"""
+
+from typing import Dict, Optional
+
+# 4 sub-buckets per power of two: at most 25% relative error on quantiles
+_SUB_BITS = 2
+_SUB = 1 << _SUB_BITS
+
+
+def _bucket(value: int) -> int:
+    """Bucket index of a non-negative integer (0 has its own bucket)."""
+    if value < _SUB:
+        return value
+    exponent = value.bit_length() - 1
+    mantissa = (value >> (exponent - _SUB_BITS)) & (_SUB - 1)
+    return (exponent - _SUB_BITS + 1) * _SUB + mantissa
+
+
+def _bucket_bounds(index: int):
+    """Smallest and largest value of a bucket."""
+    if index < _SUB:
+        return index, index
+    exponent = index // _SUB + _SUB_BITS - 1
+    mantissa = index % _SUB
+    low = (1 << exponent) + (mantissa << (exponent - _SUB_BITS))
+    return low, low + (1 << (exponent - _SUB_BITS)) - 1
+
+
+class LogHistogram:
+    """Log-scale histogram of non-negative integers with exact count, total, min and max."""
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+
+    def add(self, value: int):
+        index = _bucket(value) if value >= _SUB else value
+        counts = self.counts
+        counts[index] = counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.max is None or value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def merge(self, other: 'LogHistogram'):
+        for index, n in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + n
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+            self.min = other.min if self.min is None else min(self.min, other.min)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> int:
+        """Approximate q-quantile (upper bound of the bucket holding it, capped at max)."""
+        if not self.count:
+            return 0
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                return min(_bucket_bounds(index)[1], self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': round(self.mean(), 1),
+            'min': self.min or 0,
+            'p50': self.quantile(0.50),
+            'p90': self.quantile(0.90),
+            'p99': self.quantile(0.99),
+            'max': self.max or 0,
+        }
+
+    def to_dict(self) -> dict:
+        data = self.summary()
+        data['buckets'] = {str(index): n for index, n in sorted(self.counts.items())}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'LogHistogram':
+        hist = cls()
+        hist.counts = {int(index): n for index, n in data.get('buckets', {}).items()}
+        hist.count = data.get('count', 0)
+        hist.total = data.get('total', 0)
+        if hist.count:
+            hist.min = data.get('min', 0)
+            hist.max = data.get('max', 0)
+        return hist
+
+
+class RecordStats:
+    """Per-record output statistics: length and token sketches plus output bytes per tag."""
+
+    MAX_TAGS = 256  # further tags are pooled under '(other)' to keep memory constant
+
+    __slots__ = ('records', 'bytes', 'chars', 'tokens', 'tag_bytes')
+
+    def __init__(self):
+        self.records = 0
+        self.bytes = 0
+        self.chars = LogHistogram()
+        self.tokens = LogHistogram()
+        self.tag_bytes: Dict[str, int] = {}
+
+    def add(self, chars: int, tokens: int, nbytes: int, tag: Optional[str] = None):
+        self.records += 1
+        self.bytes += nbytes
+        self.chars.add(chars)
+        self.tokens.add(tokens)
+        tag_bytes = self.tag_bytes
+        if tag not in tag_bytes and len(tag_bytes) >= self.MAX_TAGS:
+            tag = '(other)'
+        tag_bytes[tag] = tag_bytes.get(tag, 0) + nbytes
+
+    def merge(self, other: 'RecordStats'):
+        self.records += other.records
+        self.bytes += other.bytes
+        self.chars.merge(other.chars)
+        self.tokens.merge(other.tokens)
+        for tag, nbytes in other.tag_bytes.items():
+            if tag not in self.tag_bytes and len(self.tag_bytes) >= self.MAX_TAGS:
+                tag = '(other)'
+            self.tag_bytes[tag] = self.tag_bytes.get(tag, 0) + nbytes
+
+    def tag_shares(self) -> Dict[str, float]:
+        """Share of output bytes per tag, largest first."""
+        total = sum(self.tag_bytes.values())
+        return {tag: nbytes / total for tag, nbytes in
+                sorted(self.tag_bytes.items(), key=lambda item: item[1], reverse=True)} if total else {}
+
+    def to_dict(self, buckets: bool = False) -> dict:
+        """JSON form; with buckets the sketches can be merged again (RecordStats.from_dict)."""
+        return {
+            'records': self.records,
+            'bytes': self.bytes,
+            'record_chars': self.chars.to_dict() if buckets else self.chars.summary(),
+            'record_tokens': self.tokens.to_dict() if buckets else self.tokens.summary(),
+            'tag_bytes': dict(sorted(self.tag_bytes.items(), key=lambda item: item[1], reverse=True)),
+            'tag_shares': {tag: round(share, 4) for tag, share in self.tag_shares().items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'RecordStats':
+        stats = cls()
+        stats.records = data.get('records', 0)
+        stats.bytes = data.get('bytes', 0)
+        stats.chars = LogHistogram.from_dict(data.get('record_chars', {}))
+        stats.tokens = LogHistogram.from_dict(data.get('record_tokens', {}))
+        stats.tag_bytes = dict(data.get('tag_bytes', {}))
+        return stats
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Soak test for the XML to TXT Converter
+Streams a multi-GB synthetic MediaWiki-like document (generated on the fly, nothing
+stored on disk) through convert() and checks that RSS and elements/sec stay flat.
+
+Usage:
+  python3 src/soak_test.py                     # 2 GB, <page> records under a <pages> wrapper
+  python3 src/soak_test.py --gb 8 --format jsonl
+  python3 src/soak_test.py --classic           # no --record-tag (every element is formatted)
+
+Memory is compared after a warm-up and with the text cache off, so filling
+the cache does not count as growth.
+"""
+
+import argparse
+import io
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from xml_converter import XMLToTXTConverter
+
+_WORDS = ("stream parse record memory element buffer token corpus section value "
+          "history article reference language model training archive").split()
+
+
+class SyntheticWiki(io.RawIOBase):
+    """Read-only stream of a MediaWiki-like XML document of about total_bytes."""
+
+    def __init__(self, total_bytes: int, wrapper: bool = True):
+        self.name = '<synthetic>'
+        self.total_bytes = total_bytes
+        self.produced = 0
+        self.pages = 0
+        self._wrapper = wrapper
+        self._pending = (b'<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/">\n'
+                         b'  <siteinfo><sitename>Soak</sitename></siteinfo>\n'
+                         + (b'  <pages>\n' if wrapper else b''))
+        self._closed_doc = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _page(self) -> bytes:
+        n = self.pages
+        self.pages += 1
+        words = ' '.join(_WORDS[(n * 7 + i) % len(_WORDS)] for i in range(120 + n % 80))
+        return (f'    <page>\n      <title>Page {n}</title>\n      <id>{n}</id>\n'
+                f'      <revision><id>{n * 3}</id><timestamp>2024-01-01T00:00:00Z</timestamp>\n'
+                f'        <text bytes="{len(words)}">{words}\n\n== Section ==\n{words[:400]}</text>\n'
+                f'      </revision>\n    </page>\n').encode('utf-8')
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer)
+        if len(self._pending) < len(view) and not self._closed_doc:
+            # Collect pages and join once: repeated bytes += is quadratic for large reads
+            parts = [self._pending]
+            size = len(self._pending)
+            while size < len(view) and not self._closed_doc:
+                if self.produced + size >= self.total_bytes:
+                    parts.append((b'  </pages>\n' if self._wrapper else b'') + b'</mediawiki>\n')
+                    self._closed_doc = True
+                else:
+                    parts.append(self._page())
+                size += len(parts[-1])
+            self._pending = b''.join(parts)
+        n = min(len(view), len(self._pending))
+        view[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        self.produced += n
+        return n
+
+
+def _rss_mb() -> float:
+    """Current resident set size (Linux), else the peak RSS."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else 0.0
+
+
+def run_soak(gb: float, record_tag, output_format: str, chunk_gb: float,
+             rss_tolerance_mb: float, min_rate_ratio: float) -> bool:
+    work_dir = tempfile.mkdtemp(prefix='xml_soak_')
+    output_base = os.path.join(work_dir, 'soak')
+    converter = XMLToTXTConverter(output_format=output_format, record_tag=record_tag,
+                                  file_chunk_gb=chunk_gb, use_parallel=False, text_cache_mb=0)
+    samples = []  # (elapsed, elements, rss_mb)
+    extension = '.jsonl' if output_format == 'jsonl' else '.txt'
+
+    def on_progress(progress):
+        samples.append((progress['elapsed'], progress['elements'], _rss_mb()))
+        # Finished parts are not needed; keep disk usage at about one part
+        for part in range(1, progress['file_part']):
+            path = f"{output_base}_part{part}{extension}"
+            if os.path.exists(path):
+                os.unlink(path)
+
+    converter.progress_callback = on_progress
+    # Classic mode too: elements below the <pages> wrapper must not pile up
+    source = SyntheticWiki(int(gb * 1024**3))
+    start = time.time()
+    try:
+        converter.convert(source, output_base)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    elapsed = time.time() - start
+
+    print()
+    print("=" * 80)
+    print(f"🧪 Soak test: {source.produced / 1024**3:.2f} GB, {source.pages:,} pages in {elapsed:.0f}s")
+    if len(samples) < 10:
+        print("❌ Too few progress samples, use a larger --gb")
+        return False
+
+    # Ignore the warm-up, then compare the first and last third of the run
+    samples = samples[len(samples) // 5:]
+    third = len(samples) // 3
+    rates = [(e2 - e1) / (t2 - t1) for (t1, e1, _), (t2, e2, _) in zip(samples, samples[1:]) if t2 > t1]
+    first_rss, last_rss = _mean([s[2] for s in samples[:third]]), _mean([s[2] for s in samples[-third:]])
+    first_rate, last_rate = _mean(rates[:third]), _mean(rates[-third:])
+
+    rss_growth = last_rss - first_rss
+    rss_ok = rss_growth <= rss_tolerance_mb
+    rate_ok = first_rate > 0 and last_rate / first_rate >= min_rate_ratio
+    print(f"   RSS:      {first_rss:.0f} MB -> {last_rss:.0f} MB ({rss_growth:+.0f} MB)  "
+          f"{'✅' if rss_ok else '❌'}")
+    print(f"   Elem/sec: {first_rate:,.0f} -> {last_rate:,.0f} ({last_rate / first_rate:.2f}x)  "
+          f"{'✅' if rate_ok else '❌'}" if first_rate else "   Elem/sec: n/a  ❌")
+    print("=" * 80)
+    return rss_ok and rate_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Soak test: flat memory and throughput over a long run')
+    parser.add_argument('--gb', type=float, default=2.0, help='Synthetic input size (default: 2 GB)')
+    parser.add_argument('--format', default='llm_optimized', help='Output format (default: llm_optimized)')
+    parser.add_argument('--classic', action='store_true',
+                        help='Format every element (no record tag) instead of <page> records')
+    parser.add_argument('--chunk-gb', type=float, default=0.25,
+                        help='Output part size; finished parts are deleted (default: 0.25 GB)')
+    parser.add_argument('--rss-tolerance-mb', type=float, default=8.0,
+                        help='Allowed RSS growth between first and last third (default: 8 MB)')
+    parser.add_argument('--min-rate-ratio', type=float, default=0.8,
+                        help='Minimum last/first third elements/sec ratio (default: 0.8)')
+    args = parser.parse_args()
+
+    ok = run_soak(args.gb, None if args.classic else 'page', args.format, args.chunk_gb,
+                  args.rss_tolerance_mb, args.min_rate_ratio)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Structural survey for the XML to TXT Converter
+Streams a file through expat (no tree, no formatting) and reports its shape:
+element counts, text and raw bytes per path, depth, attribute keys and
+suggested record tags. The JSON report can be passed to the converter
+(--survey-report) to pick the record tag and size its write buffers.
+
+Usage:
+  python3 src/xml_converter.py survey input/enwiki.xml
+  python3 src/xml_converter.py survey input/enwiki.xml --json enwiki.survey.json
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from typing import Optional
+from xml.parsers import expat
+
+from sketches import LogHistogram
+
+REPORT_VERSION = 1
+BLOCK_SIZE = 4 * 1024 * 1024
+
+
+class _PathStats:
+    __slots__ = ('path', 'depth', 'count', 'text', 'raw', 'subtree_text', 'attributes', 'has_children')
+
+    def __init__(self, path: str, depth: int):
+        self.path = path
+        self.depth = depth
+        self.count = 0
+        self.text = LogHistogram()  # direct text bytes per element
+        self.raw = LogHistogram()  # raw XML bytes per element (start tag to end tag)
+        self.subtree_text = 0  # text bytes of all elements with this path, descendants included
+        self.attributes = Counter()
+        self.has_children = False
+
+
+def _local(name: str) -> str:
+    # expat runs with '}' as namespace separator: 'uri}tag' -> 'tag' (like _clean_tag_name)
+    return name.rsplit('}', 1)[-1]
+
+
+def survey_file(input_path: str, progress: bool = True) -> dict:
+    """Survey input_path and return the report dict."""
+    parser = expat.ParserCreate(namespace_separator='}')
+    parser.buffer_text = True
+    parser.buffer_size = 1024 * 1024
+
+    paths = {}
+    path_names = {}  # (parent path, raw tag) -> path
+    stack = []  # [stats, text bytes, subtree text bytes, start byte]
+    max_depth = 0
+    elements = 0
+
+    def start(name, attrs):
+        nonlocal max_depth, elements
+        parent = stack[-1][0] if stack else None
+        key = (parent.path if parent else '', name)
+        path = path_names.get(key)
+        if path is None:
+            local = _local(name)
+            path = path_names[key] = f"{parent.path}/{local}" if parent else local
+        stats = paths.get(path)
+        if stats is None:
+            stats = paths[path] = _PathStats(path, len(stack) + 1)
+        stats.count += 1
+        if attrs:
+            stats.attributes.update(_local(k) for k in attrs)
+        if parent is not None:
+            parent.has_children = True
+        stack.append([stats, 0, 0, parser.CurrentByteIndex])
+        elements += 1
+        if len(stack) > max_depth:
+            max_depth = len(stack)
+
+    def end(name):
+        stats, text, subtree, start_byte = stack.pop()
+        stats.text.add(text)
+        stats.raw.add(parser.CurrentByteIndex - start_byte)
+        subtree += text
+        stats.subtree_text += subtree
+        if stack:
+            stack[-1][2] += subtree
+
+    def data(text):
+        if stack:
+            stack[-1][1] += len(text) if text.isascii() else len(text.encode('utf-8'))
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = data
+
+    size = os.path.getsize(input_path)
+    start_time = time.time()
+    last_update = start_time
+    done = 0
+    with open(input_path, 'rb') as f:
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            parser.Parse(block, False)
+            done += len(block)
+            now = time.time()
+            if progress and now - last_update >= 1.0:
+                print(f"\r  ... {done / size:.0%} | {elements:,} elements | "
+                      f"{done / (now - start_time) / 1024**2:.0f} MB/s", end='', flush=True)
+                last_update = now
+        parser.Parse(b'', True)
+    if progress and last_update != start_time:
+        print()
+    seconds = time.time() - start_time
+
+    root = next(iter(paths.values()), None)
+    total_text = root.subtree_text if root else 0
+    return {
+        'version': REPORT_VERSION,
+        'input': os.path.abspath(input_path),
+        'input_bytes': size,
+        'seconds': round(seconds, 3),
+        'mb_per_sec': round(size / seconds / 1024**2, 1) if seconds > 0 else None,
+        'root': root.path if root else None,
+        'elements': elements,
+        'max_depth': max_depth,
+        'text_bytes': total_text,
+        'paths': {
+            stats.path: {
+                'count': stats.count,
+                'depth': stats.depth,
+                'text_bytes': stats.text.to_dict(),
+                'raw_bytes': stats.raw.to_dict(),
+                'subtree_text_bytes': stats.subtree_text,
+                'has_children': stats.has_children,
+                'attributes': dict(stats.attributes.most_common()),
+            }
+            for stats in paths.values()
+        },
+        'suggested_record_tags': _suggest_record_tags(paths, total_text),
+    }
+
+
+def _suggest_record_tags(paths: dict, total_text: int, limit: int = 3) -> list:
+    """Repeated elements with children that hold most of the text, best first."""
+    candidates = []
+    for stats in paths.values():
+        if stats.depth < 2 or stats.count < 2 or not stats.has_children:
+            continue
+        parent = paths[stats.path.rsplit('/', 1)[0]]
+        if parent.count * 2 > stats.count:
+            continue  # about one per parent: part of a record, not a record
+        share = stats.subtree_text / total_text if total_text else 0.0
+        candidates.append((share, -stats.depth, stats))
+    candidates.sort(key=lambda c: (c[0], c[1]), reverse=True)
+    return [{
+        'tag': stats.path.rsplit('/', 1)[-1],
+        'path': stats.path,
+        'count': stats.count,
+        'text_share': round(share, 4),
+        'raw_bytes': stats.raw.summary(),
+    } for share, _, stats in candidates[:limit]]
+
+
+def load_report(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    if report.get('version') != REPORT_VERSION:
+        raise ValueError(f"Unsupported survey report version in {path}")
+    return report
+
+
+def suggested_record_tag(report: dict) -> Optional[str]:
+    suggestions = report.get('suggested_record_tags') or []
+    return suggestions[0]['tag'] if suggestions else None
+
+
+def write_buffer_size(report: dict, record_tag: Optional[str], batch_size: int) -> Optional[int]:
+    """Write buffer that holds a batch of p99-sized records (256 KB .. 32 MB)."""
+    records = [s for s in report.get('suggested_record_tags') or [] if s['tag'] == record_tag]
+    if not records:
+        return None
+    p99 = records[0]['raw_bytes']['p99']
+    return max(256 * 1024, min(32 * 1024 * 1024, p99 * batch_size))
+
+
+def print_report(report: dict, top: int = 25):
+    print("=" * 80)
+    print(f"🔭 Survey: {report['input']}")
+    print(f"   {report['input_bytes'] / 1024**2:,.1f} MB in {report['seconds']:.1f}s"
+          + (f" ({report['mb_per_sec']:.0f} MB/s)" if report['mb_per_sec'] else ""))
+    print(f"   Root: <{report['root']}> | {report['elements']:,} elements | max depth {report['max_depth']} | "
+          f"{report['text_bytes'] / 1024**2:,.1f} MB text")
+    print("=" * 80)
+
+    paths = sorted(report['paths'].items(), key=lambda item: item[1]['count'], reverse=True)
+    width = min(50, max((len(path) for path, _ in paths[:top]), default=4))
+    print(f"{'PATH':<{width}} {'COUNT':>12} {'TEXT MB':>9} {'P50':>8} {'P99':>9}")
+    for path, stats in paths[:top]:
+        text = stats['text_bytes']
+        shown = path if len(path) <= width else '…' + path[-(width - 1):]
+        print(f"{shown:<{width}} {stats['count']:>12,} {text['total'] / 1024**2:>9.1f} "
+              f"{text['p50']:>8,} {text['p99']:>9,}")
+    if len(paths) > top:
+        print(f"   ... {len(paths) - top} more paths (see --json)")
+
+    attributes = Counter()
+    for stats in report['paths'].values():
+        attributes.update(stats['attributes'])
+    if attributes:
+        print()
+        print("🏷️  Attribute keys: " + ", ".join(f"{k} ({n:,})" for k, n in attributes.most_common(10)))
+
+    print()
+    suggestions = report['suggested_record_tags']
+    if suggestions:
+        print("💡 Suggested record tags:")
+        for s in suggestions:
+            raw = s['raw_bytes']
+            print(f"   --record-tag {s['tag']:<16} {s['count']:>10,} x {s['path']} | {s['text_share']:.0%} of text | "
+                  f"record p50 {raw['p50']:,} B / p99 {raw['p99']:,} B / max {raw['max']:,} B")
+    else:
+        print("💡 No repeated record element found (the file is converted element by element)")
+    print("=" * 80)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='xml_converter.py survey',
+        description='Fast structural survey: tag histogram, depth and byte budget without formatting')
+    parser.add_argument('input', help='Input XML file')
+    parser.add_argument('--json', default=None, metavar='PATH',
+                        help='Write the full report as JSON (use with the converter\'s --survey-report)')
+    parser.add_argument('--top', type=int, default=25, help='Paths shown in the table (default: 25)')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        parser.error(f"Input file not found: {args.input}")
+    report = survey_file(args.input)
+    print_report(report, top=args.top)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Report: {args.json}")
+    return 0
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Text normalization benchmark for the XML to TXT Converter
+Compares the single-pass TextEngine with the former chain (two regex passes and a
+strip per node, then split/strip/indent per line) on large wiki text, and checks
+that both give identical output.
+
+Usage:
+  python3 src/text_bench.py                         # 64 MB of synthetic wikitext
+  python3 src/text_bench.py --mb 256 --repeats 5
+  python3 src/text_bench.py --input dump.xml --min-chars 1000   # text nodes of a real dump
+"""
+
+import argparse
+import random
+import re
+import time
+import xml.etree.ElementTree as ET
+
+from text_engine import TextEngine, indent_lines, indent_stripped_lines
+
+_WORDS = ("the of and in to was is for on as by with from at his that an it were "
+          "which also are first new city film season team population river album "
+          "university station county village district born later series war").split()
+
+
+# The chain TextEngine replaces (XMLToTXTConverter before the engine)
+_SPACES = re.compile(r'[ \t]+')
+_NEWLINES = re.compile(r'\n\s*\n\s*\n+')
+
+
+def chain_normalize(text: str) -> str:
+    text = _SPACES.sub(' ', text)
+    text = _NEWLINES.sub('\n\n', text)
+    return text.strip()
+
+
+def chain_llm_lines(text: str, prefix: str) -> str:
+    return '\n'.join(prefix + line for line in text.split('\n') if line.strip())
+
+
+def chain_plain_lines(text: str, prefix: str) -> str:
+    return '\n'.join(prefix + line.strip() for line in text.split('\n') if line.strip())
+
+
+def synthetic_articles(total_bytes: int, seed: int = 0) -> list:
+    """Wikitext-like articles: paragraphs, headings, lists, tables, stray tabs and blank lines."""
+    rng = random.Random(seed)
+    articles, size = [], 0
+    while size < total_bytes:
+        parts = []
+        for _ in range(rng.randint(3, 40)):
+            kind = rng.random()
+            if kind < 0.15:
+                parts.append(f"== {' '.join(rng.choices(_WORDS, k=3)).title()} ==\n")
+            elif kind < 0.3:
+                parts.extend(f"* {' '.join(rng.choices(_WORDS, k=rng.randint(3, 12)))}\n"
+                             for _ in range(rng.randint(2, 8)))
+            elif kind < 0.4:
+                parts.append("{| class=\"wikitable\"\n" + "".join(
+                    f"|-\n| {rng.choice(_WORDS)}\t|| {rng.randint(1, 9999)}  \n" for _ in range(4)) + "|}\n")
+            else:
+                words = rng.choices(_WORDS, k=rng.randint(30, 200))
+                parts.append(' '.join(w + ('  ' if rng.random() < 0.02 else '') for w in words) + '.\n')
+            parts.append('\n' * rng.choice((1, 1, 2, 3)) + (' \n' if rng.random() < 0.05 else ''))
+        article = ''.join(parts)
+        articles.append(article)
+        size += len(article)
+    return articles
+
+
+def dump_texts(path: str, min_chars: int) -> list:
+    texts = []
+    for _, elem in ET.iterparse(path):
+        if elem.text and len(elem.text) >= min_chars:
+            texts.append(elem.text)
+        elem.clear()
+    return texts
+
+
+def best_seconds(fn, texts: list, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark text normalization: TextEngine vs the regex chain')
+    parser.add_argument('--input', default=None, help='XML file whose text nodes are used (default: synthetic)')
+    parser.add_argument('--min-chars', type=int, default=1000, help='Smallest text node taken from --input')
+    parser.add_argument('--mb', type=float, default=64, help='Synthetic text size (default: 64 MB)')
+    parser.add_argument('--repeats', type=int, default=3, help='Runs per variant, best is reported (default: 3)')
+    args = parser.parse_args()
+
+    texts = dump_texts(args.input, args.min_chars) if args.input else synthetic_articles(int(args.mb * 1024 * 1024))
+    mb = sum(len(text) for text in texts) / (1024 * 1024)
+    engine = TextEngine()
+    prefix = '    '
+
+    variants = [
+        ("normalize", chain_normalize, engine.normalize),
+        ("normalize + llm lines", lambda t: chain_llm_lines(chain_normalize(t), prefix),
+         lambda t: indent_lines(engine.normalize(t), prefix)),
+        ("normalize + plain lines", lambda t: chain_plain_lines(chain_normalize(t), prefix),
+         lambda t: indent_stripped_lines(engine.normalize(t), prefix)),
+    ]
+
+    print("=" * 80)
+    print(f"⏱️  Text normalization: {len(texts):,} texts, {mb:,.1f} M chars")
+    print("=" * 80)
+    ok = True
+    for label, chain, single_pass in variants:
+        same = all(chain(text) == single_pass(text) for text in texts)
+        ok = ok and same
+        old = best_seconds(chain, texts, args.repeats)
+        new = best_seconds(single_pass, texts, args.repeats)
+        print(f"   {label:<24} chain {mb / old:7.1f} M chars/s   engine {mb / new:7.1f} M chars/s   "
+              f"{old / new:5.2f}x  {'✅' if same else '❌ output differs'}")
+    print("=" * 80)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Bounded LRU cache for the XML to TXT Converter
+Remembers cleaned text of frequently repeated text nodes across records
+(e.g. <model>wikitext</model>, stub bodies, identical comments)
+"""
+
+import sys
+from collections import OrderedDict
+
+# Bytes an OrderedDict spends per entry besides its key and value (hash slot + link node)
+ENTRY_OVERHEAD = 100
+
+
+def _object_bytes(obj) -> int:
+    """Memory of a str, or of a tuple and the tuples/strings it holds."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, tuple):
+        size += sum(_object_bytes(item) for item in obj)
+    return size
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by the memory of its entries.
+
+    An entry counts the size of its key and value objects plus ENTRY_OVERHEAD, so
+    a budget of many tiny entries is not several times larger in real memory.
+    Callers only look up and store keys of at most max_item_chars characters, so
+    one huge article cannot evict everything else. Entries are stored as plain
+    values (no per-entry tuples), which keeps the cache cheap for the garbage
+    collector's full collections.
+    """
+
+    def __init__(self, max_bytes: int, max_item_chars: int = 4096):
+        self.max_bytes = max_bytes
+        self.max_item_chars = max_item_chars
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> value
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, value):
+        """Cache value under key, evicting the least recently used entries over max_bytes."""
+        if key in self._entries:
+            return
+        self._entries[key] = value
+        self.size += _object_bytes(key) + _object_bytes(value) + ENTRY_OVERHEAD
+        while self.size > self.max_bytes and self._entries:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self.size -= _object_bytes(evicted_key) + _object_bytes(evicted) + ENTRY_OVERHEAD
+            self.evictions += 1
+
+    def reset_statistics(self):
+        self.hits = self.misses = self.evictions = 0
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
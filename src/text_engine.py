@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Text normalization engine for the XML to TXT Converter
+Cleans a text node in one routine (control characters and tabs through one
+precomputed str.translate table, optional Unicode NFC, whitespace runs) and
+turns it into one block of indented output lines
+"""
+
+import re
+import unicodedata
+
+# C0/C1 control characters except tab, newline and carriage return are dropped;
+# vertical tab and form feed become spaces
+_CONTROL_TABLE = dict.fromkeys([*range(0x00, 0x09), *range(0x0e, 0x20), 0x7f, *range(0x80, 0xa0)])
+_CONTROL_TABLE.update({0x0b: ' ', 0x0c: ' '})
+_TAB_TABLE = {0x09: ' '}
+
+_SPACE_RUNS = re.compile(r' {2,}')
+_NEWLINE_RUNS = re.compile(r'\n\s*\n\s*\n+')
+# A line break with the whitespace-only lines after it
+_BLANK_LINES = re.compile(r'\n(?:[^\S\n]*\n)*')
+
+
+class TextEngine:
+    """Normalizes text nodes: the converter's whitespace rules plus optional NFC and control removal.
+
+    Whitespace collapsing matches the former regex chain exactly: runs of spaces
+    and tabs become one space, three or more line breaks (with any whitespace
+    between them) become a blank line, and the result is stripped.
+    """
+
+    def __init__(self, collapse_whitespace: bool = True, unicode_nfc: bool = False,
+                 strip_control: bool = False):
+        self.collapse_whitespace = collapse_whitespace
+        self.unicode_nfc = unicode_nfc
+        self.strip_control = strip_control
+        # One translate call drops control characters and turns tabs into spaces
+        self._table = None
+        if strip_control:
+            self._table = dict(_CONTROL_TABLE)
+            if collapse_whitespace:
+                self._table.update(_TAB_TABLE)
+
+    def clean(self, text: str) -> str:
+        """Normalized text without the final strip (for text cut into chunks)."""
+        if self._table is not None:
+            text = text.translate(self._table)
+        elif self.collapse_whitespace and '\t' in text:
+            text = text.replace('\t', ' ')
+        if self.unicode_nfc and not text.isascii() and not unicodedata.is_normalized('NFC', text):
+            text = unicodedata.normalize('NFC', text)
+        if self.collapse_whitespace:
+            # Most text nodes (titles, ids, single lines) need neither substitution
+            if '  ' in text:
+                text = _SPACE_RUNS.sub(' ', text)
+            if text.count('\n') > 2:
+                text = _NEWLINE_RUNS.sub('\n\n', text)
+        return text
+
+    def normalize(self, text: str) -> str:
+        text = self.clean(text)
+        return text.strip() if self.collapse_whitespace else text
+
+
+def indent_lines(text: str, prefix: str) -> str:
+    """Non-blank lines of text behind prefix, as one block ('' if there are none).
+
+    Same as '\\n'.join(prefix + line for line in text.split('\\n') if line.strip()),
+    but without a list of lines. prefix must not contain backslashes.
+    """
+    if '\n' not in text:
+        return prefix + text if text and not text.isspace() else ''
+    first = len(text) - len(text.lstrip())
+    if first == len(text):
+        return ''
+    # Cut whitespace-only lines at both ends; lines keep their own indentation
+    start = text.rfind('\n', 0, first) + 1
+    end = text.find('\n', len(text.rstrip()))
+    if start or end >= 0:
+        text = text[start:end] if end >= 0 else text[start:]
+    return prefix + _BLANK_LINES.sub('\n' + prefix, text)
+
+
+def indent_stripped_lines(text: str, prefix: str) -> str:
+    """Like indent_lines, with every line stripped."""
+    if '\n' not in text:
+        text = text.strip()
+        return prefix + text if text else ''
+    # One C-level split beats any regex here: a pattern starting with optional
+    # whitespace is tried at every space between words
+    lines = [line.strip() for line in text.split('\n') if line and not line.isspace()]
+    return prefix + ('\n' + prefix).join(lines) if lines else ''
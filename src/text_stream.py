@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Streaming text path for the XML to TXT Converter
+Spills gigantic text nodes to temporary files during parsing and writes them back
+chunk by chunk, so peak memory depends on the chunk size instead of the node size
+"""
+
+import hashlib
+import tempfile
+import xml.etree.ElementTree as ET
+from collections import deque
+
+
+class SpilledText:
+    """Text node content kept in a temporary file instead of a Python string."""
+
+    def __init__(self, first_chunks, chunk_chars: int):
+        self.chunk_chars = chunk_chars
+        self.length = 0
+        self.refs = 0
+        self._file = tempfile.TemporaryFile(mode='w+', encoding='utf-8', newline='')
+        for chunk in first_chunks:
+            self.write(chunk)
+
+    def write(self, data: str):
+        self._file.write(data)
+        self.length += len(data)
+
+    def finish(self):
+        self._file.flush()
+
+    def chunks(self):
+        """Yield the content in chunks of about chunk_chars characters."""
+        self._file.seek(0)
+        while True:
+            chunk = self._file.read(self.chunk_chars)
+            if not chunk:
+                return
+            yield chunk
+
+    def head(self, chars: int) -> str:
+        """The first chars characters of the content."""
+        self._file.seek(0)
+        return self._file.read(chars)
+
+    def paragraphs(self):
+        """Yield chunks cut after a paragraph break (or a line break) where possible."""
+        carry = ''
+        for chunk in self.chunks():
+            chunk = carry + chunk
+            cut = chunk.rfind('\n\n')
+            if cut < 0:
+                cut = chunk.rfind('\n')
+            if cut < 0 or len(chunk) > 4 * self.chunk_chars:
+                carry = ''
+                yield chunk
+            else:
+                carry = chunk[cut + 1:]
+                yield chunk[:cut + 1]
+        if carry:
+            yield carry
+
+    def strip(self):
+        # Formatters test ``text and text.strip()``; a spilled node always counts as non-blank
+        return self
+
+    def digest(self) -> bytes:
+        """BLAKE2b digest of the content (stands in for the text in sharding keys)."""
+        h = hashlib.blake2b(digest_size=16)
+        for chunk in self.chunks():
+            h.update(chunk.encode('utf-8'))
+        return h.digest()
+
+    def release(self):
+        # The temporary file itself goes away with the last reference to this object
+        self.refs -= 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __repr__(self) -> str:
+        return f"<SpilledText {self.length:,} chars>"
+
+
+class StreamingTreeBuilder:
+    """ElementTree parser target that never holds a text node above a size limit in memory.
+
+    Builds the same tree as ET.TreeBuilder and records ('start'|'end', element)
+    events. Character data of one text (or tail) run is buffered until it
+    exceeds limit_chars; then it either moves to a SpilledText ('stream') or
+    the rest of the run is dropped ('truncate').
+    """
+
+    def __init__(self, limit_chars: int, policy: str = 'stream', chunk_chars: int = 1024 * 1024):
+        self.limit_chars = limit_chars
+        self.policy = policy
+        self.chunk_chars = chunk_chars
+        self.events = deque()
+        self.spilled_nodes = 0
+        self.truncated_nodes = 0
+        self._stack = []
+        self._last = None
+        self._tail = False
+        self._data = []
+        self._data_len = 0
+        self._spill = None
+        self._truncated = False
+
+    def _flush(self):
+        if self._spill is not None:
+            value = self._spill
+            value.finish()
+            self.spilled_nodes += 1
+        elif self._data:
+            value = ''.join(self._data)
+            if self._truncated:
+                self.truncated_nodes += 1
+        else:
+            return
+        if self._last is not None:
+            if self._tail:
+                self._last.tail = value
+            else:
+                self._last.text = value
+        self._data = []
+        self._data_len = 0
+        self._spill = None
+        self._truncated = False
+
+    def data(self, data: str):
+        if self._spill is not None:
+            self._spill.write(data)
+            return
+        if self._truncated:
+            return
+        self._data.append(data)
+        self._data_len += len(data)
+        if self._data_len > self.limit_chars:
+            if self.policy == 'truncate':
+                text = ''.join(self._data)[:self.limit_chars]
+                self._data = [text]
+                self._data_len = len(text)
+                self._truncated = True
+            else:
+                self._spill = SpilledText(self._data, self.chunk_chars)
+                self._data = []
+                self._data_len = 0
+
+    def start(self, tag, attrib):
+        self._flush()
+        if self._stack:
+            elem = ET.SubElement(self._stack[-1], tag, attrib)
+        else:
+            elem = ET.Element(tag, attrib)
+        self._stack.append(elem)
+        self._last = elem
+        self._tail = False
+        self.events.append(('start', elem))
+        return elem
+
+    def end(self, tag):
+        self._flush()
+        elem = self._stack.pop()
+        self._last = elem
+        self._tail = True
+        self.events.append(('end', elem))
+        return elem
+
+    def close(self):
+        self._flush()
+        return None
+
+
+class StreamingPullParser:
+    """XMLPullParser-like wrapper (feed/read_events/close) around StreamingTreeBuilder."""
+
+    def __init__(self, limit_chars: int, policy: str = 'stream', chunk_chars: int = 1024 * 1024):
+        self.target = StreamingTreeBuilder(limit_chars, policy, chunk_chars)
+        self._parser = ET.XMLParser(target=self.target)
+
+    def feed(self, data):
+        self._parser.feed(data)
+
+    def close(self):
+        self._parser.close()
+
+    def read_events(self):
+        events = self.target.events
+        while events:
+            yield events.popleft()
+
+
+def iter_streaming_events(source, limit_chars: int, policy: str = 'stream',
+                          block_size: int = 1024 * 1024):
+    """Like ET.iterparse(source, events=('start', 'end')) but spilling/truncating huge text nodes.
+
+    Returns (events iterator, parser) so callers can read spill statistics.
+    """
+    parser = StreamingPullParser(limit_chars, policy)
+
+    def events():
+        close_source = isinstance(source, str)
+        f = open(source, 'rb') if close_source else source
+        try:
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                parser.feed(block)
+                yield from parser.read_events()
+            parser.close()
+            yield from parser.read_events()
+        finally:
+            if close_source:
+                f.close()
+
+    return events(), parser
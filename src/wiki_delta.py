@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+MediaWiki delta mode for the XML to TXT Converter
+Tracks page -> revision ids so monthly dumps only convert new or changed pages
+"""
+
+from datetime import datetime, timezone
+from typing import Optional, Dict, Tuple
+
+
+class RevisionDelta:
+    """Decide per <page> whether it changed since a cutoff or a previous run.
+
+    Pages are compared by the id/timestamp of their first <revision>, which is
+    the only revision in current-version dumps (pages-articles). The decision
+    is made as soon as those two small elements have been parsed, so the
+    remaining children of an unchanged page (notably the large <text>) are
+    cleared as they arrive and never reach the formatter.
+
+    Every page seen is written to the new revision map, so the map produced
+    by one run can be passed as ``previous_map`` to the next.
+    """
+
+    def __init__(self, since: Optional[str] = None, previous_map: Optional[str] = None,
+                 page_tag: str = 'page'):
+        self.page_tag = page_tag
+        self.since = self._normalize_timestamp(since) if since else None
+        self.previous: Dict[str, str] = self.load_map(previous_map) if previous_map else {}
+        self.has_previous = previous_map is not None
+
+        self._map_file = None
+        self._stack = []
+        self._reset_page()
+
+        # Statistics
+        self.pages_checked = 0
+        self.pages_changed = 0
+        self.pages_skipped = 0
+
+    @staticmethod
+    def _normalize_timestamp(value: str) -> str:
+        """Convert a user supplied cutoff to the dump format (YYYY-MM-DDTHH:MM:SSZ)."""
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    @staticmethod
+    def load_map(path: str) -> Dict[str, str]:
+        """Load a page -> revision id map written by a previous run."""
+        revisions = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) >= 2 and parts[0]:
+                    revisions[parts[0]] = parts[1]
+        return revisions
+
+    def open_map(self, path: str):
+        """Start writing the updated map (page key, revision id, timestamp per line)."""
+        self._map_file = open(path, 'w', encoding='utf-8', buffering=1024*1024)
+
+    def close(self):
+        if self._map_file:
+            self._map_file.close()
+            self._map_file = None
+
+    def _reset_page(self):
+        self._page_id = None
+        self._title = None
+        self._rev_id = None
+        self._timestamp = None
+        self._in_first_revision = False
+        self._revisions_seen = 0
+        self._decision = None
+
+    def _page_key(self) -> Optional[str]:
+        return self._page_id or self._title
+
+    def _decide(self) -> bool:
+        """True if the current page is new or changed."""
+        if self.has_previous:
+            key = self._page_key()
+            if key is None or self.previous.get(key) != self._rev_id:
+                return True
+            if self.since is None:
+                return False
+        if self.since is not None:
+            # Missing timestamps are treated as changed (never drop content silently)
+            return self._timestamp is None or self._timestamp >= self.since
+        return True
+
+    def observe(self, event: str, tag: str, elem) -> Optional[bool]:
+        """Feed one iterparse event (with cleaned tag name).
+
+        Returns the convert/skip decision on the end event of a page, None otherwise.
+        """
+        if event == 'start':
+            if tag == self.page_tag:
+                self._reset_page()
+            elif tag == 'revision' and self._stack and self._stack[-1] == self.page_tag:
+                self._revisions_seen += 1
+                self._in_first_revision = self._revisions_seen == 1
+            self._stack.append(tag)
+            return None
+
+        if self._stack:
+            self._stack.pop()
+        parent = self._stack[-1] if self._stack else None
+
+        if tag == self.page_tag:
+            return self._finish_page()
+
+        if parent == self.page_tag:
+            if tag == 'id':
+                self._page_id = (elem.text or '').strip() or None
+            elif tag == 'title':
+                self._title = (elem.text or '').strip() or None
+            elif tag == 'revision':
+                self._in_first_revision = False
+                if self._decision is None:
+                    self._decision = self._decide()
+        elif parent == 'revision' and self._in_first_revision:
+            if tag == 'id':
+                self._rev_id = (elem.text or '').strip() or None
+            elif tag == 'timestamp':
+                self._timestamp = (elem.text or '').strip() or None
+            if self._decision is None and self._rev_id is not None and self._timestamp is not None:
+                self._decision = self._decide()
+
+        if self._decision is False:
+            # Unchanged page: drop text as soon as it is parsed
+            elem.clear()
+        return None
+
+    def _finish_page(self) -> bool:
+        if self._decision is None:
+            self._decision = self._decide()
+
+        self.pages_checked += 1
+        if self._decision:
+            self.pages_changed += 1
+        else:
+            self.pages_skipped += 1
+
+        key = self._page_key()
+        if self._map_file and key is not None and self._rev_id is not None:
+            self._map_file.write(f"{key}\t{self._rev_id}\t{self._timestamp or ''}\n")
+
+        decision = self._decision
+        self._reset_page()
+        return decision
+
+    def summary(self) -> Tuple[int, int, int]:
+        return self.pages_checked, self.pages_changed, self.pages_skipped
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Shared-filesystem work queue for the XML to TXT Converter
+Lets any number of converter processes (on one host or on nodes sharing an NFS mount)
+convert whole files or byte ranges of a large file, with leases, heartbeats and expiry
+"""
+
+import io
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, List
+
+from record_scan import open_mmap, find_record_start, root_tags, detect_record_tag
+from record_index import RecordIndex
+
+# Queue directory layout:
+#   config.json        converter settings + output base (identical for all workers)
+#   units/NNNNNN.json  one work unit: input file, optional byte range, output part number
+#   leases/NNNNNN      lease file, created with O_EXCL; its mtime is the heartbeat
+#   done/NNNNNN.json   completion marker, written after the unit's shards are committed
+DEFAULT_LEASE_SECONDS = 120
+
+
+class RangeReader(io.RawIOBase):
+    """Read-only stream of ``root start tag + file[start:end] + root end tag``.
+
+    Lets ElementTree parse a byte range of a large file as a standalone document
+    (with the root's namespace declarations intact).
+    """
+
+    def __init__(self, path: str, start: int, end: int, prefix: bytes, suffix: bytes):
+        self.name = path
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+        self._prefix = prefix
+        self._suffix = suffix
+        self.size = len(prefix) + (end - start) + len(suffix)  # for read-ahead progress
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer)
+        if self._prefix:
+            n = min(len(view), len(self._prefix))
+            view[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        if self._remaining > 0:
+            n = self._file.readinto(view[:min(len(view), self._remaining)])
+            if n:
+                self._remaining -= n
+                return n
+            self._remaining = 0
+        if self._suffix:
+            n = min(len(view), len(self._suffix))
+            view[:n] = self._suffix[:n]
+            self._suffix = self._suffix[n:]
+            return n
+        return 0
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def _write_json_atomic(path: Path, data: dict):
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _plan_ranges(input_path: str, record_tag: str, unit_bytes: int) -> List[tuple]:
+    """Split a file into byte ranges that start and end on record boundaries."""
+    index_path = f"{input_path}.idx"
+    try:
+        index = RecordIndex(index_path) if os.path.exists(index_path) else None
+    except ValueError:
+        index = None  # index of an older version: scan instead
+    if index is not None:
+        # Balanced by record count when an up-to-date index is available
+        with index:
+            if index.record_tag == record_tag and index.stale_reason(input_path) is None:
+                parts = max(1, -(-os.path.getsize(input_path) // unit_bytes))
+                return [(start, end) for _, _, start, end in index.split(parts)]
+
+    tag = record_tag.encode('utf-8')
+    f, mm = open_mmap(input_path)
+    try:
+        root_open, root_close, data_start = root_tags(mm)
+        data_end = mm.rfind(root_close)
+        starts = []
+        pos = find_record_start(mm, tag, data_start)
+        while 0 <= pos < data_end:
+            starts.append(pos)
+            pos = find_record_start(mm, tag, pos + unit_bytes)
+    finally:
+        mm.close()
+        f.close()
+
+    return [(start, starts[i + 1] if i + 1 < len(starts) else data_end)
+            for i, start in enumerate(starts)]
+
+
+class WorkQueue:
+    """Directory-based work queue with atomic lease files."""
+
+    def __init__(self, queue_dir: str, worker_id: Optional[str] = None):
+        self.dir = Path(queue_dir)
+        self.units_dir = self.dir / 'units'
+        self.leases_dir = self.dir / 'leases'
+        self.done_dir = self.dir / 'done'
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    # ---- setup -------------------------------------------------------------
+
+    def init(self, converter_kwargs: dict, output_base: str,
+             lease_seconds: int = DEFAULT_LEASE_SECONDS):
+        """Create the queue (or verify settings of an existing one)."""
+        for d in (self.units_dir, self.leases_dir, self.done_dir):
+            d.mkdir(parents=True, exist_ok=True)
+        config_path = self.dir / 'config.json'
+        config = {
+            'converter_kwargs': converter_kwargs,
+            'output_base': os.path.abspath(output_base),
+            'lease_seconds': lease_seconds,
+        }
+        if config_path.exists():
+            existing = self.config()
+            if existing['converter_kwargs'] != converter_kwargs or existing['output_base'] != config['output_base']:
+                raise ValueError(f"Queue {self.dir} already exists with different settings")
+            return
+        _write_json_atomic(config_path, config)
+
+    def config(self) -> dict:
+        with open(self.dir / 'config.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def add_input(self, input_path: str, unit_mb: float = 256.0, record_tag: Optional[str] = None) -> int:
+        """Queue a file: whole if small, else as record-aligned byte ranges. Returns units added."""
+        input_path = os.path.abspath(input_path)
+        unit_bytes = int(unit_mb * 1024 * 1024)
+        size = os.path.getsize(input_path)
+
+        if size <= unit_bytes:
+            ranges = [(None, None)]
+        else:
+            record_tag = record_tag or detect_record_tag(input_path)
+            if not record_tag:
+                raise ValueError(f"Could not detect a record tag for {input_path}, please pass --record-tag")
+            ranges = _plan_ranges(input_path, record_tag, unit_bytes)
+
+        next_id = len(list(self.units_dir.glob('*.json')))
+        for offset, (start, end) in enumerate(ranges):
+            unit_id = next_id + offset
+            _write_json_atomic(self.units_dir / f"{unit_id:06d}.json", {
+                'id': unit_id,
+                'input': input_path,
+                'start': start,
+                'end': end,
+                'part': unit_id + 1,
+            })
+        return len(ranges)
+
+    # ---- leasing -----------------------------------------------------------
+
+    def _lease_path(self, unit_id: int) -> Path:
+        return self.leases_dir / f"{unit_id:06d}"
+
+    def _try_lease(self, unit_id: int, lease_seconds: int) -> bool:
+        lease = self._lease_path(unit_id)
+        try:
+            fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            try:
+                expired = time.time() - lease.stat().st_mtime > lease_seconds
+            except FileNotFoundError:
+                return False  # released meanwhile, pick it up on the next scan
+            if not expired:
+                return False
+            # Expired: the holder crashed. Only one contender wins the rename.
+            stale = lease.with_name(f"{lease.name}.stale.{uuid.uuid4().hex}")
+            try:
+                os.rename(lease, stale)
+            except FileNotFoundError:
+                return False
+            if time.time() - stale.stat().st_mtime <= lease_seconds:
+                # A contender that saw the same expired lease already replaced it with a
+                # fresh one, which we just renamed away: put it back and back off
+                try:
+                    os.link(stale, lease)
+                except FileExistsError:
+                    pass  # a third contender leased meanwhile; the displaced holder notices on its heartbeat
+                os.unlink(stale)
+                return False
+            os.unlink(stale)
+            print(f"  ⚠️  Unit {unit_id}: lease expired, re-queued")
+            return self._try_lease(unit_id, lease_seconds)
+        with os.fdopen(fd, 'w') as f:
+            f.write(self.worker_id)
+        return True
+
+    def _owns_lease(self, unit_id: int) -> bool:
+        try:
+            return self._lease_path(unit_id).read_text() == self.worker_id
+        except FileNotFoundError:
+            return False
+
+    def _release(self, unit_id: int):
+        if self._owns_lease(unit_id):
+            try:
+                os.unlink(self._lease_path(unit_id))
+            except FileNotFoundError:
+                pass
+
+    def claim(self, lease_seconds: int) -> Optional[dict]:
+        """Lease the first unfinished, unleased (or expired) unit."""
+        done = {p.stem for p in self.done_dir.glob('*.json')}
+        for unit_path in sorted(self.units_dir.glob('*.json')):
+            if unit_path.stem in done:
+                continue
+            unit_id = int(unit_path.stem)
+            if self._try_lease(unit_id, lease_seconds):
+                if (self.done_dir / unit_path.name).exists():
+                    self._release(unit_id)  # finished by another worker while we scanned
+                    continue
+                with open(unit_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        return None
+
+    def status(self) -> dict:
+        units = len(list(self.units_dir.glob('*.json')))
+        done = len(list(self.done_dir.glob('*.json')))
+        leased = len([p for p in self.leases_dir.iterdir() if '.stale.' not in p.name])
+        return {'units': units, 'done': done, 'leased': leased, 'pending': units - done - leased}
+
+    # ---- working -----------------------------------------------------------
+
+    def _heartbeat(self, unit_id: int, interval: float, stop: threading.Event, lost: threading.Event):
+        while not stop.wait(interval):
+            if not self._owns_lease(unit_id):
+                lost.set()
+                return
+            try:
+                os.utime(self._lease_path(unit_id))
+            except FileNotFoundError:
+                lost.set()
+                return
+
+    def _commit(self, unit: dict, tmp_base: str, output_base: str) -> List[str]:
+        """Atomically rename a unit's shards into the <output_base>_partN namespace."""
+        tmp_dir, tmp_prefix = os.path.split(tmp_base)
+        committed = []
+        for name in sorted(os.listdir(tmp_dir)):
+            if not name.startswith(tmp_prefix):
+                continue
+            suffix = name[len(tmp_prefix):]
+            if '_part1' in suffix:
+                suffix = suffix.replace('_part1', f"_part{unit['part']}", 1)
+            else:
+                stem, ext = os.path.splitext(suffix)
+                suffix = f"{stem}_part{unit['part']}{ext}"
+            target = output_base + suffix
+            os.replace(os.path.join(tmp_dir, name), target)
+            committed.append(target)
+        return committed
+
+    def work(self, converter_cls, poll_seconds: float = 5.0) -> int:
+        """Process units until every unit is done. Returns the number of units this worker did."""
+        config = self.config()
+        lease_seconds = config['lease_seconds']
+        output_base = config['output_base']
+        Path(output_base).parent.mkdir(parents=True, exist_ok=True)
+        completed = 0
+
+        print(f"👷 Worker {self.worker_id} joined queue {self.dir}")
+        while True:
+            unit = self.claim(lease_seconds)
+            if unit is None:
+                state = self.status()
+                if state['done'] >= state['units']:
+                    break
+                # Remaining units are leased by live workers; wait for them (or for expiry)
+                time.sleep(poll_seconds)
+                continue
+
+            stop, lost = threading.Event(), threading.Event()
+            beat = threading.Thread(target=self._heartbeat,
+                                    args=(unit['id'], lease_seconds / 3, stop, lost), daemon=True)
+            beat.start()
+            tmp_base = f"{output_base}.tmp-{unit['id']:06d}-{uuid.uuid4().hex[:8]}"
+            try:
+                kwargs = dict(config['converter_kwargs'])
+                kwargs['file_chunk_gb'] = float('inf')  # one shard per unit
+                converter = converter_cls(**kwargs)
+
+                if unit['start'] is None:
+                    source = unit['input']
+                else:
+                    f, mm = open_mmap(unit['input'])
+                    try:
+                        root_open, root_close, _ = root_tags(mm)
+                    finally:
+                        mm.close()
+                        f.close()
+                    source = RangeReader(unit['input'], unit['start'], unit['end'], root_open, root_close)
+
+                print(f"📦 Unit {unit['id']}: {Path(unit['input']).name}"
+                      + (f" bytes {unit['start']:,}-{unit['end']:,}" if unit['start'] is not None else ""))
+                try:
+                    converter.convert(source, tmp_base)
+                finally:
+                    if not isinstance(source, str):
+                        source.close()
+            except BaseException:
+                # Give the unit back right away instead of waiting for lease expiry
+                stop.set()
+                self._release(unit['id'])
+                raise
+            finally:
+                stop.set()
+                beat.join()
+
+            if lost.is_set() or not self._owns_lease(unit['id']):
+                # Lease expired and was taken over; discard our copy
+                print(f"  ⚠️  Unit {unit['id']}: lease lost, discarding result")
+                tmp_dir, tmp_prefix = os.path.split(tmp_base)
+                for name in os.listdir(tmp_dir):
+                    if name.startswith(tmp_prefix):
+                        os.unlink(os.path.join(tmp_dir, name))
+                continue
+
+            committed = self._commit(unit, tmp_base, output_base)
+            _write_json_atomic(self.done_dir / f"{unit['id']:06d}.json", {
+                'id': unit['id'],
+                'worker': self.worker_id,
+                'files': committed,
+                'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            })
+            self._release(unit['id'])
+            completed += 1
+
+        print(f"👷 Worker {self.worker_id}: queue finished ({completed} units by this worker)")
+        return completed
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Small client for the XML to TXT Converter daemon
+Sends a conversion job over the local Unix socket and streams back progress and results.
+Takes the same arguments as xml_converter.py; imports only the standard library it needs,
+so starting it costs a fraction of a full converter start.
+
+Usage:
+  python3 src/xml_converter.py --daemon-serve &          # start the daemon once
+  python3 src/xml_client.py input.xml output/data --format markdown
+  python3 src/xml_client.py --ping | --stop
+"""
+
+import json
+import os
+import socket
+import sys
+
+DEFAULT_SOCKET = os.environ.get('XML_CONVERTER_SOCKET', '/tmp/xml_converter.sock')
+
+
+def send_request(request: dict, socket_path: str = DEFAULT_SOCKET, on_message=None) -> dict:
+    """Send one request and return the final message (type 'done' or 'error')."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with sock.makefile('r', encoding='utf-8') as stream:
+            for line in stream:
+                message = json.loads(line)
+                if message['type'] in ('done', 'error'):
+                    return message
+                if on_message:
+                    on_message(message)
+    return {'type': 'error', 'message': 'connection closed by daemon'}
+
+
+def _print_message(message: dict):
+    if message['type'] == 'log':
+        sys.stdout.write(message['text'])
+        sys.stdout.flush()
+
+
+def main() -> int:
+    argv = sys.argv[1:]
+    socket_path = DEFAULT_SOCKET
+    if '--daemon-socket' in argv:
+        i = argv.index('--daemon-socket')
+        socket_path = argv[i + 1]
+        del argv[i:i + 2]
+
+    if argv in (['--ping'], ['--stop']):
+        request = {'cmd': argv[0][2:]}
+    else:
+        request = {'cmd': 'convert', 'argv': argv, 'cwd': os.getcwd()}
+
+    try:
+        result = send_request(request, socket_path, on_message=_print_message)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"❌ No converter daemon on {socket_path}")
+        print("   Start it with: python3 src/xml_converter.py --daemon-serve")
+        return 2
+
+    if result['type'] == 'error':
+        print(f"❌ Error: {result['message']}")
+        return 1
+    if request['cmd'] == 'ping':
+        print(f"✅ Daemon alive (PID {result['pid']}, {result['workers']} workers, {result['jobs']} jobs served)")
+    elif request['cmd'] == 'stop':
+        print("✅ Daemon stopping")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,11 +9,18 @@ import re
 import json
 import subprocess
 import time
+import copy
+import itertools
+import queue
+import traceback
+import threading
+import multiprocessing
 from io import StringIO
 from pathlib import Path
 from typing import Optional, List, Dict
 from multiprocessing import Pool, cpu_count
-from collections import Counter
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Optional Wiki markup cleanup support
 try:
@@ -22,6 +29,242 @@ try:
 except ImportError:
     WIKI_CLEANUP_AVAILABLE = False
 
+from wiki_delta import RevisionDelta
+from sampler import run_sample, format_duration
+from record_scan import (open_mmap, root_tags, parse_record, detect_record_tag,
+                         iter_record_spans, record_names, NestedRecordError)
+from record_index import RecordIndex, build_index, read_record
+from autotune import autotune
+from work_queue import WorkQueue, DEFAULT_LEASE_SECONDS
+from xml_client import DEFAULT_SOCKET
+from sharding import ShardRouter, parse_split
+from text_stream import SpilledText, StreamingPullParser, iter_streaming_events
+from readahead import ReadAheadReader, iter_events, DEFAULT_DEPTH
+from shm_ring import ShmRing, shm_available
+from text_cache import LRUCache
+from text_engine import TextEngine, indent_lines, indent_stripped_lines
+import survey
+from segmenter import Segmenter, TIKTOKEN_AVAILABLE
+from quality import QualityFilter, parse_thresholds
+from scrubber import Scrubber
+from sketches import RecordStats
+import sqlite_sink
+
+
+OUTPUT_FORMATS = ['llm_optimized', 'markdown', 'structured', 'plain', 'jsonl', 'sqlite']
+# Formats whose records are JSON objects (sqlite rows are loaded from them)
+JSON_FORMATS = ('jsonl', 'sqlite')
+
+# Placeholder for a spilled text node inside formatted output. NUL cannot occur in
+# XML 1.0 character data, so a placeholder never collides with real text.
+_SPILL_PLACEHOLDER = re.compile(r'\x00(\d+)\x00|\\u0000(\d+)\\u0000')
+
+RECORD_BACKENDS = ['auto', 'processes', 'threads']
+
+
+def gil_disabled() -> bool:
+    """True on a free-threaded build (3.13t+) running with the GIL disabled."""
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+class _OutputSink:
+    """One output stream (format + output base) with its own batching and part rotation."""
+    
+    def __init__(self, formatter, input_path: str, output_base: str, file_part: int,
+                 file_chunk_bytes: float, buffer_size: int = 4*1024*1024):
+        self.formatter = formatter
+        self.buffer_size = buffer_size
+        self.input_path = input_path
+        self.output_base = output_base
+        self.file_part = file_part
+        self.file_chunk_bytes = file_chunk_bytes
+        self.extension = '.jsonl' if formatter.output_format == 'jsonl' else '.txt'
+        # Records already end with a newline; text formats add a blank line between them
+        self.separator = '' if formatter.output_format == 'jsonl' else '\n'
+        self.current_file = None
+        self.bytes_written = 0
+        self.records_in_part = 0
+        self.records_total = 0
+        self.write_batch = []
+        self.dirty = False  # records added since the last checkpoint
+        # Streaming record sketches: current part, and finished parts (dicts for the manifest)
+        self.part_stats = RecordStats()
+        self.stats = RecordStats()
+        self.parts = []
+        self._spill_chars = 0
+        self._spill_tokens = 0
+    
+    def _part_path(self) -> str:
+        return f"{self.output_base}_part{self.file_part}{self.extension}"
+    
+    def open(self, start_element: int = 0):
+        self.current_file = open(self._part_path(), 'w', encoding='utf-8', buffering=self.buffer_size)
+        self.bytes_written = 0
+        
+        # Write header with metadata for LLM training
+        if self.formatter.add_metadata:
+            self.write(self.formatter._generate_header(self.input_path, self.file_part, start_element))
+    
+    def write(self, text: str):
+        if not text:
+            return
+        if '\x00' in text or '\\u0000' in text:
+            self._write_with_spills(text)
+            return
+        self.current_file.write(text)
+        self.bytes_written += len(text.encode('utf-8'))
+    
+    def _write_with_spills(self, text: str):
+        """Write text, streaming spilled text nodes in place of their placeholders."""
+        pos = 0
+        for match in _SPILL_PLACEHOLDER.finditer(text):
+            spill_id = int(match.group(1) or match.group(2))
+            spill = self.formatter._spills.get(spill_id)
+            if spill is None:
+                continue
+            
+            before = text[pos:match.start()]
+            line_start = before.rfind('\n') + 1
+            self.write(before[:line_start])
+            prefix = before[line_start:]
+            pos = match.end()
+            
+            mode = self.formatter.output_format
+            weight = self.formatter._spill_counts.pop(spill_id, 1)
+            wrote = False
+            for chunk in self.formatter._stream_text(spill):
+                if mode in ('structured', 'jsonl'):
+                    piece = json.dumps(chunk, ensure_ascii=False)[1:-1]
+                    piece = prefix + piece if not wrote else piece
+                elif mode == 'markdown':
+                    piece = prefix + chunk if not wrote else chunk
+                else:
+                    # Line-based formats: one indented line per non-blank line. Chunks are cut
+                    # mid-line, so a chunk's text up to its first newline (e.g. the trailing
+                    # spaces held back from the previous chunk) ends the line written last
+                    lines = chunk.split('\n')
+                    head = lines.pop(0) if wrote else ''
+                    if mode == 'plain':
+                        head = head.rstrip()
+                        lines = [line.strip() for line in lines]
+                    lines = [line for line in lines if line.strip()]
+                    if not wrote:
+                        piece = '\n'.join(prefix + line for line in lines)
+                    else:
+                        piece = head + ''.join('\n' + prefix + line for line in lines)
+                    if not piece:
+                        continue
+                self._write_counted(piece, weight)
+                wrote = True
+            
+            if not wrote and mode in ('llm_optimized', 'plain') and text.startswith('\n', pos):
+                pos += 1  # nothing left after cleanup: drop the whole line
+            elif not wrote:
+                self.write(prefix)
+            spill.release()
+            self.formatter._spills.pop(spill_id, None)
+        self.write(text[pos:])
+    
+    def _write_counted(self, piece: str, weight: int):
+        self.current_file.write(piece)
+        self.bytes_written += len(piece.encode('utf-8'))
+        formatter = self.formatter
+        formatter.char_count += len(piece) * weight
+        formatter.line_count += piece.count('\n') * weight
+        formatter.token_count += (piece.count(' ') + piece.count('\n')) * weight
+        self._spill_chars += len(piece)
+        self._spill_tokens += piece.count(' ') + piece.count('\n')
+    
+    def add(self, record_text: str, tag: Optional[str] = None):
+        if self.formatter._spills and ('\x00' in record_text or '\\u0000' in record_text):
+            # Spilled text is only measured while it is written: write this record right away
+            self.flush_batch()
+            self._spill_chars = self._spill_tokens = 0
+            before = self.bytes_written
+            self.write(record_text + self.separator)
+            plain = _SPILL_PLACEHOLDER.sub('', record_text)
+            self.part_stats.add(len(plain) + self._spill_chars,
+                                plain.count(' ') + plain.count('\n') + self._spill_tokens,
+                                self.bytes_written - before - len(self.separator), tag)
+            self.records_in_part += 1
+            self.records_total += 1
+            self.dirty = True
+            return
+        chars = len(record_text)
+        self.part_stats.add(chars, record_text.count(' ') + record_text.count('\n'),
+                            chars if record_text.isascii() else len(record_text.encode('utf-8')), tag)
+        self.write_batch.append(record_text)
+        self.records_in_part += 1
+        self.records_total += 1
+        self.dirty = True
+        
+        # Write batch when reaching batch_size (default 200)
+        if len(self.write_batch) >= self.formatter.batch_size:
+            self.flush_batch()
+    
+    def flush_batch(self):
+        if self.write_batch:
+            batch_text = self.separator.join(self.write_batch) + self.separator
+            self.write(batch_text)
+            self.write_batch.clear()
+            del batch_text
+    
+    def checkpoint(self, element_count: int) -> bool:
+        """Flush to disk and start a new part if the chunk size is reached. True if rotated."""
+        if not self.dirty:
+            return False
+        self.dirty = False
+        self.current_file.flush()
+        os.fsync(self.current_file.fileno())
+        
+        if self.bytes_written < self.file_chunk_bytes:
+            return False
+        
+        self.flush_batch()
+        if self.formatter.add_metadata:
+            self.write(self.formatter._generate_part_footer(self.file_part, self.part_stats))
+        self._finish_part()
+        self.current_file.close()
+        file_size_gb = self.bytes_written / (1024**3)
+        print(f"  ✓ File {self._part_path()} complete: {file_size_gb:.2f} GB, {self.records_in_part} elements")
+        
+        self.file_part += 1
+        self.records_in_part = 0
+        self.current_file = open(self._part_path(), 'w', encoding='utf-8', buffering=self.buffer_size)
+        self.bytes_written = 0
+        self.write(self.formatter._generate_continuation_header(self.input_path, self.file_part, element_count))
+        return True
+    
+    def _finish_part(self):
+        """Fold the current part's sketches into the totals and remember them for the manifest."""
+        self.stats.merge(self.part_stats)
+        self.parts.append({'part': self.file_part, 'path': self._part_path(),
+                           'bytes': self.bytes_written, **self.part_stats.to_dict()})
+        self.part_stats = RecordStats()
+    
+    def finish(self):
+        self.flush_batch()
+        
+        # Add statistics footer if enabled (with a part block when the output was split)
+        if self.formatter.add_metadata:
+            if self.parts:
+                self.write(self.formatter._generate_part_footer(self.file_part, self.part_stats))
+            total = RecordStats()
+            total.merge(self.stats)
+            total.merge(self.part_stats)
+            self.write(self.formatter._generate_statistics_footer(total))
+        self._finish_part()
+        
+        file_size_gb = self.bytes_written / (1024**3)
+        self.close()
+        print(f"  ✓ File {self._part_path()} complete: {file_size_gb:.2f} GB")
+    
+    def close(self):
+        if self.current_file:
+            self.current_file.close()
+            self.current_file = None
+
 
 class XMLToTXTConverter:
     
@@ -31,53 +274,185 @@ class XMLToTXTConverter:
                  output_format: str = 'llm_optimized', add_separators: bool = True,
                  normalize_whitespace: bool = True, add_metadata: bool = True,
                  min_text_length: int = 0, max_text_length: int = 0,
-                 clean_wiki_markup: bool = False):
+                 clean_wiki_markup: bool = False, record_tag: Optional[str] = None,
+                 delta_since: Optional[str] = None, delta_map: Optional[str] = None,
+                 gc_interval: int = 100, flush_interval: int = 1000,
+                 shards: int = 1, split: Optional[str] = None, shard_key: Optional[str] = None,
+                 stream_text_mb: float = 0, oversize_policy: str = 'stream',
+                 text_cache_mb: float = 64, survey_report: Optional[str] = None,
+                 segment_chars: int = 0, segment_tokens: int = 0, segment_overlap: int = 0,
+                 tokenizer: Optional[str] = None, quality_filter: Optional[str] = None,
+                 readahead: int = DEFAULT_DEPTH, readahead_mb: float = 4,
+                 workers: int = 0, ring_mb: float = 64, backend: str = 'auto',
+                 unicode_nfc: bool = False, strip_control: bool = False, scrub: Optional[str] = None):
+        # Constructor arguments, to build identical converters in worker processes
+        self._config = {name: value for name, value in locals().items() if name != 'self'}
         self.indent_size = indent_size
         self.include_attributes = include_attributes
         self.include_path = include_path
         self.file_chunk_gb = file_chunk_gb
-        self.use_parallel = use_parallel and cpu_count() > 1
+        self.use_parallel = use_parallel and (workers > 1 or cpu_count() > 1)
         self.batch_size = batch_size
-        self.num_processes = max(2, cpu_count() - 1) if self.use_parallel else 1
-        self.output_format = output_format  # 'llm_optimized', 'plain', 'markdown', 'structured'
+        self.num_processes = (workers or max(2, cpu_count() - 1)) if self.use_parallel else 1
+        # Shared-memory ring for raw records (MB); each worker gets a result ring of its share
+        self.ring_mb = ring_mb
+        # Record workers: 'processes', 'threads', or 'auto' (threads only when the GIL is disabled)
+        if backend not in RECORD_BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        self.backend = backend
+        # Elements between gen-0 collections (gen-1 every 4x); 0 leaves GC to Python
+        self.gc_interval = gc_interval
+        # Elements between flush/fsync, full GC and output chunk checks
+        self.flush_interval = max(1, flush_interval)
+        # 'llm_optimized', 'plain', 'markdown', 'structured', 'jsonl', 'sqlite'; several formats
+        # (list or comma-separated) are all written from a single parse
+        if isinstance(output_format, str):
+            output_format = [fmt.strip() for fmt in output_format.split(',') if fmt.strip()]
+        self.output_formats = list(dict.fromkeys(output_format))
+        for fmt in self.output_formats:
+            if fmt not in OUTPUT_FORMATS:
+                raise ValueError(f"Unknown output format: {fmt}")
+        if 'sqlite' in self.output_formats and not sqlite_sink.fts5_available():
+            raise ValueError("Output format sqlite needs a sqlite3 module built with FTS5")
+        self.output_format = self.output_formats[0]
         self.add_separators = add_separators
         self.normalize_whitespace = normalize_whitespace
         self.add_metadata = add_metadata
         self.min_text_length = min_text_length
         self.max_text_length = max_text_length
+        
+        # Segmentation: records longer than a training window are written as several
+        # windows (record header repeated) instead of being dropped by max_text_length
+        self.segmenter = None
+        if segment_chars or segment_tokens:
+            self.segmenter = Segmenter(max_chars=segment_chars, max_tokens=segment_tokens,
+                                       overlap=segment_overlap, tokenizer=tokenizer)
+        self.segments_written = 0
+        self.segmented_records = 0
         self.clean_wiki_markup = clean_wiki_markup
         
-        # Pre-compile regex patterns for performance
-        self._regex_spaces = re.compile(r'[ \t]+')
-        self._regex_newlines = re.compile(r'\n\s*\n\s*\n+')
+        # Delta mode (MediaWiki): only convert pages revised since a cutoff / previous map
+        self.delta_since = delta_since
+        self.delta_map = delta_map
+        self.delta_enabled = delta_since is not None or delta_map is not None
+        
+        # Record tag: only elements with this tag are formatted (as level-1 records).
+        # None keeps the classic behavior of formatting every element.
+        self.record_tag = record_tag or ('page' if self.delta_enabled else None)
+        
+        # Survey report (xml_converter.py survey --json): suggested record tag and a
+        # write buffer sized for a batch of the input's p99 records
+        self.survey_report = survey_report
+        self.write_buffer_size = None
+        if survey_report:
+            report = survey.load_report(survey_report)
+            self.record_tag = self.record_tag or survey.suggested_record_tag(report)
+            self.write_buffer_size = survey.write_buffer_size(report, self.record_tag, batch_size)
+        
+        # Quality filter: records are judged in batches on their raw text before any
+        # formatting; rejected records are never formatted or written
+        self.quality = None
+        if quality_filter:
+            if self.record_tag is None:
+                raise ValueError("The quality filter needs a record tag (--record-tag)")
+            self.quality = QualityFilter(quality_filter)
+        
+        # PII/boilerplate scrubbing: one combined regex pass per cleaned text node,
+        # before formatting; hits are counted per pattern for the footer
+        self.scrubber = Scrubber(scrub) if scrub else None
+        
+        # Text node normalization (whitespace, optional NFC and control character removal)
+        self.unicode_nfc = unicode_nfc
+        self.strip_control = strip_control
+        self._text_engine = TextEngine(collapse_whitespace=normalize_whitespace,
+                                       unicode_nfc=unicode_nfc, strip_control=strip_control)
         
         # Wiki markup cleanup patterns (pre-compiled for performance)
         if self.clean_wiki_markup:
             self._regex_ref_tags = re.compile(r'<ref[^>]*>.*?</ref>', re.DOTALL | re.IGNORECASE)
             self._regex_whitespace = re.compile(r'\s+')
         
+        # Deterministic hash sharding / train-validation split of records
+        self.router = ShardRouter(shards=shards, split=split)
+        self.shard_key = shard_key
+        
+        # Text nodes above stream_text_mb are never held in memory: 'stream' spills them to a
+        # temporary file and writes them chunk by chunk, 'truncate' keeps only the first part.
+        # 0 keeps the classic ET.iterparse path.
+        if oversize_policy not in ('stream', 'truncate'):
+            raise ValueError(f"Unknown oversize policy: {oversize_policy}")
+        self.stream_text_mb = stream_text_mb
+        self.oversize_policy = oversize_policy
+        # Spilled text nodes waiting to be written, by placeholder id (shared by all formats)
+        self._spills = {}
+        self._spill_counts = {}
+        self._spill_ids = itertools.count()
+        
+        # Read-ahead: a background thread reads readahead_mb blocks into `readahead` reusable
+        # buffers while this thread parses; 0 keeps the synchronous ET.iterparse reads
+        self.readahead = readahead
+        self.readahead_mb = readahead_mb
+        
+        # Cross-record LRU caches (shared by all formats): cleaned text of repeated text
+        # nodes and formatted attributes. 0 MB turns them off.
+        self.text_cache_mb = text_cache_mb
+        self._text_cache, self._attr_cache = self._new_caches()
+        # Entries held by the caches of record workers (see _convert_parallel)
+        self._worker_cache_entries = {}
+        # Raw tag (with namespace) -> clean tag name; tags repeat on every element
+        self._tag_names = {}
+        
+        # Cleaned text per raw text node, shared by all formats of the current record
+        # (only used when writing several formats from one parse)
+        self._text_memo = {} if len(self.output_formats) > 1 else None
+        
         # Statistics for LLM training insights
         self.token_count = 0
         self.char_count = 0
         self.line_count = 0
+        
+        # Optional callable receiving a progress dict about once per second during convert()
+        self.progress_callback = None
+    
+    def _new_caches(self, share: int = 1) -> tuple:
+        """Empty (text cache, attribute cache) pair with 1/share of text_cache_mb, (None, None) if off."""
+        cache_bytes = int(self.text_cache_mb * 1024 * 1024) // share
+        if cache_bytes <= 0:
+            return None, None
+        return LRUCache(cache_bytes), LRUCache(max(1, cache_bytes // 8), max_item_chars=1024)
+    
+    def reset_statistics(self):
+        """Reset the statistics counters (when reusing one converter for several conversions)."""
+        self.token_count = 0
+        self.char_count = 0
+        self.line_count = 0
+        self.segments_written = 0
+        self.segmented_records = 0
+        if self.quality is not None:
+            self.quality.checked = 0
+            self.quality.rejected.clear()
+        if self.scrubber is not None:
+            self.scrubber.hits.clear()
+        for cache in (self._text_cache, self._attr_cache):
+            if cache is not None:
+                cache.reset_statistics()
+        self._worker_cache_entries.clear()
     
     def _clean_tag_name(self, tag: str) -> str:
         """Clean XML tag names by removing namespaces and making readable."""
+        name = self._tag_names.get(tag)
+        if name is not None:
+            return name
+        
         # Remove namespace URLs (e.g., {http://...}tag -> tag)
-        if '}' in tag:
-            tag = tag.split('}', 1)[1]
-        return tag
+        name = tag.split('}', 1)[1] if '}' in tag else tag
+        if len(self._tag_names) < 4096:
+            self._tag_names[tag] = name
+        return name
     
     def _normalize_text(self, text: str) -> str:
-        """Normalize text for better LLM training."""
-        if not self.normalize_whitespace:
-            return text
-        
-        # Use pre-compiled regex for better performance
-        text = self._regex_spaces.sub(' ', text)  # Multiple spaces to single
-        text = self._regex_newlines.sub('\n\n', text)  # Multiple newlines to double
-        text = text.strip()
-        return text
+        """Normalize text for better LLM training (one pass, see text_engine.TextEngine)."""
+        return self._text_engine.normalize(text)
     
     def _clean_wikitext(self, text: str) -> str:
         """Remove Wikipedia markup from text.
@@ -97,6 +472,10 @@ class XMLToTXTConverter:
         if text.strip().upper().startswith('#REDIRECT'):
             return ""
         
+        return self._strip_wiki_markup(text)
+    
+    def _strip_wiki_markup(self, text: str) -> str:
+        """Markup removal part of _clean_wikitext (without the redirect check)."""
         # Remove <ref> tags (faster regex, before parsing)
         text = self._regex_ref_tags.sub('', text)
         
@@ -118,36 +497,170 @@ class XMLToTXTConverter:
                 # Fallback to simple regex if parsing fails
                 pass
         
-        # Normalize whitespace
-        text = self._regex_whitespace.sub(' ', text)
-        text = text.replace('\n ', '\n').strip()
+        # Normalize whitespace (no line breaks are left)
+        return self._regex_whitespace.sub(' ', text).strip()
+    
+    def _prepare_text(self, text: str) -> str:
+        """Normalize and wiki-clean a text node (once per record across all output formats)."""
+        if isinstance(text, SpilledText):
+            # Cleaned while the output sink writes it, see _stream_text
+            spill_id = next(self._spill_ids)
+            self._spills[spill_id] = text
+            text.refs += 1
+            return f"\x00{spill_id}\x00"
         
-        return text
+        memo = self._text_memo
+        if memo is not None:
+            cached = memo.get(text)
+            if cached is not None:
+                return cached
+        
+        cache = self._text_cache
+        if cache is not None and len(text) <= cache.max_item_chars:
+            result = cache.get(text)
+            if result is None:
+                result = self._clean_wikitext(self._normalize_text(text))
+                cache.put(text, result)
+        else:
+            result = self._clean_wikitext(self._normalize_text(text))
+        
+        # Scrubbed after the cache, so every occurrence is counted
+        if self.scrubber is not None:
+            result = self._scrub(result)
+        
+        if memo is not None:
+            memo[text] = result
+        return result
+    
+    def _scrub(self, text: str) -> str:
+        """Mask/remove PII and boilerplate; text with removed matches is normalized again."""
+        text, removed = self.scrubber.scrub(text)
+        return self._normalize_text(text) if removed else text
+    
+    def _record_key(self, element) -> bytes:
+        """Sharding key of a record: --shard-key child text / @attribute, else its content."""
+        if self.shard_key:
+            if self.shard_key.startswith('@'):
+                value = element.get(self.shard_key[1:])
+            else:
+                value = next((child.text for child in element
+                              if self._clean_tag_name(child.tag) == self.shard_key), None)
+            if value and value.strip():
+                return value.strip().encode('utf-8')
+        return b''.join(text.digest() if isinstance(text, SpilledText) else text.encode('utf-8')
+                        for text in element.itertext())
+    
+    def _stream_text(self, spill: SpilledText):
+        """Yield the normalized and wiki-cleaned content of a spilled text node in chunks.
+        
+        Chunks are cut at paragraph breaks, so whitespace collapsing and markup removal
+        give the same result as on the whole text except for markup spanning a cut.
+        """
+        pending = ''  # trailing whitespace, only emitted if more text follows
+        first = True
+        for chunk in spill.paragraphs():
+            if self.scrubber is not None:
+                chunk = self.scrubber.scrub(chunk)[0]  # gaps are collapsed below
+            chunk = self._text_engine.clean(pending + chunk)
+            if self.normalize_whitespace:
+                body = chunk.rstrip()
+                pending = chunk[len(body):]
+                chunk = body.lstrip() if first else body
+            if not chunk:
+                continue
+            if self.clean_wiki_markup:
+                if first and chunk.strip().upper().startswith('#REDIRECT'):
+                    return
+                chunk = self._strip_wiki_markup(chunk)
+                if not chunk:
+                    continue
+                chunk = chunk if first else ' ' + chunk
+            first = False
+            yield chunk
+    
+    def _inline_spills(self, text: str) -> str:
+        """text with every spill placeholder replaced by the spilled content (sqlite rows)."""
+        def inline(match):
+            spill_id = int(match.group(1) or match.group(2))
+            spill = self._spills.pop(spill_id, None)
+            if spill is None:
+                return ''
+            content = ''.join(self._stream_text(spill))
+            spill.release()
+            weight = self._spill_counts.pop(spill_id, 1)
+            self.char_count += len(content) * weight
+            self.line_count += content.count('\n') * weight
+            self.token_count += (content.count(' ') + content.count('\n')) * weight
+            return content
+        return _SPILL_PLACEHOLDER.sub(inline, text)
+    
+    def _formatters(self) -> Dict[str, 'XMLToTXTConverter']:
+        """One formatter per output format: self for the first, shallow copies for the rest.
+        
+        Copies share configuration, compiled regexes and the text memo, but keep
+        their own statistics for their own footer.
+        """
+        formatters = {self.output_format: self}
+        for fmt in self.output_formats[1:]:
+            formatter = copy.copy(self)
+            formatter.output_format = fmt
+            formatter.token_count = formatter.char_count = formatter.line_count = 0
+            formatter.segments_written = formatter.segmented_records = 0
+            formatters[fmt] = formatter
+        return formatters
+    
+    def _attribute_items(self, element):
+        """(name, value) pairs of element's attributes, values scrubbed with --scrub."""
+        if self.scrubber is None:
+            return element.attrib.items()
+        return [(k, self._scrub(v)) for k, v in element.attrib.items()]
+    
+    def _clean_attributes(self, element) -> Dict[str, str]:
+        """Attributes with cleaned names (no namespaces) and scrubbed values."""
+        return {self._clean_tag_name(k): v for k, v in self._attribute_items(element)}
     
     def _format_attributes(self, element) -> str:
         if not self.include_attributes or not element.attrib:
             return ""
         
+        # Scrubbed before the cache lookup, so every match is counted
+        items = self._attribute_items(element)
+        cache = self._attr_cache
+        if cache is not None and sum(len(k) + len(v) for k, v in items) > cache.max_item_chars:
+            cache = None
+        if cache is not None:
+            key = (self.output_format, *items)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        
         # Clean attribute names (remove namespaces)
-        clean_attribs = {self._clean_tag_name(k): v for k, v in element.attrib.items()}
+        clean_attribs = {self._clean_tag_name(k): v for k, v in items}
         
         if self.output_format == 'llm_optimized':
             # Format as key-value pairs for better LLM understanding
             attrs = " | ".join([f"{k}: {v}" for k, v in clean_attribs.items()])
-            return f" ({attrs})"
+            result = f" ({attrs})"
         elif self.output_format == 'structured':
-            return f" {json.dumps(clean_attribs)}"
+            result = f" {json.dumps(clean_attribs)}"
         else:
             attrs = ", ".join([f"{k}='{v}'" for k, v in clean_attribs.items()])
-            return f" [{attrs}]"
+            result = f" [{attrs}]"
+        
+        if cache is not None:
+            cache.put(key, result)
+        return result
     
     def _element_to_text(self, element, level: int = 0, parent_path: str = "") -> str:
-        # Use StringIO for better performance than list + join
-        output = StringIO()
+        return self._join_and_count(self._element_lines(element, level, parent_path))
+    
+    def _element_lines(self, element, level: int, parent_path: str) -> List[str]:
         indent = " " * (level * self.indent_size)
         
         # Format based on output type
-        if self.output_format == 'llm_optimized':
+        if self.output_format in JSON_FORMATS:
+            lines = self._format_jsonl(element, level, parent_path, indent)
+        elif self.output_format == 'llm_optimized':
             lines = self._format_llm_optimized(element, level, parent_path, indent)
         elif self.output_format == 'markdown':
             lines = self._format_markdown(element, level, parent_path, indent)
@@ -155,21 +668,81 @@ class XMLToTXTConverter:
             lines = self._format_structured(element, level, parent_path, indent)
         else:  # plain
             lines = self._format_plain(element, level, parent_path, indent)
-        
+        return lines
+    
+    def _join_and_count(self, lines: List[str]) -> str:
+        # Use StringIO for better performance than list + join
+        output = StringIO()
         for line in lines:
             output.write(line)
             output.write('\n')
         
         result = output.getvalue()
         output.close()
-        
+        self._count_output(result)
+        return result
+    
+    def _count_output(self, result: str):
         # Update statistics (batched for efficiency)
+        if self._spills and ('\x00' in result or '\\u0000' in result):
+            # Spilled text is counted when written, once per formatted result containing it
+            for match in _SPILL_PLACEHOLDER.finditer(result):
+                spill_id = int(match.group(1) or match.group(2))
+                self._spill_counts[spill_id] = self._spill_counts.get(spill_id, 0) + 1
         self.char_count += len(result)
         self.line_count += result.count('\n')
         # Approximate token count (words) - faster than split()
         self.token_count += result.count(' ') + result.count('\n')
+    
+    def _record_frame(self, element) -> tuple:
+        """Number of header and footer lines of a formatted level-1 record."""
+        has_children = len(element) > 0
+        separators = has_children and self.add_separators
+        if self.output_format == 'llm_optimized':
+            return (3 if has_children else 1), (1 if separators else 0)
+        if self.output_format == 'plain':
+            return (3 if separators else 1), 0
+        # markdown: rule + heading; structured: separator + the record's own object
+        return (2 if separators else 1), 0
+    
+    def _format_record(self, element, parent_path: str) -> List[str]:
+        """Formatted level-1 record: one text, or one per training window when segmenting."""
+        if self.segmenter is None:
+            return [self._element_to_text(element, 1, parent_path)]
         
-        return result
+        if self.output_format in JSON_FORMATS:
+            data = self._jsonl_data(element, parent_path)
+            windows = self.segmenter.split(data['text'])
+            if len(windows) > 1:
+                self.segmented_records += 1
+                self.segments_written += len(windows)
+                windows = [{**data, 'text': window.strip(), 'segment': i, 'segments': len(windows)}
+                           for i, window in enumerate(windows)]
+            else:
+                windows = [data]
+            return [self._join_and_count([json.dumps(window, ensure_ascii=False)]) for window in windows]
+        
+        lines = self._element_lines(element, 1, parent_path)
+        head, tail = self._record_frame(element)
+        body = lines[head:len(lines) - tail]
+        if self.output_format == 'structured':
+            # Child objects are pretty-printed JSON: windows only end between them
+            windows = self.segmenter.split_blocks([line + '\n' for line in body])
+        else:
+            windows = self.segmenter.split(''.join(line + '\n' for line in body))
+        if len(windows) <= 1:
+            return [self._join_and_count(lines)]
+        
+        self.segmented_records += 1
+        self.segments_written += len(windows)
+        header = ''.join(line + '\n' for line in lines[:head])
+        footer = ''.join(line + '\n' for line in lines[len(lines) - tail:])
+        texts = []
+        for window in windows:
+            text = header + window + ('' if window.endswith('\n') else '\n') + footer
+            self._count_output(text)
+            texts.append(text)
+        return texts
     
     def _format_llm_optimized(self, element, level: int, parent_path: str, indent: str) -> List[str]:
         """Format optimized for LLM training with clear structure and context."""
@@ -195,42 +768,31 @@ class XMLToTXTConverter:
             # Nested elements
             lines.append(f"{indent}## {tag_name.title()}{attributes}")
         
+        # Content indentation; all lines of a text node are appended as one block
+        content_indent = "  " if level == 1 else f"{indent}  " if level > 1 else ""
+        
         # Process text content
         has_text = element.text and element.text.strip()
         if has_text:
-            text_content = self._normalize_text(element.text)
-            text_content = self._clean_wikitext(text_content)
+            text_content = self._prepare_text(element.text)
             if self._is_valid_text(text_content):
-                # Add content with proper indentation
-                for line in text_content.split('\n'):
-                    if line.strip():
-                        if level == 1:
-                            lines.append(f"  {line}")
-                        elif level > 1:
-                            lines.append(f"{indent}  {line}")
-                        else:
-                            lines.append(f"{line}")
+                block = indent_lines(text_content, content_indent)
+                if block:
+                    lines.append(block)
         
         # Process children
         for child in element:
-            child_indent = " " * ((level + 1) * self.indent_size)
             child_text = self._element_to_text(child, level + 1, tag_name)
             if child_text:
                 lines.append(child_text)
             
             # Process tail content
             if child.tail and child.tail.strip():
-                tail_content = self._normalize_text(child.tail)
-                tail_content = self._clean_wikitext(tail_content)
+                tail_content = self._prepare_text(child.tail)
                 if self._is_valid_text(tail_content):
-                    for line in tail_content.split('\n'):
-                        if line.strip():
-                            if level == 1:
-                                lines.append(f"  {line}")
-                            elif level > 1:
-                                lines.append(f"{indent}  {line}")
-                            else:
-                                lines.append(f"{line}")
+                    block = indent_lines(tail_content, content_indent)
+                    if block:
+                        lines.append(block)
         
         # Add section separator for major sections
         if level == 1 and has_children and self.add_separators:
@@ -247,7 +809,7 @@ class XMLToTXTConverter:
         # Format attributes for markdown (cleaner than default)
         attr_str = ""
         if self.include_attributes and element.attrib:
-            clean_attribs = {self._clean_tag_name(k): v for k, v in element.attrib.items()}
+            clean_attribs = self._clean_attributes(element)
             attrs = [f"**{k}**: {v}" for k, v in clean_attribs.items()]
             attr_str = f" ({', '.join(attrs)})"
         
@@ -262,8 +824,7 @@ class XMLToTXTConverter:
         
         # Add text content as blockquote for leaf elements
         if element.text and element.text.strip():
-            text_content = self._normalize_text(element.text)
-            text_content = self._clean_wikitext(text_content)
+            text_content = self._prepare_text(element.text)
             if self._is_valid_text(text_content):
                 if not has_children and level > 0:
                     # Leaf node - format as blockquote
@@ -278,8 +839,7 @@ class XMLToTXTConverter:
                 lines.append(child_text)
             
             if child.tail and child.tail.strip():
-                tail_content = self._normalize_text(child.tail)
-                tail_content = self._clean_wikitext(tail_content)
+                tail_content = self._prepare_text(child.tail)
                 if self._is_valid_text(tail_content):
                     lines.append(f"\n{tail_content}\n")
         
@@ -301,12 +861,11 @@ class XMLToTXTConverter:
         
         # Add attributes if present (with cleaned names)
         if element.attrib:
-            data["attributes"] = {self._clean_tag_name(k): v for k, v in element.attrib.items()}
+            data["attributes"] = self._clean_attributes(element)
         
         # Add text content if present
         if element.text and element.text.strip():
-            text_content = self._normalize_text(element.text)
-            text_content = self._clean_wikitext(text_content)
+            text_content = self._prepare_text(element.text)
             if self._is_valid_text(text_content):
                 data["text"] = text_content
         
@@ -349,16 +908,11 @@ class XMLToTXTConverter:
         
         # Add text content
         if element.text and element.text.strip():
-            text_content = self._normalize_text(element.text)
-            text_content = self._clean_wikitext(text_content)
+            text_content = self._prepare_text(element.text)
             if self._is_valid_text(text_content):
-                for line in text_content.split('\n'):
-                    line = line.strip()
-                    if line:
-                        if level == 1:
-                            lines.append(f"{indent}  {line}")
-                        else:
-                            lines.append(f"{indent}    {line}")
+                block = indent_stripped_lines(text_content, f"{indent}  " if level == 1 else f"{indent}    ")
+                if block:
+                    lines.append(block)
         
         # Process children
         for child in element:
@@ -368,34 +922,67 @@ class XMLToTXTConverter:
             
             # Process tail text
             if child.tail and child.tail.strip():
-                tail_content = self._normalize_text(child.tail)
-                tail_content = self._clean_wikitext(tail_content)
+                tail_content = self._prepare_text(child.tail)
                 if self._is_valid_text(tail_content):
-                    for line in tail_content.split('\n'):
-                        line = line.strip()
-                        if line:
-                            lines.append(f"{indent}  {line}")
+                    block = indent_stripped_lines(tail_content, f"{indent}  ")
+                    if block:
+                        lines.append(block)
         
         return lines
     
+    def _format_jsonl(self, element, level: int, parent_path: str, indent: str) -> List[str]:
+        """One JSON object per record: path, attributes and the record's cleaned text."""
+        return [json.dumps(self._jsonl_data(element, parent_path), ensure_ascii=False)]
+    
+    def _jsonl_data(self, element, parent_path: str) -> dict:
+        tag_name = self._clean_tag_name(element.tag)
+        data = {"path": f"{parent_path}/{tag_name}" if parent_path else tag_name}
+        if self.include_attributes and element.attrib:
+            data["attributes"] = self._clean_attributes(element)
+        
+        texts = []
+        for node in element.iter():
+            for raw in (node.text, node.tail if node is not element else None):
+                if raw and raw.strip():
+                    text_content = self._prepare_text(raw)
+                    if self._is_valid_text(text_content):
+                        texts.append(text_content)
+        data["text"] = '\n'.join(texts)
+        return data
+    
     def _is_valid_text(self, text: str) -> bool:
         """Check if text meets length requirements."""
         if not text:
             return False
         
         text_len = len(text)
+        if text[0] == '\x00':
+            # Spilled text node: check its raw length, free it if it is dropped
+            spill_id = int(text[1:-1])
+            spill = self._spills[spill_id]
+            text_len = len(spill)
+            if self.min_text_length > 0 and text_len < self.min_text_length or \
+                    self.max_text_length > 0 and text_len > self.max_text_length and self.segmenter is None:
+                spill.release()
+                if spill.refs <= 0:
+                    del self._spills[spill_id]
+                return False
+            return True
         
         if self.min_text_length > 0 and text_len < self.min_text_length:
             return False
         
-        if self.max_text_length > 0 and text_len > self.max_text_length:
+        # Long texts are split into windows instead of dropped when segmenting
+        if self.max_text_length > 0 and text_len > self.max_text_length and self.segmenter is None:
             return False
         
         return True
     
     def _generate_header(self, input_path: str, file_part: int, start_element: int) -> str:
         """Generate document header with metadata for LLM training."""
-        if self.output_format == 'llm_optimized':
+        if self.output_format in JSON_FORMATS:
+            return ""  # every line must stay a JSON object
+        elif self.output_format == 'llm_optimized':
             header = f"""
 {'#'*80}
 # TRAINING DOCUMENT METADATA
@@ -424,8 +1011,40 @@ class XMLToTXTConverter:
             header += "=" * 80 + "\n\n"
             return header
     
-    def _generate_statistics_footer(self) -> str:
+    def _generate_continuation_header(self, input_path: str, file_part: int, element_count: int) -> str:
+        """Header of parts after the first (written when a part reaches the chunk size)."""
+        if self.output_format in JSON_FORMATS:
+            return ""
+        header = f"Document: {Path(input_path).name}\n"
+        header += f"Part {file_part} | Process: {os.getpid()}\n"
+        header += f"Continuing from element {element_count + 1}\n"
+        header += "=" * 80 + "\n\n"
+        return header
+    
+    def _generate_root_header(self, root) -> str:
+        """Root element banner (llm_optimized and markdown only)."""
+        if self.output_format not in ['llm_optimized', 'markdown']:
+            return ""
+        
+        root_tag = self._clean_tag_name(root.tag)
+        attributes = self._format_attributes(root)
+        if self.output_format == 'llm_optimized':
+            root_line = f"\n{'#'*60}\n# ROOT: {root_tag.upper()}{attributes}\n{'#'*60}\n\n"
+        else:
+            root_line = f"# {root_tag.title()}{attributes}\n\n"
+        
+        if isinstance(root.text, str) and root.text.strip():
+            text_content = self._normalize_text(root.text)
+            if self.scrubber is not None:
+                text_content = self._scrub(text_content)
+            if self._is_valid_text(text_content):
+                root_line += f"{text_content}\n\n"
+        return root_line
+    
+    def _generate_statistics_footer(self, record_stats: Optional[RecordStats] = None) -> str:
         """Generate statistics footer for training insights."""
+        if self.output_format in JSON_FORMATS:
+            return ""
         footer = f"""
 {'='*80}
 DOCUMENT STATISTICS (For Training Reference)
@@ -434,10 +1053,526 @@ Total Characters: {self.char_count:,}
 Total Lines: {self.line_count:,}
 Estimated Tokens: {self.token_count:,}
 Format: {self.output_format}
-{'='*80}
+{self._distribution_statistics(record_stats)}{self._quality_statistics()}{self._cache_statistics()}{'='*80}
 """
         return footer
     
+    def _generate_part_footer(self, file_part: int, record_stats: RecordStats) -> str:
+        """Distribution block closing one part of a split output."""
+        if self.output_format in JSON_FORMATS:
+            return ""
+        return f"""
+{'='*80}
+PART {file_part} STATISTICS
+{'='*80}
+{self._distribution_statistics(record_stats)}{'='*80}
+"""
+    
+    def _distribution_statistics(self, record_stats: Optional[RecordStats]) -> str:
+        """Record count, length/token quantiles and tag byte shares (empty without records)."""
+        if record_stats is None or not record_stats.records:
+            return ""
+        chars = record_stats.chars.summary()
+        tokens = record_stats.tokens.summary()
+        shares = list(record_stats.tag_shares().items())
+        tags = ", ".join(f"{tag} {share:.1%}" for tag, share in shares[:8])
+        if len(shares) > 8:
+            tags += f", ... ({len(shares) - 8} more)"
+        return (f"Records: {record_stats.records:,}\n"
+                f"Record Characters: p50 {chars['p50']:,} | p90 {chars['p90']:,} | p99 {chars['p99']:,} | "
+                f"max {chars['max']:,} | mean {chars['mean']:,.0f}\n"
+                f"Record Tokens (estimated): p50 {tokens['p50']:,} | p90 {tokens['p90']:,} | "
+                f"p99 {tokens['p99']:,} | max {tokens['max']:,} | mean {tokens['mean']:,.0f}\n"
+                f"Tag Byte Shares: {tags}\n")
+    
+    def _quality_statistics(self) -> str:
+        """Quality filter and scrubbing lines (empty when both are off)."""
+        lines = f"Quality Filter: {self.quality.summary()}\n" if self.quality is not None else ""
+        if self.scrubber is not None:
+            lines += f"Scrubbed: {self.scrubber.summary()}\n"
+        return lines
+    
+    def _cache_statistics(self) -> str:
+        """Hit/miss lines of the text and attribute caches (empty when caching is off)."""
+        lines = ""
+        for label, name, cache in (("Text Cache", 'text', self._text_cache),
+                                   ("Attribute Cache", 'attributes', self._attr_cache)):
+            if cache is not None and cache.hits + cache.misses:
+                entries = len(cache) + self._worker_cache_entries.get(name, 0)
+                lines += (f"{label}: {cache.hit_rate():.1%} hits ({cache.hits:,} hits / "
+                          f"{cache.misses:,} misses, {entries:,} entries)\n")
+        return lines
+    
+    def _record_backend(self) -> str:
+        """'threads' if requested, or for 'auto' when the GIL is disabled; else 'processes'."""
+        if self.backend == 'auto':
+            return 'threads' if gil_disabled() else 'processes'
+        return self.backend
+    
+    def _parallel_records(self, input_path) -> Optional[bytes]:
+        """Record tag as written in the file if convert() can hand records to record workers
+        (see _convert_parallel), else None.
+        """
+        if not (self.use_parallel and self.num_processes > 1 and self.record_tag):
+            return None
+        # Needs a mappable file and stateless records: delta mode and spilled text stay in one process
+        if not isinstance(input_path, str) or self.delta_enabled or self.stream_text_mb > 0:
+            return None
+        if self._record_backend() != 'threads':
+            ring_bytes = int(self.ring_mb * 1024 * 1024)
+            if not shm_available(ring_bytes * 2 + 1024 * 1024):
+                return None
+        # Workers get records cut out by byte scanning: the tag must be written one way
+        # (e.g. always <mw:item>) and records must not nest, as far as the file head shows
+        try:
+            f, mm = open_mmap(input_path)
+        except (OSError, ValueError):
+            return None
+        try:
+            _, _, pos = root_tags(mm)
+            names, nested = record_names(mm, self.record_tag.encode('utf-8'), pos)
+        except ValueError:
+            names, nested = set(), False
+        finally:
+            mm.close()
+            f.close()
+        if nested:
+            reason = "records nest inside each other"
+        elif not names:
+            reason = "no records in the first 4 MB"
+        elif len(names) > 1:
+            reason = "tag written as " + ", ".join(sorted(name.decode('utf-8', 'replace') for name in names))
+        else:
+            return names.pop()
+        print(f"ℹ️  <{self.record_tag}>: {reason}, parsing in one process")
+        return None
+    
+    def _mapped_root_header(self, mm, sinks: list) -> tuple:
+        """Write the root header of mmap'ed input; returns (root, root start tag, root end tag, offset)."""
+        root_open, root_close, pos = root_tags(mm)
+        text_end = mm.find(b'<', pos)
+        # Root element with its attributes and leading text, for the root header
+        root_parser = ET.XMLParser()
+        root_parser.feed(root_open + mm[pos:text_end if text_end >= 0 else pos] + root_close)
+        root = root_parser.close()
+        if text_end >= 0 and mm[text_end:text_end + 2] != b'</':
+            for sink in sinks:
+                sink.write(sink.formatter._generate_root_header(root))
+        return root, root_open, root_close, pos
+    
+    def _judge_records(self, elems: list) -> list:
+        """Quality filter verdicts (None = keep) for a chunk of parsed records, judged as one batch."""
+        quality = self.quality
+        if quality is None:
+            return [None] * len(elems)
+        return quality.evaluate([quality.record_text(elem) for elem in elems])
+    
+    def _record_chunk_size(self) -> int:
+        """Records per record worker task: a quality filter batch, else one record."""
+        return self.quality.batch_size if self.quality is not None else 1
+    
+    def _format_parsed_record(self, formatters: list, elem, root_tag: str, reason: Optional[str]) -> tuple:
+        """(reject reason, route, [(formatter index, text), ...]) of one record parsed by a record worker."""
+        if reason is not None:
+            return reason, (None, None), []
+        route = self.router.route(self._record_key(elem)) if self.router.enabled else (None, None)
+        pieces = [(index, text) for index, formatter in enumerate(formatters)
+                  for text in formatter._format_record(elem, root_tag)]
+        if self._text_memo is not None:
+            self._text_memo.clear()
+        return reason, route, pieces
+    
+    def _convert_parallel(self, input_path: str, formatters: dict, routes: dict, sinks: list,
+                          tag: bytes, start_element: int, start_time: float) -> int:
+        """Record mode with formatting worker processes. Returns the element count.
+        
+        This process scans record boundaries in the mmap'ed input and copies each raw
+        record into a shared-memory ring; workers parse and format straight from the
+        ring and put the UTF-8 result into their own ring. Only offsets travel through
+        the queues. Results are written in input order, so the output matches the
+        single-process path; a full ring makes the scanner wait for results (backpressure).
+        """
+        workers = self.num_processes
+        ring_bytes = int(self.ring_mb * 1024 * 1024)
+        context = multiprocessing.get_context()
+        # Each worker gets its share of the cache budget, so memory does not grow with --workers
+        config = dict(self._config, record_tag=self.record_tag, survey_report=None, use_parallel=False,
+                      text_cache_mb=self.text_cache_mb / workers)
+        formatter_list = list(formatters.values())
+        # route -> formatter index -> sinks
+        route_sinks = {route: {i: [sink for sink in stream_sinks if sink.formatter is formatter]
+                               for i, formatter in enumerate(formatter_list)}
+                       for route, stream_sinks in routes.items()}
+        chunk_records = self._record_chunk_size()
+        max_inflight = workers * max(256, chunk_records)
+        
+        f, mm = open_mmap(input_path)
+        data = memoryview(mm)
+        in_ring = ShmRing(ring_bytes)
+        out_rings = [ShmRing(max(4 * 1024 * 1024, ring_bytes // workers)) for _ in range(workers)]
+        tasks = context.Queue()
+        results = context.Queue()
+        processes = []
+        try:
+            _, root_open, root_close, pos = self._mapped_root_header(mm, sinks)
+            
+            for worker_id in range(workers):
+                process = context.Process(target=_record_worker, daemon=True,
+                                          args=(config, worker_id, root_open, root_close, in_ring.name,
+                                                out_rings[worker_id].name, tasks, results))
+                process.start()
+                processes.append(process)
+            print(f"⚙️  Record workers: {workers} processes (shared-memory rings, {self.ring_mb:g} MB)")
+            
+            element_count = 0
+            submitted = 0  # sequence number of the next record sent to the workers
+            written = 0  # sequence number of the next record to write
+            chunk = []  # (ring offset, size, raw bytes) of the records of the next task
+            inflight = deque()  # input ring end position per submitted, unwritten record
+            pending = {}  # seq -> result waiting for earlier records
+            finished_workers = 0
+            last_update_time = time.time()
+            
+            def next_result():
+                while True:
+                    try:
+                        return results.get(timeout=1.0)
+                    except queue.Empty:
+                        for process in processes:
+                            if process.exitcode not in (None, 0):
+                                raise RuntimeError(f"Formatting worker exited with code {process.exitcode}")
+            
+            def handle(result):
+                nonlocal written, element_count, finished_workers
+                kind = result[0]
+                if kind == 'error':
+                    raise RuntimeError(f"Formatting worker {result[1]} failed:\n{result[2]}")
+                if kind == 'done':
+                    finished_workers += 1
+                    self._merge_worker_statistics(result[2])
+                    return
+                pending[result[1]] = result
+                while written in pending:
+                    _, _, worker_id, tag_name, reason, route, pieces, counts, placed, blob = pending.pop(written)
+                    if self.quality is not None:
+                        self.quality.checked += 1
+                        if reason is not None:
+                            self.quality.rejected[reason] += 1
+                    view = out_rings[worker_id].view(placed[0], sum(n for _, n in pieces)) if placed else blob
+                    offset = 0
+                    for index, n in pieces:
+                        text = str(view[offset:offset + n], 'utf-8')
+                        offset += n
+                        for sink in route_sinks[route][index]:
+                            sink.add(text, tag_name)
+                    del view
+                    for formatter, (chars, lines, tokens, segments, segmented) in zip(formatter_list, counts):
+                        formatter.char_count += chars
+                        formatter.line_count += lines
+                        formatter.token_count += tokens
+                        formatter.segments_written += segments
+                        formatter.segmented_records += segmented
+                    if placed:
+                        out_rings[worker_id].release(placed[1])
+                    in_end = inflight.popleft()
+                    if in_end is not None:
+                        in_ring.release(in_end)
+                    written += 1
+                    element_count += 1
+                    if element_count % self.flush_interval == 0:
+                        for sink in sinks:
+                            sink.checkpoint(element_count)
+            
+            def submit_chunk():
+                nonlocal submitted
+                if chunk:
+                    tasks.put((submitted, list(chunk)))
+                    submitted += len(chunk)
+                    chunk.clear()
+            
+            for start, end in iter_record_spans(mm, tag, pos):
+                if element_count < start_element:
+                    element_count += 1  # resume: skipped without formatting
+                    continue
+                
+                size = end - start
+                while (submitted + len(chunk) - written >= max_inflight
+                       or (size <= in_ring.capacity and not in_ring.fits(size))):
+                    submit_chunk()  # a partial chunk goes out before waiting for results
+                    handle(next_result())
+                if size <= in_ring.capacity:
+                    offset, in_end = in_ring.write(data[start:end])
+                    chunk.append((offset, size, None))
+                else:
+                    in_end = None
+                    chunk.append((None, size, bytes(data[start:end])))  # larger than the ring
+                inflight.append(in_end)
+                if len(chunk) >= chunk_records:
+                    submit_chunk()
+                
+                while True:
+                    try:
+                        handle(results.get_nowait())
+                    except queue.Empty:
+                        break
+                
+                current_time = time.time()
+                if current_time - last_update_time >= 1.0:
+                    self._report_progress(element_count, sinks, start_time, end, len(mm))
+                    last_update_time = current_time
+            
+            submit_chunk()
+            for _ in processes:
+                tasks.put(None)
+            while written < submitted or finished_workers < len(processes):
+                handle(next_result())
+            for process in processes:
+                process.join()
+            return element_count
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            del data
+            for ring in [in_ring, *out_rings]:
+                ring.close()
+            mm.close()
+            f.close()
+    
+    def _merge_worker_statistics(self, statistics: dict):
+        """Add a worker's cache and scrub counters to this converter's (for the footer)."""
+        for name, cache in (('text', self._text_cache), ('attributes', self._attr_cache)):
+            counters = statistics.get(name)
+            if cache is not None and counters is not None:
+                hits, misses, evictions, entries = counters
+                cache.hits += hits
+                cache.misses += misses
+                cache.evictions += evictions
+                self._worker_cache_entries[name] = self._worker_cache_entries.get(name, 0) + entries
+        if self.scrubber is not None:
+            self.scrubber.hits.update(statistics.get('scrub', {}))
+    
+    def _worker_statistics(self) -> dict:
+        """Cache and scrub counters of a record worker's converter, for _merge_worker_statistics."""
+        statistics = {name: (cache.hits, cache.misses, cache.evictions, len(cache))
+                      for name, cache in (('text', self._text_cache), ('attributes', self._attr_cache))
+                      if cache is not None}
+        if self.scrubber is not None:
+            statistics['scrub'] = dict(self.scrubber.hits)
+        return statistics
+    
+    def _thread_copy(self) -> 'XMLToTXTConverter':
+        """Converter for one formatting thread (see _convert_threaded).
+        
+        Shares configuration, compiled regexes and the tag name map, but has its
+        own statistics counters, caches, text memo, quality and scrub counters,
+        so no counter is ever updated by two threads.
+        """
+        worker = copy.copy(self)
+        worker.token_count = worker.char_count = worker.line_count = 0
+        worker.segments_written = worker.segmented_records = 0
+        worker._text_cache, worker._attr_cache = self._new_caches(share=self.num_processes)
+        worker._worker_cache_entries = {}
+        worker._text_memo = {} if self._text_memo is not None else None
+        if self.quality is not None:
+            worker.quality = copy.copy(self.quality)
+            worker.quality.checked = 0
+            worker.quality.rejected = Counter()
+        if self.scrubber is not None:
+            worker.scrubber = copy.copy(self.scrubber)
+            worker.scrubber.hits = Counter()
+        return worker
+    
+    def _merge_thread_statistics(self, formatter_list: list, thread_formatters: list):
+        """Add the per-thread accumulators of _convert_threaded to these formatters."""
+        for local_formatters in thread_formatters:
+            for formatter, local in zip(formatter_list, local_formatters):
+                formatter.char_count += local.char_count
+                formatter.line_count += local.line_count
+                formatter.token_count += local.token_count
+                formatter.segments_written += local.segments_written
+                formatter.segmented_records += local.segmented_records
+            worker = local_formatters[0]
+            if self.quality is not None:
+                self.quality.checked += worker.quality.checked
+                self.quality.rejected.update(worker.quality.rejected)
+            self._merge_worker_statistics(worker._worker_statistics())
+    
+    def _convert_threaded(self, input_path: str, formatters: dict, routes: dict, sinks: list,
+                          tag: bytes, start_element: int, start_time: float) -> int:
+        """Record mode with a pool of formatting threads. Returns the element count.
+        
+        Meant for free-threaded builds: threads parse straight from the mmap'ed input
+        and share this converter's configuration and compiled regexes, so nothing is
+        copied, pickled or imported again per worker. Each thread formats with its own
+        formatters (see _thread_copy), whose statistics are merged at the end. Results
+        are written in input order, so the output matches the single-process path.
+        Records are cut out by byte scanning like in _convert_parallel: tag is the record
+        tag as written (see _parallel_records), and nested records raise NestedRecordError.
+        """
+        workers = self.num_processes
+        formatter_list = list(formatters.values())
+        # route -> formatter index -> sinks
+        route_sinks = {route: [[sink for sink in stream_sinks if sink.formatter is formatter]
+                               for formatter in formatter_list]
+                       for route, stream_sinks in routes.items()}
+        chunk_records = self._record_chunk_size()
+        max_inflight = workers * max(4, 256 // chunk_records)  # in chunks
+        local = threading.local()
+        thread_formatters = []  # formatter list of every thread, merged at the end
+        
+        f, mm = open_mmap(input_path)
+        data = memoryview(mm)
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='xml-format')
+        try:
+            root, root_open, root_close, pos = self._mapped_root_header(mm, sinks)
+            root_tag = self._clean_tag_name(root.tag)
+            gil = "GIL disabled" if gil_disabled() else "GIL enabled, formatting is serialized"
+            print(f"⚙️  Record workers: {workers} threads ({gil})")
+            
+            def format_chunk(spans):
+                local_formatters = getattr(local, 'formatters', None)
+                if local_formatters is None:
+                    local_formatters = local.formatters = list(self._thread_copy()._formatters().values())
+                    thread_formatters.append(local_formatters)
+                converter = local_formatters[0]
+                parsed = [parse_record(data[start:end], root_open, root_close) for start, end in spans]
+                reasons = converter._judge_records([elem for elem, _ in parsed])
+                results = []
+                for (elem, record_root), reason in zip(parsed, reasons):
+                    tag_name = converter._clean_tag_name(elem.tag)
+                    results.append((tag_name, *converter._format_parsed_record(local_formatters, elem,
+                                                                                root_tag, reason)))
+                    elem.clear()
+                    record_root.clear()
+                return results
+            
+            element_count = 0
+            inflight = deque()  # futures of submitted, unwritten chunks in input order
+            spans = []  # records of the next chunk
+            last_update_time = time.time()
+            
+            def write(future):
+                nonlocal element_count
+                for tag_name, _, route, pieces in future.result():  # rejected records have no pieces
+                    for index, text in pieces:
+                        for sink in route_sinks[route][index]:
+                            sink.add(text, tag_name)
+                    element_count += 1
+                    if element_count % self.flush_interval == 0:
+                        for sink in sinks:
+                            sink.checkpoint(element_count)
+            
+            for start, end in iter_record_spans(mm, tag, pos):
+                if element_count < start_element:
+                    element_count += 1  # resume: skipped without formatting
+                    continue
+                spans.append((start, end))
+                if len(spans) >= chunk_records:
+                    inflight.append(pool.submit(format_chunk, spans))
+                    spans = []
+                while inflight and (len(inflight) >= max_inflight or inflight[0].done()):
+                    write(inflight.popleft())
+                
+                current_time = time.time()
+                if current_time - last_update_time >= 1.0:
+                    self._report_progress(element_count, sinks, start_time, end, len(mm))
+                    last_update_time = current_time
+            
+            if spans:
+                inflight.append(pool.submit(format_chunk, spans))
+            while inflight:
+                write(inflight.popleft())
+            pool.shutdown()
+            self._merge_thread_statistics(formatter_list, thread_formatters)
+            return element_count
+        finally:
+            pool.shutdown(cancel_futures=True)
+            del data
+            mm.close()
+            f.close()
+    
+    def _report_progress(self, element_count: int, sinks: list, start_time: float,
+                         bytes_consumed: Optional[int] = None, input_bytes: Optional[int] = None):
+        """Progress line and progress_callback; with the input position also percent done and ETA."""
+        primary = sinks[0]
+        total_gb = sum(sink.bytes_written for sink in sinks) / (1024**3)
+        elapsed = time.time() - start_time
+        elements_per_sec = element_count / elapsed if elapsed > 0 else 0
+        location = f"File {primary.file_part}" if len(sinks) == 1 else f"{len(sinks)} streams"
+        done = min(1.0, bytes_consumed / input_bytes) if input_bytes else None
+        eta = elapsed * (1 - done) / done if done else None
+        position = f" | {done:.1%} | ETA {format_duration(eta)}" if eta is not None else ""
+        print(f"\r  ... {element_count:,} elements | {location}: {total_gb:.2f} GB | {int(elements_per_sec):,} elem/s{position}", end='', flush=True)
+        if self.progress_callback:
+            self.progress_callback({
+                'elements': element_count,
+                'file_part': primary.file_part,
+                'bytes_written': primary.bytes_written,
+                'elements_per_sec': elements_per_sec,
+                'elapsed': elapsed,
+                'input_bytes': input_bytes,
+                'bytes_consumed': bytes_consumed,
+                'eta': eta,
+            })
+    
+    def _write_manifest(self, path: str, source_name, routes: dict, start_element: int,
+                        element_count: int, seconds: float) -> str:
+        """JSON manifest: per-part and per-stream record sketches, merged totals per format."""
+        streams = []
+        totals = {}
+        for (split, shard), stream_sinks in routes.items():
+            for sink in stream_sinks:
+                fmt = sink.formatter.output_format
+                streams.append({'format': fmt, 'split': split, 'shard': shard,
+                                'parts': sink.parts, **sink.stats.to_dict()})
+                totals.setdefault(fmt, RecordStats()).merge(sink.stats)
+        manifest = {
+            'version': 1,
+            'input': os.path.abspath(source_name) if isinstance(source_name, str) else str(source_name),
+            'record_tag': self.record_tag,
+            'start_element': start_element,
+            'elements': element_count,
+            'seconds': round(seconds, 3),
+            'formats': {fmt: stats.to_dict(buckets=True) for fmt, stats in totals.items()},
+            'streams': streams,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        return path
+    
+    def build_index(self, input_path: str, index_path: Optional[str] = None, key: str = 'auto') -> str:
+        """Write a record offset index for input_path (default: <input>.idx)."""
+        index_path = index_path or f"{input_path}.idx"
+        record_tag = self.record_tag or detect_record_tag(input_path, clean=self._clean_tag_name)
+        if not record_tag:
+            raise ValueError("Could not detect a record tag, please pass --record-tag")
+        
+        start_time = time.time()
+        count = build_index(input_path, index_path, record_tag, key=key)
+        print(f"🗂️  Index: {count:,} <{record_tag}> records -> {index_path} ({time.time() - start_time:.1f}s)")
+        return index_path
+    
+    def get_record(self, input_path: str, index_path: Optional[str] = None,
+                   ordinal: Optional[int] = None, key: Optional[str] = None) -> str:
+        """Convert a single record, located via the record index (by ordinal or key)."""
+        with RecordIndex(index_path or f"{input_path}.idx") as index:
+            if key is not None:
+                ordinal = index.find(key)
+                if ordinal is None:
+                    raise KeyError(f"No record with key {key!r}")
+            raw = read_record(index, input_path, ordinal)
+        
+        f, mm = open_mmap(input_path)
+        try:
+            root_open, root_close, _ = root_tags(mm)
+        finally:
+            mm.close()
+            f.close()
+        
+        elem, root = parse_record(raw, root_open, root_close)
+        return '\n'.join(self._format_record(elem, self._clean_tag_name(root.tag)))
+    
     def convert(self, input_path: str, output_base: str, 
                 start_element: int = 0, file_part: int = 1):
         print(f"=" * 80)
@@ -448,206 +1583,379 @@ Format: {self.output_format}
         print()
         
         file_chunk_bytes = self.file_chunk_gb * 1024 * 1024 * 1024
+        gc_gen0 = self.gc_interval
+        gc_gen1 = self.gc_interval * 4
+        gc_gen2 = self.gc_interval > 0
         element_count = 0
         processed_in_session = 0
-        bytes_written = 0
-        current_file = None
         root_element = None
         root_written = False
-        files_in_session = 0
         last_update_time = time.time()  # Track last progress update
         
+        # input_path may also be a binary file object (e.g. a byte range of a larger file)
+        source_name = getattr(input_path, 'name', input_path)
+        
+        # One sink per output format and split/shard stream; all sinks share one parse
+        # and the per-record text memo
+        streams = self.router.streams()
+        formatters = self._formatters()
+        stream_count = len(streams) * len(formatters)
+        # Keep total write buffering around the single-stream 4 MB..32 MB
+        buffer_size = 4*1024*1024 if stream_count <= 8 else max(256*1024, 32*1024*1024 // stream_count)
+        if self.write_buffer_size:
+            buffer_size = max(256*1024, self.write_buffer_size // stream_count)
+        sinks = []
+        routes = {}
+        for fmt, formatter in formatters.items():
+            fmt_base = output_base if len(self.output_formats) == 1 else f"{output_base}_{fmt}"
+            for split, shard in streams:
+                sink_base = fmt_base + ShardRouter.stream_suffix(split, shard, self.router.shards)
+                sink_class = sqlite_sink.SQLiteSink if fmt == 'sqlite' else _OutputSink
+                sink = sink_class(formatter, source_name, sink_base, file_part, file_chunk_bytes,
+                                  buffer_size=buffer_size)
+                sinks.append(sink)
+                routes.setdefault((split, shard), []).append(sink)
+        primary = sinks[0]
+        
+        reader = None  # read-ahead input stage (also reports input position for the ETA)
+        delta = None
+        if self.delta_enabled:
+            delta = RevisionDelta(since=self.delta_since, previous_map=self.delta_map,
+                                  page_tag=self.record_tag)
+            delta.open_map(f"{output_base}_revmap.tsv")
+            print(f"🔁 Delta mode: {len(delta.previous):,} pages in previous map"
+                  + (f", cutoff {delta.since}" if delta.since else ""))
+        
         try:
-            output_path = f"{output_base}_part{file_part}.txt"
-            current_file = open(output_path, 'w', encoding='utf-8', buffering=4*1024*1024)
-            
-            # Write header with metadata for LLM training
-            if self.add_metadata:
-                header = self._generate_header(input_path, file_part, start_element)
-            else:
-                header = ""
-            
-            if header:
-                current_file.write(header)
-                bytes_written = len(header.encode('utf-8'))
-            else:
-                bytes_written = 0
+            for sink in sinks:
+                sink.open(start_element)
             
-            write_batch = []
             start_time = time.time()  # Track overall processing time
             
-            context = ET.iterparse(input_path, events=('start', 'end'))
-            context = iter(context)
-            event, root = next(context)
-            
-            skip_count = 0
-            for event, elem in context:
-                if event != 'end':
-                    continue
+            stream_parser = None
+            record_name = self._parallel_records(input_path)
+            if record_name:
+                convert_records = (self._convert_threaded if self._record_backend() == 'threads'
+                                   else self._convert_parallel)
+                try:
+                    element_count = convert_records(input_path, formatters, routes, sinks, record_name,
+                                                    start_element, start_time)
+                except NestedRecordError as e:
+                    raise NestedRecordError(f"{e}; convert this file with --no-parallel") from None
+            else:
+                if self.readahead > 0:
+                    reader = ReadAheadReader(input_path, int(self.readahead_mb * 1024 * 1024), self.readahead)
+                    if self.stream_text_mb > 0:
+                        stream_parser = StreamingPullParser(int(self.stream_text_mb * 1024 * 1024), self.oversize_policy)
+                    context = iter_events(reader, stream_parser)
+                elif self.stream_text_mb > 0:
+                    context, stream_parser = iter_streaming_events(
+                        input_path, int(self.stream_text_mb * 1024 * 1024), self.oversize_policy)
+                else:
+                    context = ET.iterparse(input_path, events=('start', 'end'))
+                context = iter(context)
+                event, root = next(context)
                 
-                if elem == root:
-                    continue
+                if delta is not None:
+                    delta.observe(event, self._clean_tag_name(root.tag), root)
                 
-                if root_element is None:
-                    root_element = root
-                    
-                    # Write root element header if using certain formats
-                    if self.output_format in ['llm_optimized', 'markdown']:
-                        root_tag = self._clean_tag_name(root.tag)
-                        attributes = self._format_attributes(root)
-                        if self.output_format == 'llm_optimized':
-                            root_line = f"\n{'#'*60}\n# ROOT: {root_tag.upper()}{attributes}\n{'#'*60}\n\n"
-                        else:
-                            root_line = f"# {root_tag.title()}{attributes}\n\n"
-                        current_file.write(root_line)
-                        bytes_written += len(root_line.encode('utf-8'))
-                        
-                        if root.text and root.text.strip():
-                            text_content = self._normalize_text(root.text)
-                            if self._is_valid_text(text_content):
-                                text_line = f"{text_content}\n\n"
-                                current_file.write(text_line)
-                                bytes_written += len(text_line.encode('utf-8'))
-                    
-                    root_written = True
-                    continue
+                # Tree pruning: a finished element that no pending record needs is cleared and
+                # detached from its own parent right away. Each parent then holds at most the
+                # element just finished, so removal is O(1) and the live tree is bounded by the
+                # open elements (plus the current record).
+                stack = [root]  # open elements, innermost last
+                open_records = 0  # open <record_tag> elements on the stack
+                record_tags = {}  # raw tag -> is a record tag
                 
-                if element_count < start_element:
-                    element_count += 1
+                def is_record(tag) -> bool:
+                    flag = record_tags.get(tag)
+                    if flag is None:
+                        flag = record_tags[tag] = (self.record_tag is not None
+                                                   and self._clean_tag_name(tag) == self.record_tag)
+                    return flag
+                
+                def prune(elem, parent):
                     elem.clear()
-                    if root_element is not None and elem in root_element:
-                        root_element.remove(elem)
-                    del elem
-                    
-                    if element_count % 10 == 0:
-                        gc.collect()
-                    continue
+                    # Classic mode has written elem already; an open record still needs its parts
+                    if self.record_tag is None or not open_records:
+                        parent.remove(elem)
                 
-                if root_written:
-                    # Process element (has_children check is done inside format methods if needed)
-                    root_tag = self._clean_tag_name(root_element.tag)
-                    element_text = self._element_to_text(elem, level=1, parent_path=root_tag)
-                    
-                    element_count += 1
-                    processed_in_session += 1
+                def write_record(elem):
+                    route = (None, None)
+                    if self.router.enabled:
+                        route = self.router.route(self._record_key(elem))
+                    tag = self._clean_tag_name(elem.tag)
+                    for sink in routes[route]:
+                        for record_text in sink.formatter._format_record(elem, root_tag):
+                            sink.add(record_text, tag)
+                    if self._text_memo is not None:
+                        self._text_memo.clear()
+                
+                # Quality filter: finished records wait (detached, not cleared) until a batch is judged
+                quality = self.quality
+                pending = []  # (record element, raw text)
+                
+                def flush_pending():
+                    verdicts = quality.evaluate([text for _, text in pending])
+                    for (record_elem, _), reason in zip(pending, verdicts):
+                        if reason is None:
+                            write_record(record_elem)
+                        record_elem.clear()
+                    pending.clear()
+                
+                skip_count = 0
+                for event, elem in context:
+                    record_changed = None
+                    if delta is not None:
+                        record_changed = delta.observe(event, self._clean_tag_name(elem.tag), elem)
                     
-                    write_batch.append(element_text)
-                    del element_text
+                    if event == 'start':
+                        stack.append(elem)
+                        if is_record(elem.tag):
+                            open_records += 1
+                        continue
                     
-                    # Write batch when reaching batch_size (default 200)
-                    if len(write_batch) >= self.batch_size:
-                        batch_text = '\n'.join(write_batch) + '\n'
-                        current_file.write(batch_text)
-                        bytes_written += len(batch_text.encode('utf-8'))
-                        write_batch.clear()
-                        del batch_text
+                    stack.pop()
+                    if elem is root:
+                        continue
+                    parent = stack[-1]
+                    record = is_record(elem.tag)
+                    if record:
+                        open_records -= 1
                     
-                    # Optimized GC intervals (tuned for batch_size=200)
-                    if processed_in_session % 100 == 0:
-                        gc.collect(0)  # Quick gen-0 collection
-                        
-                    if processed_in_session % 400 == 0:
-                        gc.collect(1)  # Gen-1 collection
+                    if root_element is None:
+                        root_element = root
                         
-                    if processed_in_session % 1000 == 0:
-                        gc.collect(2)  # Full collection
-                        current_file.flush()
-                        os.fsync(current_file.fileno())
+                        # Write root element header if using certain formats
+                        for sink in sinks:
+                            sink.write(sink.formatter._generate_root_header(root))
                         
-                        if bytes_written >= file_chunk_bytes:
-                            if write_batch:
-                                batch_text = '\n'.join(write_batch) + '\n'
-                                current_file.write(batch_text)
-                                bytes_written += len(batch_text.encode('utf-8'))
-                                write_batch.clear()
-                                del batch_text
-                            
-                            current_file.close()
-                            file_size_gb = bytes_written / (1024**3)
-                            print(f"  ✓ File {file_part} complete: {file_size_gb:.2f} GB, {processed_in_session} elements")
-                            
-                            file_part += 1
-                            
-                            output_path = f"{output_base}_part{file_part}.txt"
-                            current_file = open(output_path, 'w', encoding='utf-8', buffering=4*1024*1024)
-                            
-                            header = f"Document: {Path(input_path).name}\n"
-                            header += f"Part {file_part} | Process: {os.getpid()}\n"
-                            header += f"Continuing from element {element_count + 1}\n"
-                            header += "=" * 80 + "\n\n"
-                            current_file.write(header)
-                            bytes_written = len(header.encode('utf-8'))
-                            processed_in_session = 0
-                            last_update_time = time.time()  # Reset timer for new file
+                        root_written = True
+                        if self.record_tag is None:
+                            if parent is root:
+                                prune(elem, parent)
+                            continue
                     
-                    # Progress update every 1 second (time-based for smooth updates)
-                    current_time = time.time()
-                    if current_time - last_update_time >= 1.0:
-                        total_gb = bytes_written / (1024**3)
-                        elapsed = current_time - start_time
-                        elements_per_sec = element_count / elapsed if elapsed > 0 else 0
-                        print(f"\r  ... {element_count:,} elements | File {file_part}: {total_gb:.2f} GB | {int(elements_per_sec):,} elem/s", end='', flush=True)
-                        last_update_time = current_time
+                    if self.record_tag is not None and not record:
+                        # Part of a record: formatted with its record; outside any record: dropped
+                        if not open_records:
+                            prune(elem, parent)
+                        continue
                     
-                    elem.clear()
+                    if record_changed is False:
+                        # Delta mode: unchanged page, skipped before any text processing
+                        prune(elem, parent)
+                        del elem
+                        skip_count += 1
+                        continue
                     
-                    try:
-                        if root is not None and elem in root:
-                            root.remove(elem)
-                    except ValueError:
-                        pass
-                    
-                    del elem
+                    if element_count < start_element:
+                        element_count += 1
+                        prune(elem, parent)
+                        del elem
+                        
+                        if element_count % 10 == 0:
+                            gc.collect()
+                        continue
                     
-                    if processed_in_session % 1000 == 0 and root is not None:
-                        for child in list(root):
-                            if child.tag != root.tag:
-                                try:
-                                    root.remove(child)
-                                except ValueError:
-                                    pass
-            
-            if write_batch and current_file:
-                batch_text = '\n'.join(write_batch) + '\n'
-                current_file.write(batch_text)
-                bytes_written += len(batch_text.encode('utf-8'))
-                write_batch.clear()
-            
-            # Add statistics footer if enabled
-            if current_file and self.add_metadata:
-                footer = self._generate_statistics_footer()
-                current_file.write(footer)
-            
-            if current_file:
-                current_file.close()
-                file_size_gb = bytes_written / (1024**3)
-                print()  # New line after progress updates
-                print(f"  ✓ File {file_part} complete: {file_size_gb:.2f} GB")
+                    if root_written:
+                        # Process element (has_children check is done inside format methods if needed)
+                        root_tag = self._clean_tag_name(root_element.tag)
+                        if quality is None:
+                            write_record(elem)
+                        else:
+                            pending.append((elem, quality.record_text(elem)))
+                            # A nested record stays attached to its parent: judge it right away
+                            if len(pending) >= quality.batch_size or not (parent is root or not open_records):
+                                flush_pending()
+                        
+                        element_count += 1
+                        processed_in_session += 1
+                        
+                        # GC intervals (default 100/400/1000, tuned for batch_size=200; see --autotune)
+                        if gc_gen0 and processed_in_session % gc_gen0 == 0:
+                            gc.collect(0)  # Quick gen-0 collection
+                            
+                        if gc_gen1 and processed_in_session % gc_gen1 == 0:
+                            gc.collect(1)  # Gen-1 collection
+                            
+                        if processed_in_session % self.flush_interval == 0:
+                            if gc_gen2:
+                                gc.collect(2)  # Full collection
+                            if pending:
+                                flush_pending()  # checkpoints only cover written records
+                            for sink in sinks:
+                                if sink.checkpoint(element_count):
+                                    last_update_time = time.time()  # Reset timer for new file
+                        
+                        # Progress update every 1 second (time-based for smooth updates)
+                        current_time = time.time()
+                        if current_time - last_update_time >= 1.0:
+                            if reader is not None:
+                                self._report_progress(element_count, sinks, start_time,
+                                                      reader.bytes_consumed, reader.total_bytes)
+                            else:
+                                self._report_progress(element_count, sinks, start_time)
+                            last_update_time = current_time
+                        
+                        if pending and pending[-1][0] is elem:
+                            parent.remove(elem)  # cleared after the batch is judged
+                        else:
+                            prune(elem, parent)
+                        del elem
+                
+                if pending:
+                    flush_pending()
+            print()  # New line after progress updates
+            for sink in sinks:
+                sink.finish()
+            manifest_path = self._write_manifest(f"{output_base}_manifest.json", source_name, routes,
+                                                 start_element, element_count, time.time() - start_time)
             
             print()
             print("=" * 80)
             print(f"✅ CONVERSION COMPLETE!")
-            print(f"📊 Total: {element_count} elements in {file_part} files")
+            if self.router.enabled:
+                print(f"📊 Total: {element_count} elements in {len(sinks)} streams "
+                      f"({len(streams)} split/shard streams x {len(formatters)} formats)")
+                for split in dict.fromkeys(split for split, _ in streams):
+                    counts = [sink.records_total for (stream_split, _), stream_sinks in routes.items()
+                              for sink in stream_sinks[:1] if stream_split == split]
+                    print(f"   • {split or 'all'}: {sum(counts):,} records"
+                          + (f" over {len(counts)} shards (min {min(counts):,} / max {max(counts):,})"
+                             if len(counts) > 1 else ""))
+            else:
+                print(f"📊 Total: {element_count} elements in {primary.file_part} files"
+                      + (f" per format ({', '.join(self.output_formats)})" if len(sinks) > 1 else ""))
+            if stream_parser is not None:
+                builder = stream_parser.target
+                if self.oversize_policy == 'truncate':
+                    print(f"✂️  Oversized text nodes truncated to {self.stream_text_mb:g} MB: {builder.truncated_nodes:,}")
+                else:
+                    print(f"🌊 Oversized text nodes streamed from disk: {builder.spilled_nodes:,}")
+            if reader is not None:
+                print(f"📥 Read-ahead: {reader.depth} x {self.readahead_mb:g} MB blocks, "
+                      f"parser waited for input {reader.stalls:,} times")
+            if self.segmenter is not None:
+                print(f"✂️  Segmentation ({self.segmenter.describe()}): "
+                      f"{self.segmented_records:,} long records -> {self.segments_written:,} windows")
+            if self.quality is not None:
+                print(f"🧹 Quality filter: {self.quality.summary()}")
+            if self.scrubber is not None:
+                print(f"🧽 Scrubbed: {self.scrubber.summary()}")
+            if delta is not None:
+                checked, changed, skipped = delta.summary()
+                print(f"🔁 Delta: {changed:,} new/changed of {checked:,} pages ({skipped:,} unchanged skipped)")
+                print(f"🔁 Revision map: {output_base}_revmap.tsv")
             if self.add_metadata:
-                print(f"📝 Total characters: {self.char_count:,}")
-                print(f"📝 Total tokens (estimated): {self.token_count:,}")
-                print(f"📝 Output format: {self.output_format}")
+                for stats in formatters.values():
+                    label = f" [{stats.output_format}]" if len(formatters) > 1 else ""
+                    print(f"📝 Total characters{label}: {stats.char_count:,}")
+                    print(f"📝 Total tokens (estimated){label}: {stats.token_count:,}")
+                print(f"📝 Output format: {', '.join(self.output_formats)}")
+                for line in self._cache_statistics().splitlines():
+                    print(f"🧠 {line}")
+            if primary.stats.records:
+                chars = primary.stats.chars.summary()
+                print(f"📏 Record length [{primary.formatter.output_format}]: p50 {chars['p50']:,} | "
+                      f"p90 {chars['p90']:,} | p99 {chars['p99']:,} | max {chars['max']:,} chars")
+            print(f"🧾 Manifest: {manifest_path}")
             print("=" * 80)
             
         except Exception as e:
-            if current_file:
-                current_file.close()
+            for sink in sinks:
+                sink.close()
             print(f"❌ Error: {e}")
             raise
         finally:
+            if reader is not None:
+                reader.close()
+            if delta is not None:
+                delta.close()
             if root_element is not None:
                 root_element.clear()
+            for spill in self._spills.values():
+                spill.close()
+            self._spills.clear()
+            self._spill_counts.clear()
             gc.collect()
     
 
 
 
-def main():
+def _record_worker(config: dict, worker_id: int, root_open: bytes, root_close: bytes,
+                   in_ring_name: str, out_ring_name: str, tasks, results):
+    """Formatting worker process of XMLToTXTConverter._convert_parallel.
+    
+    Tasks are chunks of records (one quality filter batch each). Parses each record
+    straight from the shared input ring, formats it for every output format and
+    writes the UTF-8 result into this worker's own ring; the result message carries
+    offsets, per-format piece lengths and statistics deltas.
+    """
+    in_ring = out_ring = None
+    try:
+        converter = XMLToTXTConverter(**config)
+        formatters = list(converter._formatters().values())
+        in_ring = ShmRing(name=in_ring_name)
+        out_ring = ShmRing(name=out_ring_name)
+        root_tag = None
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            seq, records = task
+            parsed = [parse_record(in_ring.view(offset, size) if raw is None else raw, root_open, root_close)
+                      for offset, size, raw in records]
+            if root_tag is None:
+                root_tag = converter._clean_tag_name(parsed[0][1].tag)
+            reasons = converter._judge_records([elem for elem, _ in parsed])
+            
+            for i, ((elem, root), reason) in enumerate(zip(parsed, reasons)):
+                for formatter in formatters:
+                    formatter.char_count = formatter.line_count = formatter.token_count = 0
+                    formatter.segments_written = formatter.segmented_records = 0
+                reason, route, texts = converter._format_parsed_record(formatters, elem, root_tag, reason)
+                chunks = [text.encode('utf-8') for _, text in texts]
+                pieces = [(index, len(data)) for (index, _), data in zip(texts, chunks)]
+                counts = [(formatter.char_count, formatter.line_count, formatter.token_count,
+                           formatter.segments_written, formatter.segmented_records) for formatter in formatters]
+                blob = b''.join(chunks)
+                placed = out_ring.write(blob)
+                results.put(('record', seq + i, worker_id, converter._clean_tag_name(elem.tag), reason, route,
+                             pieces, counts, placed, None if placed else blob))
+                elem.clear()
+                root.clear()
+        
+        results.put(('done', worker_id, converter._worker_statistics()))
+    except BaseException:
+        results.put(('error', worker_id, traceback.format_exc()))
+    finally:
+        for ring in (in_ring, out_ring):
+            if ring is not None:
+                ring.close()
+
+
+def _format_list(value: str) -> str:
+    """argparse type for --format: one or more comma-separated known formats."""
+    formats = [fmt.strip() for fmt in value.split(',') if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+    if not formats or unknown:
+        raise argparse.ArgumentTypeError(
+            f"invalid format {', '.join(unknown) or value!r} (choose from {', '.join(OUTPUT_FORMATS)})")
+    return ','.join(formats)
+
+
+def _split_spec(value: str) -> str:
+    """argparse type for --split: validates name=fraction pairs."""
+    try:
+        parse_split(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    """Command-line parser (shared with the converter daemon, which parses client argv)."""
     parser = argparse.ArgumentParser(
         description="XML to TXT Converter - Optimized for LLM Training",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -657,6 +1965,8 @@ Output Formats:
   markdown       - Markdown format with headers and formatting
   structured     - JSON-like structured data
   plain          - Simple plain text (original format)
+  jsonl          - One JSON object per record (path, attributes, text)
+  sqlite         - SQLite database with an FTS5 full-text index (<output_base>.sqlite)
 
 Examples:
   # LLM-optimized format with metadata
@@ -667,10 +1977,24 @@ Examples:
   
   # Filter short text (< 10 chars)
   python3 xml_converter.py input.xml output/data --min-length 10
+  
+  # Training text, review markdown and an indexable JSONL from a single parse
+  python3 xml_converter.py input.xml output/data --format llm_optimized,markdown,jsonl
+  
+  # Searchable review copy next to the training text, then a full-text query
+  python3 xml_converter.py input.xml output/data --format llm_optimized,sqlite --record-tag page
+  python3 xml_converter.py search output/data_sqlite.sqlite '"machine learning"'
+  
+  # Preview output and estimate size/time before a long run
+  python3 xml_converter.py input.xml --sample 20 --record-tag page
+  
+  # Survey the file's structure (no output written), then convert using the report
+  python3 xml_converter.py survey input.xml --json input.survey.json
+  python3 xml_converter.py input.xml output/data --survey-report input.survey.json
         """
     )
-    parser.add_argument('input', help='Input XML file')
-    parser.add_argument('output_base', help='Base output path (e.g., output/data)')
+    parser.add_argument('input', nargs='?', help='Input XML file')
+    parser.add_argument('output_base', nargs='?', help='Base output path (e.g., output/data)')
     parser.add_argument('--start-element', type=int, default=0,
                        help='Element to start from (for resume)')
     parser.add_argument('--file-part', type=int, default=1,
@@ -683,6 +2007,33 @@ Examples:
                        help='Disable parallel processing (use single core)')
     parser.add_argument('--batch-size', type=int, default=200,
                        help='Number of elements to batch before writing (default: 200)')
+    parser.add_argument('--gc-interval', type=int, default=100,
+                       help='Elements between gen-0 GC collections, gen-1 every 4x; 0 = automatic GC (default: 100)')
+    parser.add_argument('--flush-interval', type=int, default=1000,
+                       help='Elements between flush/fsync, full GC and chunk-size checks (default: 1000)')
+    parser.add_argument('--text-cache-mb', type=float, default=64, metavar='MB',
+                       help='LRU cache for cleaned text of repeated text nodes and attributes (default: 64 MB, 0 = off)')
+    parser.add_argument('--readahead', type=int, default=DEFAULT_DEPTH, metavar='N',
+                       help=f'Input blocks read ahead by a background thread (default: {DEFAULT_DEPTH}, 0 = synchronous reads)')
+    parser.add_argument('--readahead-mb', type=float, default=4, metavar='MB',
+                       help='Size of each read-ahead block (default: 4 MB)')
+    parser.add_argument('--workers', type=int, default=0, metavar='N',
+                       help='Formatting worker processes in record mode (default: CPUs - 1; see --no-parallel)')
+    parser.add_argument('--ring-mb', type=float, default=64, metavar='MB',
+                       help='Shared-memory ring for records sent to the workers (default: 64 MB)')
+    parser.add_argument('--backend', choices=RECORD_BACKENDS, default='auto',
+                       help='Record workers: processes, threads, or auto = threads only when the GIL is disabled (default: auto)')
+    parser.add_argument('--survey-report', default=None, metavar='JSON',
+                       help='Report from "xml_converter.py survey --json": default record tag and write buffer size')
+    parser.add_argument('--autotune', action='store_true',
+                       help='Time trial runs on the input head and use the fastest batch/GC/flush settings '
+                            '(stored per input type and reused)')
+    parser.add_argument('--autotune-mb', type=float, default=8.0,
+                       help='Input MB used for autotune trials (default: 8)')
+    parser.add_argument('--autotune-memory-mb', type=float, default=4096.0,
+                       help='Reject autotune settings whose peak RSS exceeds this (default: 4096)')
+    parser.add_argument('--autotune-refresh', action='store_true',
+                       help='Ignore a stored autotune profile and re-run the trials')
     parser.add_argument('--no-attributes', action='store_true',
                        help='Exclude XML attributes')
     parser.add_argument('--no-path', action='store_true',
@@ -690,57 +2041,111 @@ Examples:
     
     # LLM Training Optimization Options
     parser.add_argument('--format', '--output-format', dest='format', 
-                       choices=['llm_optimized', 'markdown', 'structured', 'plain'],
-                       default='llm_optimized',
-                       help='Output format (default: llm_optimized)')
+                       type=_format_list, default='llm_optimized',
+                       help=f"Output format: {', '.join(OUTPUT_FORMATS)} (default: llm_optimized). "
+                            "Comma-separate several formats to write them all from one parse, "
+                            "each to <output_base>_<format>_partN")
     parser.add_argument('--no-separators', action='store_true',
                        help='Disable section separators')
     parser.add_argument('--no-normalize', action='store_true',
                        help='Disable whitespace normalization')
+    parser.add_argument('--unicode-nfc', action='store_true',
+                       help='Normalize text nodes to Unicode NFC (composed characters)')
+    parser.add_argument('--strip-control', action='store_true',
+                       help='Remove control characters (C0/C1 except tab, newline and carriage return)')
     parser.add_argument('--no-metadata', action='store_true',
                        help='Disable document metadata headers/footers')
     parser.add_argument('--min-length', type=int, default=0,
                        help='Minimum text length to include (filter short text)')
     parser.add_argument('--max-length', type=int, default=0,
                        help='Maximum text length to include (filter long text)')
+    parser.add_argument('--segment-chars', type=int, default=0, metavar='N',
+                       help='Split long records into windows of at most N chars (record header repeated; --max-length is then ignored)')
+    parser.add_argument('--segment-tokens', type=int, default=0, metavar='N',
+                       help='Split long records into windows of at most N tokens (estimated, or exact with --tokenizer)')
+    parser.add_argument('--segment-overlap', type=int, default=0, metavar='N',
+                       help='Repeat up to N chars/tokens of the previous window at the start of the next')
+    parser.add_argument('--tokenizer', default=None, metavar='ENCODING',
+                       help='tiktoken encoding for --segment-tokens, e.g. cl100k_base (requires tiktoken)')
+    parser.add_argument('--quality-filter', nargs='?', const='default', default=None, metavar='SPEC',
+                       help='Drop low-quality records (letter/digit/punctuation ratios, repeated lines, boilerplate) '
+                            'before formatting, e.g. min_alpha=0.6,max_dup_lines=0.2,boilerplate=markers.txt '
+                            '(requires a record tag)')
+    parser.add_argument('--scrub', nargs='?', const='default', default=None, metavar='SPEC',
+                       help='Mask PII and remove boilerplate phrases in one regex pass per text node: '
+                            'email, phone, ipv4, credit_card, ssn, iban, boilerplate, phrases=FILE, '
+                            'patterns=FILE (name = regex per line), mode=mask|remove (default: all built-ins, mask)')
     parser.add_argument('--clean-wiki-markup', action='store_true',
                        help='Remove Wikipedia markup ([[links]], {{templates}}, <ref> tags). Requires mwparserfromhell.')
+    parser.add_argument('--record-tag', default=None,
+                       help='Only format elements with this tag as records (e.g. page); nested elements are formatted with their record')
+    parser.add_argument('--stream-text-mb', type=float, default=0, metavar='MB',
+                       help='Never hold a text node above MB in memory (0 = off): see --oversize-policy')
+    parser.add_argument('--oversize-policy', choices=['stream', 'truncate'], default='stream',
+                       help='Text nodes above --stream-text-mb: stream through a temporary file (default) or truncate')
     
-    args = parser.parse_args()
+    # Deterministic sharding / train-validation split
+    parser.add_argument('--shards', type=int, default=1,
+                       help='Write N balanced shard streams in one pass (<output_base>[_split]_shardNNN_partN)')
+    parser.add_argument('--split', type=_split_spec, default=None, metavar='SPEC',
+                       help='Hash-based split, e.g. train=0.99,val=0.01 (stable across reruns)')
+    parser.add_argument('--shard-key', default=None, metavar='KEY',
+                       help='Hash this child tag (e.g. title) or @attribute instead of the record content')
     
-    # Check Wiki cleanup availability
-    if args.clean_wiki_markup and not WIKI_CLEANUP_AVAILABLE:
-        print()
-        print("⚠️  Warning: --clean-wiki-markup requires 'mwparserfromhell' library")
-        print("   Install it with: pip install mwparserfromhell")
-        print("   Continuing without Wiki markup cleanup...")
-        print()
-        args.clean_wiki_markup = False
+    # MediaWiki delta mode
+    parser.add_argument('--delta-since', default=None, metavar='TIMESTAMP',
+                       help='Delta mode: only convert pages revised at/after this time (e.g. 2025-10-01T00:00:00Z)')
+    parser.add_argument('--delta-map', default=None, metavar='REVMAP',
+                       help='Delta mode: previous run\'s <output>_revmap.tsv; only new/changed pages are converted')
     
-    # Show optimization info
-    print()
-    print("🤖 LLM Training Optimization Settings:")
-    print(f"   • Output Format: {args.format}")
-    print(f"   • Whitespace Normalization: {'Enabled' if not args.no_normalize else 'Disabled'}")
-    print(f"   • Metadata: {'Enabled' if not args.no_metadata else 'Disabled'}")
-    print(f"   • Section Separators: {'Enabled' if not args.no_separators else 'Disabled'}")
-    if args.clean_wiki_markup:
-        print(f"   • Wiki Markup Cleanup: Enabled (removes [[links]], {{{{templates}}}})")
-    if args.min_length > 0:
-        print(f"   • Minimum Text Length: {args.min_length} chars")
-    if args.max_length > 0:
-        print(f"   • Maximum Text Length: {args.max_length} chars")
-    print()
-    
-    if not args.no_parallel and cpu_count() > 1:
-        print(f"⚡ Performance Optimizations Enabled:")
-        print(f"   • Batch Writing: {args.batch_size} elements per batch")
-        print(f"   • String Builder: Optimized text generation")
-        print(f"   • I/O Buffer: 4 MB write buffer")
-        print(f"   • CPU Cores: Using {max(2, cpu_count()-1)} cores")
-        print()
+    # Preview / estimation
+    parser.add_argument('--sample', type=int, default=0, metavar='K',
+                       help='Preview mode: convert records at K random offsets and estimate the full run (no output written)')
+    parser.add_argument('--sample-records', type=int, default=5,
+                       help='Records converted at each sample offset (default: 5)')
+    parser.add_argument('--seed', type=int, default=None,
+                       help='Random seed for --sample (for reproducible previews)')
+    
+    # Record offset index (random access to single records)
+    parser.add_argument('--build-index', action='store_true',
+                       help='Write a record offset index (<input>.idx); without output_base only the index is built')
+    parser.add_argument('--index', default=None, metavar='PATH',
+                       help='Index file path (default: <input>.idx)')
+    parser.add_argument('--index-key', default='auto',
+                       help='Record key for the index: child tag (title), or @attribute (default: auto = title/id/@id)')
+    parser.add_argument('--get-record', type=int, default=None, metavar='N',
+                       help='Print record N (0-based) converted, using the index')
+    parser.add_argument('--get-key', default=None, metavar='KEY',
+                       help='Print the record with this key (e.g. a page title) converted, using the index')
+    
+    # Distributed mode: shared-filesystem work queue
+    parser.add_argument('--queue-dir', default=None, metavar='DIR',
+                       help='Work queue directory on a shared filesystem (local disk or NFS)')
+    parser.add_argument('--queue-init', action='store_true',
+                       help='Add input to the queue (whole file, or record-aligned byte ranges of --unit-mb) '
+                            'with the current converter settings and output_base')
+    parser.add_argument('--queue-work', action='store_true',
+                       help='Run a worker: claim units until the queue is finished (start any number, on any node)')
+    parser.add_argument('--queue-status', action='store_true',
+                       help='Show queue progress')
+    parser.add_argument('--unit-mb', type=float, default=256.0,
+                       help='Work unit size for --queue-init (default: 256 MB)')
+    parser.add_argument('--lease-seconds', type=int, default=DEFAULT_LEASE_SECONDS,
+                       help=f'Lease expiry for crashed workers (default: {DEFAULT_LEASE_SECONDS}s)')
     
-    converter = XMLToTXTConverter(
+    # Daemon mode: warm converters + worker pool behind a local Unix socket
+    parser.add_argument('--daemon-serve', action='store_true',
+                       help='Run the converter daemon (clients: python3 src/xml_client.py ...)')
+    parser.add_argument('--daemon-socket', default=DEFAULT_SOCKET, metavar='PATH',
+                       help=f'Unix socket of the daemon (default: {DEFAULT_SOCKET})')
+    parser.add_argument('--daemon-workers', type=int, default=max(1, cpu_count() - 1),
+                       help='Worker processes of the daemon (default: CPU cores - 1)')
+    return parser
+
+
+def converter_kwargs_from_args(args) -> dict:
+    """XMLToTXTConverter keyword arguments for parsed command-line args."""
+    return dict(
         indent_size=args.indent,
         include_attributes=not args.no_attributes,
         include_path=not args.no_path,
@@ -750,11 +2155,186 @@ Examples:
         output_format=args.format,
         add_separators=not args.no_separators,
         normalize_whitespace=not args.no_normalize,
+        unicode_nfc=args.unicode_nfc,
+        strip_control=args.strip_control,
         add_metadata=not args.no_metadata,
         min_text_length=args.min_length,
         max_text_length=args.max_length,
-        clean_wiki_markup=args.clean_wiki_markup
+        clean_wiki_markup=args.clean_wiki_markup,
+        record_tag=args.record_tag,
+        delta_since=args.delta_since,
+        delta_map=args.delta_map,
+        gc_interval=args.gc_interval,
+        flush_interval=args.flush_interval,
+        shards=args.shards,
+        split=args.split,
+        shard_key=args.shard_key,
+        stream_text_mb=args.stream_text_mb,
+        oversize_policy=args.oversize_policy,
+        text_cache_mb=args.text_cache_mb,
+        survey_report=args.survey_report,
+        segment_chars=args.segment_chars,
+        segment_tokens=args.segment_tokens,
+        segment_overlap=args.segment_overlap,
+        tokenizer=args.tokenizer,
+        quality_filter=args.quality_filter,
+        scrub=args.scrub,
+        readahead=args.readahead,
+        readahead_mb=args.readahead_mb,
+        workers=args.workers,
+        ring_mb=args.ring_mb,
+        backend=args.backend
     )
+
+
+def main():
+    # Subcommands
+    if len(sys.argv) > 1 and sys.argv[1] == 'survey':
+        sys.exit(survey.main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'search':
+        sys.exit(sqlite_sink.main(sys.argv[2:]))
+    
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    
+    if args.daemon_serve:
+        from converter_daemon import serve
+        serve(args.daemon_socket, workers=args.daemon_workers)
+        return
+    
+    if args.queue_dir and (args.queue_work or args.queue_status):
+        queue = WorkQueue(args.queue_dir)
+        if args.queue_status:
+            state = queue.status()
+            print(f"📋 Queue {args.queue_dir}: {state['done']}/{state['units']} done, "
+                  f"{state['leased']} in progress, {state['pending']} pending")
+        else:
+            queue.work(XMLToTXTConverter)
+        return
+    if (args.queue_work or args.queue_status or args.queue_init) and not args.queue_dir:
+        parser.error("--queue-init/--queue-work/--queue-status require --queue-dir")
+    if not args.input:
+        parser.error("input is required")
+    
+    lookup_mode = args.get_record is not None or args.get_key is not None
+    if not (args.sample or args.build_index or args.autotune or lookup_mode) and not args.output_base:
+        parser.error("output_base is required (unless using --sample, --autotune, --build-index or --get-record/--get-key)")
+    
+    # Check Wiki cleanup availability
+    if args.clean_wiki_markup and not WIKI_CLEANUP_AVAILABLE:
+        print()
+        print("⚠️  Warning: --clean-wiki-markup requires 'mwparserfromhell' library")
+        print("   Install it with: pip install mwparserfromhell")
+        print("   Continuing without Wiki markup cleanup...")
+        print()
+        args.clean_wiki_markup = False
+    
+    if args.segment_chars and args.segment_tokens:
+        parser.error("use either --segment-chars or --segment-tokens")
+    if args.segment_overlap and not (args.segment_chars or args.segment_tokens):
+        parser.error("--segment-overlap requires --segment-chars or --segment-tokens")
+    if args.segment_overlap < 0 or args.segment_overlap >= (args.segment_chars or args.segment_tokens or 1):
+        parser.error("--segment-overlap must be at least 0 and smaller than the segment size")
+    if args.tokenizer and not TIKTOKEN_AVAILABLE:
+        print()
+        print("⚠️  Warning: --tokenizer requires the 'tiktoken' library")
+        print("   Install it with: pip install tiktoken")
+        print("   Continuing with estimated token counts...")
+        print()
+        args.tokenizer = None
+    if args.quality_filter:
+        if not (args.record_tag or args.survey_report or args.delta_since or args.delta_map):
+            parser.error("--quality-filter requires --record-tag (or --survey-report)")
+        try:
+            parse_thresholds(args.quality_filter)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.scrub:
+        try:
+            Scrubber(args.scrub)
+        except (ValueError, OSError, re.error) as e:
+            parser.error(f"--scrub: {e}")
+    
+    # Show optimization info (not for single-record lookups, whose stdout is the record)
+    if not lookup_mode:
+        print()
+        print("🤖 LLM Training Optimization Settings:")
+        print(f"   • Output Format: {args.format}")
+        print(f"   • Whitespace Normalization: {'Enabled' if not args.no_normalize else 'Disabled'}")
+        print(f"   • Metadata: {'Enabled' if not args.no_metadata else 'Disabled'}")
+        print(f"   • Section Separators: {'Enabled' if not args.no_separators else 'Disabled'}")
+        if args.clean_wiki_markup:
+            print(f"   • Wiki Markup Cleanup: Enabled (removes [[links]], {{{{templates}}}})")
+        if args.min_length > 0:
+            print(f"   • Minimum Text Length: {args.min_length} chars")
+        if args.max_length > 0 and not (args.segment_chars or args.segment_tokens):
+            print(f"   • Maximum Text Length: {args.max_length} chars")
+        if args.segment_chars or args.segment_tokens:
+            unit = 'chars' if args.segment_chars else ('tokens' if args.tokenizer else 'tokens (estimated)')
+            print(f"   • Segmentation: windows of {args.segment_chars or args.segment_tokens:,} {unit}"
+                  + (f", {args.segment_overlap:,} overlap" if args.segment_overlap else ""))
+        if args.quality_filter:
+            print(f"   • Quality Filter: {args.quality_filter}")
+        if args.scrub:
+            print(f"   • Scrubbing: {args.scrub}")
+        if args.record_tag:
+            print(f"   • Record Tag: <{args.record_tag}>")
+        if args.survey_report:
+            print(f"   • Survey Report: {args.survey_report}")
+        if args.delta_since or args.delta_map:
+            print(f"   • Delta Mode: Enabled (revision map: {args.output_base}_revmap.tsv)")
+        if args.stream_text_mb > 0:
+            print(f"   • Oversized Text Nodes: > {args.stream_text_mb:g} MB are {'streamed' if args.oversize_policy == 'stream' else 'truncated'}")
+        print()
+    
+        if not args.no_parallel and cpu_count() > 1:
+            print(f"⚡ Performance Optimizations Enabled:")
+            print(f"   • Batch Writing: {args.batch_size} elements per batch")
+            print(f"   • String Builder: Optimized text generation")
+            print(f"   • I/O Buffer: 4 MB write buffer")
+            print(f"   • CPU Cores: Using {max(2, cpu_count()-1)} cores")
+            print()
+    
+    converter_kwargs = converter_kwargs_from_args(args)
+    
+    if args.autotune:
+        tuned = autotune(XMLToTXTConverter, converter_kwargs, args.input,
+                         trial_mb=args.autotune_mb, memory_limit_mb=args.autotune_memory_mb,
+                         refresh=args.autotune_refresh)
+        converter_kwargs.update(tuned)
+        print()
+        if not args.output_base:
+            return
+    
+    converter = XMLToTXTConverter(**converter_kwargs)
+    
+    if args.queue_init:
+        if not args.output_base:
+            parser.error("--queue-init requires output_base")
+        queue = WorkQueue(args.queue_dir)
+        queue.init(converter_kwargs, args.output_base, lease_seconds=args.lease_seconds)
+        added = queue.add_input(args.input, unit_mb=args.unit_mb, record_tag=converter.record_tag)
+        print(f"📋 Queued {added} unit(s) from {args.input} in {args.queue_dir}")
+        print(f"   Start workers with: python3 src/xml_converter.py --queue-dir {args.queue_dir} --queue-work")
+        return
+    
+    if lookup_mode:
+        try:
+            record = converter.get_record(args.input, args.index, ordinal=args.get_record, key=args.get_key)
+        except (KeyError, IndexError, ValueError, OSError) as e:
+            parser.error(e.args[0] if isinstance(e, KeyError) else str(e))
+        print(record)
+        return
+    
+    if args.build_index:
+        converter.build_index(args.input, args.index, key=args.index_key)
+        if not args.output_base:
+            return
+    
+    if args.sample:
+        run_sample(converter, args.input, samples=args.sample,
+                   records_per_sample=args.sample_records, seed=args.seed)
+        return
     
     converter.convert(
         args.input,